@@ -19,12 +19,18 @@ import os
 import sys
 import tempfile
 
+import swisseph as swe
+
 cwd = os.path.dirname(os.path.abspath(__file__))
 pwd = os.path.dirname(cwd)
 natal_chart_path = os.path.join(pwd, 'natal-chart-generation')
 sys.path.append(natal_chart_path)
-from constants import IMG_DIR, IMG_FILES
+from constants import ASSET_BUNDLE_FILE, EPHE_DIR, EPHE_TABLE_FILE, IMG_DIR, IMG_FILES, SPRITE_ATLAS_FILE, SVG_SPRITE_SHEET_FILE
 import tempfile
+import asset_bundle
+import ephemeris_table
+import sprite_atlas
+import svg_chart
 import utils
 
 FRONTEND_DOMAIN_NAME = os.getenv('FRONTEND_DOMAIN_NAME')
@@ -61,6 +67,13 @@ class NatalChartCdkStack(Stack):
                     os.makedirs(os.path.join(temp_dir, dir), exist_ok=True)
                 print(im.size)
                 im.save(os.path.join(temp_dir, fname))
+
+            # pack planet & sign glyphs into one sprite atlas (fetched once per Lambda container)
+            atlas, index = sprite_atlas.build_atlas(image_loader)
+            sprite_atlas.save_atlas(atlas, index, os.path.join(temp_dir, SPRITE_ATLAS_FILE))
+            # glyph sprite sheet referenced by SVG charts (see `svg_chart.py`)
+            with open(os.path.join(temp_dir, SVG_SPRITE_SHEET_FILE), 'w', encoding='utf-8') as f:
+                f.write(svg_chart.sprite_sheet())
             
             # Deploy image layer bucket
             s3deploy.BucketDeployment(
@@ -114,13 +127,34 @@ class NatalChartCdkStack(Stack):
             ]
         )
 
+        # precompute ephemeris table (only if it doesn't exist yet, this takes a few minutes)
+        ephe_table_path = os.path.join(natal_chart_path, EPHE_TABLE_FILE)
+        if not os.path.exists(ephe_table_path):
+            swe.set_ephe_path(os.path.join(natal_chart_path, EPHE_DIR))
+            ephemeris_table.build_table().save(ephe_table_path)
+
         # copy main program files into lambda folder
         filenames = [
             "../natal-chart-generation/natal_chart.py",
             "../natal-chart-generation/utils.py",
+            "../natal-chart-generation/image_cache.py",
             "../natal-chart-generation/image_params.py",
             "../natal-chart-generation/constants.py",
+            "../natal-chart-generation/ephemeris.py",
+            "../natal-chart-generation/ephemeris_table.py",
+            "../natal-chart-generation/houses.py",
+            "../natal-chart-generation/image_encoding.py",
+            "../natal-chart-generation/labels.py",
+            "../natal-chart-generation/sprite_atlas.py",
+            "../natal-chart-generation/display_list.py",
+            "../natal-chart-generation/svg_chart.py",
+            "../natal-chart-generation/asset_bundle.py",
+            "../natal-chart-generation/render_cache.py",
+            "../natal-chart-generation/chart_request.py",
+            "../natal-chart-generation/metrics.py",
+            "../natal-chart-generation/timezones.py",
             "../natal-chart-generation/ephe",
+            "../natal-chart-generation/tz",
             "../natal-chart-generation/fonts"
         ]
         for fname in filenames:
@@ -128,6 +162,24 @@ class NatalChartCdkStack(Stack):
             print(f"Executing: {cmd} ...")
             os.system(cmd)
 
+        # bake resized assets into the lambda package (memory-mapped at runtime, no PNG decoding).
+        # backgrounds are left out (too large uncompressed) and still served by CloudFront
+        asset_bundle.bake(
+            image_loader,
+            os.path.join("lambda", ASSET_BUNDLE_FILE),
+            [f for f in utils.get_all_filenames(IMG_FILES) if f not in IMG_FILES['BACKGROUNDS']],
+        )
+        # smaller resolution tiers get their own bundle (glyphs and wheel resized natively for the
+        # tier instead of scaled from full resolution), backgrounds are scaled from the full size ones
+        for resolution in [512, 1024]:
+            tier_loader = utils.LocalImageLoader(os.path.join(natal_chart_path, IMG_DIR), IMG_FILES, resolution)
+            tier_loader.resize_all_images()
+            asset_bundle.bake(
+                tier_loader,
+                os.path.join("lambda", asset_bundle.bundle_file(resolution)),
+                [f for f in utils.get_all_filenames(IMG_FILES) if f not in IMG_FILES['BACKGROUNDS']],
+            )
+
         # Lambda Function
         lambda_fn = _lambda.PythonFunction(
             self, "NatalChartLambdaFunction",
@@ -144,6 +196,7 @@ class NatalChartCdkStack(Stack):
                 "CLOUDFRONT_DISTRIBUTION_URL": distribution.distribution_domain_name,
                 "IMG_LAYER_BUCKET_NAME": img_layer_bucket.bucket_name,
                 "NATAL_CHART_BUCKET_NAME": natal_chart_bucket.bucket_name,
+                "EPHEMERIS_BACKEND": "table",
             },
             memory_size=3008,
             ephemeral_storage_size=Size.mebibytes(10240),
@@ -152,6 +205,8 @@ class NatalChartCdkStack(Stack):
 
         img_layer_bucket.grant_read(lambda_fn.role)
         natal_chart_bucket.grant_write(lambda_fn.role)
+        # render cache lookups (`head_object`, see `render_cache.S3Store`)
+        natal_chart_bucket.grant_read(lambda_fn.role)
 
         lambda_fn.role.add_to_policy(
             iam.PolicyStatement(
@@ -1,45 +1,63 @@
-from io import BytesIO
-import json
 import os
-import tempfile
-import uuid
-import boto3
+import chart_request
+import metrics
+from image_encoding import encode_image
 from natal_chart import generate
+import render_cache
+
+# process-wide, reused across warm invocations
+_render_cache = None
+
+def get_render_cache(bucket_name):
+    """
+    Returns the render cache: previously rendered charts are looked up in the output bucket.
+    """
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = render_cache.RenderCache(render_cache.S3Store(bucket_name))
+    return _render_cache
 
 def handler(event, context):
-    local_time = event['queryStringParameters']['local_time']
-    location = event['queryStringParameters']['location']
-
-    im = generate(local_time, location)
-    
-    # Save image to temporary file
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp_file_path = os.path.join(tmp_dir, 'natal_chart.png')
-        im.save(tmp_file_path, format='PNG')
-        
-        # Upload file to S3 bucket
-        s3 = boto3.resource('s3')
-        bucket_name = os.environ['NATAL_CHART_BUCKET_NAME']
-        print("NATAL_CHART_BUCKET_NAME", os.environ['NATAL_CHART_BUCKET_NAME'])
-        bucket = s3.Bucket(bucket_name)
-        
-        filename = f"{local_time.split('T')[0]}_{str(uuid.uuid4())[:8]}.png"
-        
-        image_buffer = BytesIO()
-        im.save(image_buffer, format='PNG')
-        image_buffer.seek(0)
-        
-        bucket.upload_fileobj(
-            image_buffer, filename,
-            ExtraArgs={'ContentType': 'image/png', 'ACL': 'public-read'}
+    # timings and counters of this request, logged as one CloudWatch EMF line (see `metrics.py`)
+    with metrics.recording() as m:
+        with metrics.span('total'):
+            response = _handle(event['queryStringParameters'], m)
+    m.properties['statusCode'] = response['statusCode']
+    m.emit()
+    return response
+
+def _handle(params, m):
+    ephemeris_backend = os.environ.get('EPHEMERIS_BACKEND', 'swisseph')
+    try:
+        request = chart_request.parse_request(params, ephemeris_backend)
+    except ValueError as e:
+        return chart_request.response(400, {'error': str(e)})
+    m.properties['format'] = request.output_params['fmt']
+    m.properties['resolution'] = request.resolution
+
+    cache = get_render_cache(os.environ['NATAL_CHART_BUCKET_NAME'])
+    with metrics.span('cache_lookup'):
+        image_url = cache.get(request.filename)
+    metrics.increment('render_cache_hits' if image_url else 'render_cache_misses')
+    if image_url is not None:
+        return chart_request.response(200, {'url': image_url})
+
+    with metrics.span('render'):
+        im = generate(
+            request.local_time, request.location,
+            ephemeris_backend=ephemeris_backend,
+            bg_file=request.bg_file,
+            resolution=request.resolution,
         )
-        
-    # Return URL of uploaded image
-    image_url = f"https://{bucket_name}.s3.amazonaws.com/{filename}"
-    
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'text/plain'},
-        'body': json.dumps({'url': image_url})
-    }
 
+    # encode exactly once
+    with metrics.span('encode'):
+        encoded = encode_image(im, **request.output_params)
+    m.properties['bytes'] = encoded.size
+
+    # Upload file to S3 bucket, return its URL
+    with metrics.span('upload'):
+        image_url = cache.store.upload(request.filename, encoded.data, encoded.content_type)
+    cache.put(request.filename, image_url)
+
+    return chart_request.response(200, {'url': image_url})
@@ -0,0 +1,136 @@
+"""
+Output stage of animations: streams frames (e.g. from `natal_chart.generate_animation`) to an
+encoder as they are rendered, so only one frame is kept in memory however long the animation is.
+
+Formats (`ANIMATION_FORMATS`):
+    - 'webp': Animated WebP (lossy, `quality` 0-100).
+    - 'gif': Animated GIF, every frame quantized to the 256 color palette of the first frame.
+    - 'png': PNG sequence, one file per frame (`000000.png`, ...) in a directory.
+
+Example usage:
+    frames = natal_chart.generate_animation('2024-01-01T12:00:00', '2024-12-31T12:00:00', timedelta(days=1), '40.7128,-74.0060')
+    write_animation(frames, 'sky.webp', 'webp', n_frames=366, duration=100)
+"""
+import os
+
+from PIL import GifImagePlugin, Image
+
+# format name -> (content type, file extension); a PNG sequence is a directory
+ANIMATION_FORMATS = {
+    'webp': ('image/webp', 'webp'),
+    'gif': ('image/gif', 'gif'),
+    'png': (None, None),
+}
+
+def write_animation(frames, path, fmt='webp', n_frames=None, duration=100, loop=0, quality=80):
+    """
+    Encodes the frames of an animation as they are consumed from `frames`.
+
+    Args:
+        frames: An iterable of PIL Images of the same size (e.g. a generator).
+        path (str): The output file, or the output directory of a PNG sequence.
+        fmt (str, optional): One of `ANIMATION_FORMATS`. (default: 'webp')
+        n_frames (int, optional): The number of frames. Required for 'webp' (the encoder needs it
+            up front), unless `frames` has a length.
+        duration (int, optional): Display time of each frame in milliseconds. (default: 100)
+        loop (int, optional): Number of loops, 0 for an endless loop. (default: 0)
+        quality (int, optional): WebP quality 0-100. (default: 80)
+
+    Returns:
+        int: The number of frames written.
+
+    Raises:
+        ValueError: If the format or one of the parameters is invalid.
+    """
+    if fmt not in ANIMATION_FORMATS:
+        raise ValueError(f"Invalid animation format: {fmt}. Must be one of {tuple(ANIMATION_FORMATS)}.")
+    if duration <= 0:
+        raise ValueError(f"Invalid duration: {duration}. Must be positive.")
+    if not 0 <= quality <= 100:
+        raise ValueError(f"Invalid quality: {quality}. Must be between 0 and 100.")
+    if fmt == 'png':
+        return _write_png_sequence(frames, path)
+    if fmt == 'gif':
+        with open(path, 'wb') as fp:
+            return _write_gif(frames, fp, duration, loop)
+    if n_frames is None:
+        if not hasattr(frames, '__len__'):
+            raise ValueError("n_frames is required to write an animated WebP.")
+        n_frames = len(frames)
+    with open(path, 'wb') as fp:
+        return _write_webp(frames, fp, n_frames, duration, loop, quality)
+
+def _write_png_sequence(frames, directory):
+    os.makedirs(directory, exist_ok=True)
+    n = 0
+    for n, im in enumerate(frames, 1):
+        im.save(os.path.join(directory, f"{n - 1:06d}.png"))
+    return n
+
+def _write_gif(frames, fp, duration, loop):
+    # the header (with the global palette) and each frame are written with Pillow's GIF helpers,
+    # `save_all` would keep all frames until the end
+    palette = None
+    n = 0
+    for n, im in enumerate(frames, 1):
+        im = im.convert('RGB')
+        if palette is None:
+            # one palette for all frames: no local color tables and no color flicker
+            palette = im.quantize(256, method=Image.Quantize.MEDIANCUT)
+            header, _ = GifImagePlugin.getheader(palette.copy(), info={'loop': loop, 'duration': duration})
+            fp.write(b''.join(header))
+        frame = im.quantize(palette=palette, dither=Image.Dither.NONE)
+        fp.write(b''.join(GifImagePlugin.getdata(frame, duration=duration)))
+    if palette is None:
+        raise ValueError("Cannot write an animation without frames.")
+    fp.write(b';')
+    return n
+
+class _FrameStream:
+    """
+    The frames of an animated WebP, pulled one at a time by the `_StreamedFrame`s.
+    """
+
+    def __init__(self, frames):
+        self.frames = iter(frames)
+        self.current = None
+        self.count = 0
+
+    def next(self):
+        # replaces (and so frees) the previous frame
+        self.current = None
+        try:
+            self.current = next(self.frames).convert('RGB')
+        except StopIteration:
+            raise ValueError(f"Expected more frames, got {self.count}.")
+        self.count += 1
+
+class _StreamedFrame:
+    """
+    Placeholder for one frame in Pillow's `save_all(append_images=...)`.
+
+    Pillow's WebP encoder makes a list of all `append_images` before it encodes the first one,
+    and seeks to each image before encoding it. The placeholders cost nothing in that list, and
+    pull their frame from the stream when the encoder seeks to them.
+    """
+    n_frames = 1
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def seek(self, frame):
+        self._stream.next()
+
+    def __getattr__(self, name):
+        return getattr(self._stream.current, name)
+
+def _write_webp(frames, fp, n_frames, duration, loop, quality):
+    stream = _FrameStream(frames)
+    stream.next()
+    first = stream.current
+    first.save(
+        fp, 'WEBP', save_all=True,
+        append_images=[_StreamedFrame(stream) for _ in range(n_frames - 1)],
+        duration=duration, loop=loop, quality=quality,
+    )
+    return stream.count
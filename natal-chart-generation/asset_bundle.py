@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Offline-baked asset bundle.
+
+Resizing the full resolution assets (LANCZOS) and decoding PNGs are the most
+expensive parts of a cold start. `bake` does both once, offline, and writes the
+resulting pixels, uncompressed, into a single file. At runtime the file is
+memory-mapped and every image is a zero-copy view of it (`Image.frombuffer`),
+so loading involves no PNG decoding and no resizing; pages are read on first use.
+
+The bundle records the `image_params` sizes it was baked with, and loading a bundle
+baked with different sizes (or a different format version) fails instead of
+rendering with stale assets.
+
+File format (little-endian):
+    - header: magic (8 bytes), format version (uint32), index length (uint32)
+    - index: JSON, `{"bg_size": ..., "params": {...}, "images": {key: {"mode", "size", "offset", "nbytes"}}}`
+    - data: raw pixels of every image (`Image.tobytes()`), each block aligned to 64 bytes.
+      Offsets are relative to the start of the data.
+
+NOTE: Uncompressed, a 2203x2203 RGBA layer takes ~19 MB, so all 12 backgrounds
+take ~230 MB, more than fits into a Lambda deployment package. The Lambda bundle
+is therefore baked with `--no-backgrounds`, the backgrounds are still fetched remotely.
+
+Each resolution tier (see `image_params.RESOLUTIONS`) has its own bundle (`bundle_file`),
+baked with `--resolution`. Tier bundles include the resized backgrounds, which are much
+smaller (~1 MB each for 512px).
+
+Usage:
+    python asset_bundle.py bake [--resolution 512] [--out assets.bundle] [--no-backgrounds]
+    python asset_bundle.py info [--bundle assets.bundle]
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+
+from PIL import Image
+
+from constants import ASSET_BUNDLE_FILE, IMG_DIR, IMG_FILES
+import image_params
+import utils
+
+MAGIC = b'NCASSETB'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<8sII')
+_ALIGN = 64
+# image sizes the baked assets depend on
+BAKED_PARAMS = ('PLANET_SIZE', 'SIGN_SIZE', 'HOUSE_NUMBER_RADIUS', 'LOGO_RADIUS')
+
+
+def bundle_file(resolution='full'):
+    """
+    Returns the file name of the bundle of a resolution tier, e.g. 'assets_512.bundle'.
+    """
+    if resolution == 'full':
+        return ASSET_BUNDLE_FILE
+    name, ext = os.path.splitext(ASSET_BUNDLE_FILE)
+    return f"{name}_{resolution}{ext}"
+
+
+def current_params():
+    return {name: getattr(image_params, name) for name in BAKED_PARAMS}
+
+
+def bake(image_loader, path, filenames=None):
+    """
+    Writes the images of `image_loader` into a bundle.
+
+    Args:
+        image_loader (ImageLoader): Loads the (already resized) images, and has a `bg_im_size` attribute.
+        path (str): The output file.
+        filenames (list, optional): The images to bake. Defaults to all images in `IMG_FILES`.
+
+    Returns:
+        dict: The index of the bundle.
+    """
+    if filenames is None:
+        filenames = utils.get_all_filenames(IMG_FILES)
+    images = {}
+    blocks = []
+    offset = 0
+    for fname in filenames:
+        im = image_loader.load(fname)
+        data = im.tobytes()
+        images[fname] = {'mode': im.mode, 'size': list(im.size), 'offset': offset, 'nbytes': len(data)}
+        padding = -len(data) % _ALIGN
+        blocks.append(data + b'\0' * padding)
+        offset += len(data) + padding
+    index = {'bg_size': image_loader.bg_im_size, 'params': current_params(), 'images': images}
+
+    index_data = json.dumps(index, sort_keys=True).encode()
+    # pad the index, so the data starts aligned
+    index_data += b' ' * (-(_HEADER.size + len(index_data)) % _ALIGN)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(index_data)))
+        f.write(index_data)
+        for block in blocks:
+            f.write(block)
+    return index
+
+
+class AssetBundle:
+    """
+    A memory-mapped bundle written by `bake`.
+
+    Attributes:
+        - index: The index of the bundle (see the module docstring).
+        - bg_im_size: The background size the images were resized for.
+    """
+
+    def __init__(self, path):
+        """
+        Raises:
+            ValueError: If the file is not a bundle, or it was baked with a different
+                format version or different `image_params`.
+        """
+        with open(path, 'rb') as f:
+            magic, version, index_length = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an asset bundle.")
+            if version != FORMAT_VERSION:
+                raise ValueError(
+                    f"Invalid asset bundle version: {version}. Must be {FORMAT_VERSION}, re-run `asset_bundle.py bake`."
+                )
+            self.index = json.loads(f.read(index_length))
+            if self.index['params'] != current_params():
+                raise ValueError(
+                    f"{path} was baked with different image parameters, re-run `asset_bundle.py bake`."
+                )
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = memoryview(self._mmap)[_HEADER.size + index_length:]
+        self.bg_im_size = self.index['bg_size']
+        self._images = {}
+
+    def __contains__(self, filename):
+        return filename in self.index['images']
+
+    def load(self, filename):
+        """
+        Returns a read-only image backed by the bundle (no copy is made).
+
+        Raises:
+            KeyError: If the image is not in the bundle.
+        """
+        im = self._images.get(filename)
+        if im is None:
+            entry = self.index['images'][filename]
+            start = entry['offset']
+            buffer = self._data[start:start + entry['nbytes']]
+            im = Image.frombuffer(entry['mode'], tuple(entry['size']), buffer, 'raw', entry['mode'], 0, 1)
+            self._images[filename] = im
+        return im
+
+
+class BundleImageLoader(utils.ImageLoader):
+    """
+    Serves images from an AssetBundle, and images that are not in the bundle
+    (e.g. backgrounds) from the wrapped loader.
+
+    Attributes:
+        - bundle: The AssetBundle.
+        - image_loader: The ImageLoader for all other images, or None.
+        - bg_im_size: The background size the images were resized for.
+    """
+
+    def __init__(self, bundle, image_loader=None):
+        self.bundle = bundle
+        self.image_loader = image_loader
+        self.bg_im_size = bundle.bg_im_size
+
+    def load(self, filename):
+        if filename in self.bundle or self.image_loader is None:
+            return self.bundle.load(filename)
+        return self.image_loader.load(filename)
+
+
+# loaded once per process and file, see `get_asset_bundle`
+_asset_bundles = {}
+
+def get_asset_bundle(path=ASSET_BUNDLE_FILE):
+    """
+    Returns the process-wide bundle of `path`, memory-mapping it on first use.
+    """
+    bundle = _asset_bundles.get(path)
+    if bundle is None:
+        bundle = _asset_bundles[path] = AssetBundle(path)
+    return bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bake and inspect the asset bundle.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+    bake_parser = subparsers.add_parser("bake", help="resize all assets and write them into a bundle")
+    bake_parser.add_argument("--resolution", default="full", choices=[str(r) for r in image_params.RESOLUTIONS],
+                             help="resolution tier (background size in pixels) to resize to (default: full)")
+    bake_parser.add_argument("--out", help=f"output file (default: {ASSET_BUNDLE_FILE}, or e.g. {bundle_file(512)})")
+    bake_parser.add_argument("--no-backgrounds", action="store_true",
+                             help="leave out the backgrounds (e.g. for the Lambda package)")
+    info_parser = subparsers.add_parser("info", help="list the images of a bundle")
+    info_parser.add_argument("--bundle", default=ASSET_BUNDLE_FILE, help=f"bundle file (default: {ASSET_BUNDLE_FILE})")
+    args = parser.parse_args()
+
+    if args.command == "bake":
+        resolution = 'full' if args.resolution == 'full' else int(args.resolution)
+        out = args.out or bundle_file(resolution)
+        image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES, None if resolution == 'full' else resolution)
+        image_loader.resize_all_images()
+        filenames = utils.get_all_filenames(IMG_FILES)
+        if args.no_backgrounds:
+            filenames = [f for f in filenames if f not in IMG_FILES['BACKGROUNDS']]
+        index = bake(image_loader, out, filenames)
+        nbytes = sum(entry['nbytes'] for entry in index['images'].values())
+        print(f"Baked {len(index['images'])} images ({nbytes / 2**20:.1f} MB) into {out}")
+    else:
+        bundle = AssetBundle(args.bundle)
+        print(f"background size: {bundle.bg_im_size}px, params: {bundle.index['params']}")
+        for fname, entry in sorted(bundle.index['images'].items()):
+            print(f"{entry['mode']:>5} {entry['size'][0]:5d}x{entry['size'][1]:<5d} {fname}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Batch mode: renders many charts in one process, e.g. for backfills (see `natal_chart_cli.py batch`).
+
+Records are streamed from a JSONL or CSV file. Each record has a `local_time` and a `location`
+('LAT,LON', or separate `lat`/`lon` columns), and optionally an `id` that is copied to the results.
+The local times are converted to UT PARSE_CHUNK_SIZE records at a time, with one bulk timezone
+lookup per chunk (see `parse_records`).
+One image loader, label atlas and BaseLayerCache are used for the whole run, and each image
+and its line in the results manifest (`results.jsonl` in the output directory) are written as
+soon as the chart is done. A record that fails is logged to the manifest with its error, and the
+run goes on.
+
+Example input (JSONL):
+    {"id": "a", "local_time": "1994-01-11T07:33:00", "location": "44.20169,17.90397"}
+    {"id": "b", "local_time": "1962-02-04T17:55:00", "location": "51.5074,-0.1278"}
+"""
+import csv
+from itertools import islice
+import json
+import os
+import time
+
+import image_encoding
+import natal_chart
+import timezones
+
+MANIFEST_FILE = 'results.jsonl'
+# records whose birth data is parsed (and converted to UT) at once, see `run_batch`
+PARSE_CHUNK_SIZE = 1024
+
+def read_records(path):
+    """
+    Streams the records of a JSONL or CSV file (by file extension).
+
+    Yields:
+        (int, dict or ValueError): The line number and the record, or the error if the
+        line could not be parsed, so that one bad line doesn't stop the stream.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in ('.jsonl', '.csv'):
+        raise ValueError(f"Invalid input file: {path}. Must be a .jsonl or .csv file.")
+    with open(path, newline='') as f:
+        if ext == '.csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("not a JSON object")
+            except ValueError as e:
+                yield line_num, ValueError(f"Invalid record on line {line_num}: {e}.")
+            else:
+                yield line_num, record
+
+def record_location(record):
+    """
+    Returns the 'LAT,LON' location string of a record.
+    """
+    if 'location' in record:
+        return record['location']
+    if 'lat' in record and 'lon' in record:
+        return f"{record['lat']},{record['lon']}"
+    raise ValueError(f"Invalid record: {record}. Must have a 'location' or 'lat' and 'lon'.")
+
+def parse_record(record, ut=True):
+    """
+    Returns the birth data (datetime, latitude, longitude) of a record, see `natal_chart.parse_birth_data`.
+
+    Raises:
+        ValueError: If the record is invalid.
+    """
+    if 'local_time' not in record:
+        raise ValueError(f"Invalid record: {record}. Must have a 'local_time'.")
+    return natal_chart.parse_birth_data(record['local_time'], record_location(record), ut=ut)
+
+def parse_records(records):
+    """
+    Parses the birth data of many records, converting all local times to UT at once
+    (`timezones.to_ut_batch`: one vectorized timezone lookup for all locations).
+
+    Returns:
+        list: The birth data (datetime in UT, latitude, longitude) of each record, or the
+        exception if the record is invalid.
+    """
+    parsed = []
+    for record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            parsed.append(parse_record(record, ut=False))
+        except Exception as e:
+            # e.g. a missing field, the other records are not affected
+            parsed.append(e)
+    valid = [birth_data for birth_data in parsed if not isinstance(birth_data, Exception)]
+    uts = iter(timezones.to_ut_batch(*zip(*valid)) if valid else [])
+    return [
+        birth_data if isinstance(birth_data, Exception) else (next(uts),) + birth_data[1:]
+        for birth_data in parsed
+    ]
+
+def render_record(
+        record, image_loader, base_layers=None, output_params=None,
+        ephemeris_backend='swisseph', layout='spread', birth_data=None,
+    ):
+    """
+    Renders and encodes the chart of one record.
+
+    `birth_data` is the record's parsed birth data if it was parsed already (see `parse_records`).
+
+    Returns:
+        image_encoding.EncodedImage
+
+    Raises:
+        ValueError: If the record is invalid.
+    """
+    dt, lat, lon = birth_data or parse_record(record)
+    im = natal_chart.render_chart(
+        dt, lat, lon, image_loader, base_layers,
+        ephemeris_backend=ephemeris_backend, layout=layout,
+    )
+    return image_encoding.encode_image(im, **(output_params or {}))
+
+def run_batch(
+        records, out_dir, image_loader=None, base_layers=None, output_params=None,
+        ephemeris_backend='swisseph', layout='spread', resolution='full', log=print,
+    ):
+    """
+    Renders and writes the chart of each record.
+
+    Args:
+        records: An iterable of (line number, record) tuples, see `read_records`.
+        out_dir (str): Output directory for the images and the results manifest.
+        image_loader (ImageLoader, optional): Default: the process-wide local image loader of
+            `resolution` (see `natal_chart.get_local_image_loader`), with its BaseLayerCache.
+        base_layers (BaseLayerCache, optional): Only used with `image_loader`.
+        output_params (dict, optional): Arguments of `image_encoding.encode_image`.
+        ephemeris_backend (str, optional): See `natal_chart.generate`.
+        layout (str, optional): See `natal_chart.generate`.
+        resolution (int or str, optional): See `natal_chart.generate`. Only used without `image_loader`.
+        log (callable, optional): Called with a message for each failed record and progress.
+
+    Returns:
+        dict: {'ok': charts written, 'failed': records that failed, 'seconds': wall-clock time}
+    """
+    output_params = output_params or {}
+    image_encoding.check_output_params(**output_params)
+    if image_loader is None:
+        image_loader = natal_chart.get_local_image_loader(resolution)
+        base_layers = natal_chart.get_local_base_layers(resolution)
+    os.makedirs(out_dir, exist_ok=True)
+
+    ok = failed = 0
+    t0 = time.perf_counter()
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w') as manifest:
+        for index, (line_num, record, birth_data) in enumerate(_parsed_chunks(records)):
+            result = {'index': index, 'line': line_num}
+            t_record = time.perf_counter()
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                result['id'] = record.get('id')
+                if isinstance(birth_data, Exception):
+                    raise birth_data
+                encoded = render_record(
+                    record, image_loader, base_layers, output_params, ephemeris_backend, layout, birth_data
+                )
+                result['file'] = f"{index:06d}.{encoded.extension}"
+                with open(os.path.join(out_dir, result['file']), 'wb') as f:
+                    f.write(encoded.data)
+                ok += 1
+            except Exception as e:
+                # e.g. a missing field or an invalid date, log and go on with the next record
+                result['error'] = f"{type(e).__name__}: {e}"
+                log(f"Record {index} (line {line_num}) failed: {result['error']}")
+                failed += 1
+            result['seconds'] = round(time.perf_counter() - t_record, 4)
+            manifest.write(json.dumps(result) + '\n')
+            manifest.flush()
+    return {'ok': ok, 'failed': failed, 'seconds': time.perf_counter() - t0}
+
+def _parsed_chunks(records):
+    # (line number, record, birth data) of each record, parsed PARSE_CHUNK_SIZE records at a time
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, PARSE_CHUNK_SIZE))
+        if not chunk:
+            return
+        for (line_num, record), birth_data in zip(chunk, parse_records([record for _, record in chunk])):
+            yield line_num, record, birth_data
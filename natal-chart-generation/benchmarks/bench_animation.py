@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a one-year daily transit animation (366 frames by default) with
+`natal_chart.generate_animation`, streamed to each animation format with `animation.write_animation`,
+vs. collecting all frames in a list first and saving them with Pillow's `save_all`.
+
+Reports frames/second (rendering + encoding) and the peak memory (max RSS) above the
+memory after loading the assets. Each run is in a fresh interpreter, so peaks don't carry over.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_animation.py [--resolution 512] [--start 2024-01-01T12:00:00 --end 2024-12-31T12:00:00]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RUN_SCRIPT = """
+import json, os, resource, sys, time
+from datetime import timedelta
+sys.path.insert(0, %(path)r)
+import swisseph as swe
+from constants import EPHE_DIR
+import animation
+import natal_chart
+swe.set_ephe_path(EPHE_DIR)
+
+def max_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # MB (Linux: KB)
+
+args = json.loads(sys.argv[1])
+step = timedelta(days=1)
+natal_chart.get_local_image_loader(args['resolution'])
+n_frames = len(natal_chart.frame_times(args['start'], args['end'], step))
+frames = natal_chart.generate_animation(
+    args['start'], args['end'], step, args['location'], local=True, resolution=args['resolution'],
+)
+# the assets and the first frame (base layers, labels) are loaded before measuring
+first = next(frames)
+rss0 = max_rss()
+t0 = time.perf_counter()
+if args['mode'] == 'stream':
+    def all_frames():
+        yield first
+        yield from frames
+    animation.write_animation(all_frames(), args['out'], args['fmt'], n_frames=n_frames)
+else:
+    rest = list(frames)
+    first.save(args['out'], save_all=True, append_images=rest, duration=100, loop=0)
+seconds = time.perf_counter() - t0
+print(json.dumps({'frames': n_frames, 'seconds': seconds, 'peak_mb': max_rss() - rss0, 'bytes': os.path.getsize(args['out'])}))
+"""
+
+
+def run(options):
+    out = subprocess.run(
+        [sys.executable, '-c', RUN_SCRIPT % {'path': os.getcwd()}, json.dumps(options)],
+        stdout=subprocess.PIPE, universal_newlines=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", default="2024-01-01T12:00:00")
+    parser.add_argument("--end", default="2024-12-31T12:00:00")
+    parser.add_argument("--location", default="40.7128,-74.0060")
+    parser.add_argument("--resolution", default="512", help="resolution tier (default: 512)")
+    parser.add_argument("--formats", nargs="+", default=["webp", "gif"])
+    parser.add_argument("--no-list", action="store_true", help="skip the list + save_all comparison")
+    args = parser.parse_args()
+    resolution = args.resolution if args.resolution == 'full' else int(args.resolution)
+
+    print(f"{'format':<8} {'mode':<8} {'frames':>7} {'frames/s':>9} {'peak MB':>9} {'size MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for fmt in args.formats:
+            for mode in ['stream'] + ([] if args.no_list else ['list']):
+                options = {
+                    'start': args.start, 'end': args.end, 'location': args.location, 'resolution': resolution,
+                    'fmt': fmt, 'mode': mode, 'out': os.path.join(tmp_dir, f"{mode}.{fmt}"),
+                }
+                result = run(options)
+                print(
+                    f"{fmt:<8} {mode:<8} {result['frames']:>7} {result['frames'] / result['seconds']:>9.1f}"
+                    f" {result['peak_mb']:>9.0f} {result['bytes'] / 1e6:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
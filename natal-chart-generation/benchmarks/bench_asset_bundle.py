@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to the first rendered chart with a fresh image loader, for
+- decode + resize: the full resolution PNGs, resized on load (`generate(local=True)` without a bundle),
+- decode resized PNGs: PNGs resized at deployment (what the Lambda decodes after downloading them),
+- asset bundle: the memory-mapped bundle of `asset_bundle.py` (no decoding, no resizing).
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_asset_bundle.py
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+import asset_bundle
+from constants import EPHE_DIR, IMG_DIR, IMG_FILES
+from natal_chart import _generate
+import utils
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def decode_and_resize():
+    image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES)
+    image_loader.load_all_images()
+    image_loader.resize_all_images()
+    return image_loader
+
+
+def time_first_chart(make_loader, chart, bg_file):
+    t0 = time.perf_counter()
+    image_loader = make_loader()
+    t1 = time.perf_counter()
+    _generate(chart, image_loader, bg_file)
+    return t1 - t0, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # deployment-style resized PNGs and a full bundle
+        image_loader = decode_and_resize()
+        for fname in utils.get_all_filenames(IMG_FILES):
+            os.makedirs(os.path.join(temp_dir, os.path.dirname(fname)), exist_ok=True)
+            image_loader.load(fname).save(os.path.join(temp_dir, fname))
+        bundle_path = os.path.join(temp_dir, 'assets.bundle')
+        t0 = time.perf_counter()
+        index = asset_bundle.bake(image_loader, bundle_path)
+        t_bake = time.perf_counter() - t0
+
+        results = []
+        for name, make_loader in [
+            ("decode + resize", decode_and_resize),
+            ("decode resized PNGs", lambda: utils.LocalImageLoader(temp_dir, IMG_FILES)),
+            ("asset bundle", lambda: asset_bundle.BundleImageLoader(asset_bundle.AssetBundle(bundle_path))),
+        ]:
+            # the same chart every time (rendering modifies its display positions)
+            random.seed(args.seed)
+            results.append((name,) + time_first_chart(make_loader, _utils.random_chart(), bg_file))
+
+    nbytes = sum(entry['nbytes'] for entry in index['images'].values())
+    print(f"bundle: {len(index['images'])} images, {nbytes / 2**20:.0f} MB, baked in {t_bake:.2f} s")
+    print(f"{'':<20} {'loader':>10} {'first chart':>12}")
+    for name, t_loader, t_chart in results:
+        print(f"{name:<20} {1000 * t_loader:8.1f} ms {1000 * t_chart:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
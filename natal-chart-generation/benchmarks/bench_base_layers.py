@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-chart cost of compositing the base layers (`set_background_layers`)
+vs. copying them from a warm `BaseLayerCache`, at full resolution, plus the
+effect on a complete `_generate()` call.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_base_layers.py [-n CHARTS]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR, IMG_DIR, IMG_FILES, SIGNS
+from natal_chart import BaseLayerCache, _generate, set_background_layers
+import utils
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def mean_time(fn, args_list):
+    t0 = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - t0) / len(args_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=20, help="number of charts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES)
+    image_loader.load_all_images()
+    image_loader.resize_all_images()
+
+    bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+    # force decoding of all images, so it isn't part of the timings
+    set_background_layers('Ari', bg_file, image_loader)
+
+    cache = BaseLayerCache(image_loader, maxsize=None)
+    t0 = time.perf_counter()
+    cache.warm([bg_file])
+    t_warm = time.perf_counter() - t0
+
+    calls = [(random.choice(SIGNS), bg_file) for _ in range(args.n)]
+    t_composite = mean_time(lambda asc, bg: set_background_layers(asc, bg, image_loader), calls)
+    t_cached = mean_time(cache.get, calls)
+
+    charts = [_utils.random_chart() for _ in range(args.n)]
+    t_generate = mean_time(lambda c: _generate(c, image_loader, bg_file), [(c,) for c in charts])
+    t_generate_cached = mean_time(lambda c: _generate(c, image_loader, bg_file, cache), [(c,) for c in charts])
+
+    print(f"background size:        {image_loader.bg_im_size}px")
+    print(f"warm (12 signs):        {1000 * t_warm:8.1f} ms")
+    print(f"set_background_layers:  {1000 * t_composite:8.1f} ms/chart")
+    print(f"BaseLayerCache.get:     {1000 * t_cached:8.1f} ms/chart ({t_composite / t_cached:.0f}x)")
+    print(f"_generate:              {1000 * t_generate:8.1f} ms/chart")
+    print(f"_generate (cached):     {1000 * t_generate_cached:8.1f} ms/chart (saves {1000 * (t_generate - t_generate_cached):.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
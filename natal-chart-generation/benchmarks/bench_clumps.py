@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput of the clump detector (`utils.find_clump_indices`) vs. the
+original two-sort / disjoint-set algorithm (`_utils.reference_clump_indices`),
+on a randomized corpus of charts (13 positions each, with stelliums). The results
+of both are compared for every chart.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_clumps.py [-n CHARTS]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import numpy as np
+
+from constants import SIGNS
+from image_params import PLANET_SIZE, PLANET_RADIUS
+import utils
+import _utils
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200000, help="number of charts (default: 200000, i.e. 2.6M positions)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    theta = math.degrees(2 * math.asin(0.5 * (PLANET_SIZE / 2) / PLANET_RADIUS))
+    rng = np.random.default_rng(args.seed)
+    corpus = []
+    for _ in range(args.n):
+        dpos = _utils.random_clump_positions(rng)
+        corpus.append((dpos, [SIGNS[int(p // 30)] for p in dpos]))
+    n_positions = sum(len(dpos) for dpos, _ in corpus)
+
+    t0 = time.perf_counter()
+    results = [utils.find_clump_indices(dpos, theta, signs) for dpos, signs in corpus]
+    t_new = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    expected = [_utils.reference_clump_indices(dpos, theta, signs) for dpos, signs in corpus]
+    t_reference = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for dpos, _ in corpus:
+        utils.find_clump_indices(dpos, theta)
+    t_circular = time.perf_counter() - t0
+
+    mismatches = sum(
+        set(frozenset(c) for c in clumps) != ref
+        for clumps, ref in zip(results, expected)
+    )
+    print(f"{args.n} charts, {n_positions} positions, {mismatches} mismatches vs. reference")
+    for name, t in [
+        ("reference (2 sorts + disjoint-set)", t_reference),
+        ("find_clump_indices (signs)", t_new),
+        ("find_clump_indices (circular)", t_circular),
+    ]:
+        print(f"{name:<36} {n_positions / t / 1e6:6.2f}M positions/s  {1e6 * t / args.n:6.1f} us/chart")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
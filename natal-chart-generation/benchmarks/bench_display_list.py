@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the layout stage on its own (see `display_list.py`). Per-chart time of:
+
+    place (scalar)     the same placements, one `get_center`/`get_coordinates` call per item
+                       (how `add_object` places an item)
+    place (vectorized) display_list.place_objects
+    layout_chart       layout (spread) + place_objects
+    to_json, from_json serializing the display list
+    rasterize          drawing the display list (with cached base layers)
+
+and the size of the serialized display list.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_display_list.py [-n CHARTS] [--resolution full]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR, IMG_FILES
+import display_list
+import image_params
+import labels
+import natal_chart
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def place_scalar(objects, asc, size, image_loader):
+    # the same Placements as `display_list.place_objects`, one `add_object`-style computation per item
+    text_size = image_params.text_size(size[1])
+    label_atlas = labels.get_label_atlas(text_size)
+    placements = []
+    for p in objects:
+        for layer, radius in zip(display_list.LAYERS, display_list.LAYER_RADII):
+            if layer == 'label':
+                asset, obj_size = math.floor(p.position), (text_size, text_size)
+            else:
+                asset = p.images[layer]
+                obj_size = image_loader.load(asset).size
+            (a, b) = natal_chart.get_center(size, obj_size)
+            (x, y) = natal_chart.get_coordinates(asc, a, b, radius * size[1], p.dpos)
+            x, y = round(x), round(y)
+            if layer == 'label':
+                mask, (left, top) = label_atlas.masks[asset]
+                box = (x + left, y + top, x + left + mask.size[0], y + top + mask.size[1])
+            else:
+                box = (x, y, x + obj_size[0], y + obj_size[1])
+            placements.append(display_list.Placement(p.name, layer, asset, x, y, box))
+    return placements
+
+
+def best_time(fn, args_list, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results = [fn(*args) for args in args_list]
+        best = min(best, (time.perf_counter() - t0) / len(args_list))
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=50, help="number of charts")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the best is reported")
+    parser.add_argument("--resolution", default="full", help="resolution tier (default: full)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    resolution = args.resolution if args.resolution == 'full' else int(args.resolution)
+
+    random.seed(args.seed)
+    charts = [_utils.random_chart() for _ in range(args.n)]
+    image_loader = natal_chart.get_local_image_loader(resolution)
+    base_layers = natal_chart.get_local_base_layers(resolution)
+    bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+    size = image_loader.load(bg_file).size
+
+    place_args = [(list(c.objects.values()), c.objects['Asc'].sign, size, image_loader) for c in charts]
+    # warm up (label atlas, glyphs, base layers)
+    for fn in (place_scalar, display_list.place_objects):
+        fn(*place_args[0])
+    for c in charts:
+        base_layers.get(c.objects['Asc'].sign, bg_file)
+
+    rows = []
+    t, expected = best_time(place_scalar, place_args, args.repeat)
+    rows.append(('place (scalar)', t))
+    t, placements = best_time(display_list.place_objects, place_args, args.repeat)
+    rows.append(('place (vectorized)', t))
+    assert placements == expected
+    t, displays = best_time(lambda c: natal_chart.layout_chart(c, image_loader, bg_file), [(c,) for c in charts], args.repeat)
+    rows.append(('layout_chart', t))
+    t, data = best_time(display_list.to_json, [(d,) for d in displays], args.repeat)
+    rows.append(('to_json', t))
+    t, _ = best_time(display_list.from_json, [(s,) for s in data], args.repeat)
+    rows.append(('from_json', t))
+    t, _ = best_time(lambda d: natal_chart.rasterize(d, image_loader, base_layers), [(d,) for d in displays], args.repeat)
+    rows.append(('rasterize', t))
+
+    print(f"{len(displays[0].placements)} placements per chart, {size[0]}x{size[1]}")
+    print(f"{'stage':<20} {'ms/chart':>9}")
+    for name, t in rows:
+        print(f"{name:<20} {1000 * t:>9.3f}")
+    print(f"display list JSON: {sum(len(s.encode()) for s in data) / len(data) / 1000:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
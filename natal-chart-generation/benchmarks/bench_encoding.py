@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: encode time and output size of a full resolution chart
+for every output format (see `image_encoding.OUTPUT_FORMATS`) and setting.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_encoding.py [--repeat N]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR, IMG_DIR, IMG_FILES
+from image_encoding import encode_image
+from natal_chart import _generate
+import utils
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+SETTINGS = [
+    ('png', {'compress_level': 1}),
+    ('png', {'compress_level': 6}),
+    ('png', {'compress_level': 9}),
+    ('png-palette', {'compress_level': 6}),
+    ('webp', {'quality': 60}),
+    ('webp', {'quality': 80}),
+    ('webp', {'quality': 95}),
+    ('webp-lossless', {'quality': 0}),
+    ('webp-lossless', {'quality': 50}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES)
+    image_loader.load_all_images()
+    image_loader.resize_all_images()
+    im = _generate(_utils.random_chart(), image_loader, list(IMG_FILES['BACKGROUNDS'])[0])
+
+    print(f"image size: {im.size[0]}x{im.size[1]}")
+    print(f"{'format':>14} {'setting':>18} {'encode':>10} {'size':>10}")
+    for fmt, kwargs in SETTINGS:
+        runs = [encode_image(im, fmt, **kwargs) for _ in range(args.repeat)]
+        best = min(r.encode_seconds for r in runs)
+        setting = ', '.join(f"{k}={v}" for k, v in kwargs.items())
+        print(f"{fmt:>14} {setting:>18} {1000 * best:>7.0f} ms {runs[0].size / 1024:>7.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
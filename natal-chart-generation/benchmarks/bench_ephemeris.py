@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: charts per second of the batch ephemeris engine
+(`ephemeris.compute_positions_batch`) against the original per-chart, per-body loop.
+If a precomputed table exists (see `ephemeris_table.py`), the 'table' backend is
+measured as well, both cold (memory-mapping the file) and warm.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_ephemeris.py [-n RECORDS] [--seed SEED] [--table PATH]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import swisseph as swe
+
+from constants import EPHE_TABLE_FILE, PLANET_NAMES, SIGNS
+from natal_chart import NatalChart, Planet, charts_from_positions
+import ephemeris
+import ephemeris_table
+
+
+def random_records(n, seed):
+    rng = random.Random(seed)
+    start = datetime(1920, 1, 1)
+    records = []
+    for _ in range(n):
+        dt = start + timedelta(seconds=rng.randrange(100 * 365 * 86400))
+        records.append((dt, rng.uniform(-66, 66), rng.uniform(-180, 180)))
+    return records
+
+
+def per_body_loop(records):
+    """The chart construction that `generate()` used before the batch engine."""
+    charts = []
+    for dt, lat, lon in records:
+        hour = dt.hour + (dt.minute + dt.second / 60) / 60
+        jd = swe.julday(dt.year, dt.month, dt.day, hour)
+        _, ascmc = swe.houses(jd, lat, lon, bytes('W', 'utf-8'))
+        planets = []
+        for name, no_body in PLANET_NAMES.items():
+            abs_pos = swe.calc_ut(jd, no_body)[0][0]
+            planets.append(Planet(name, abs_pos % 30, abs_pos, SIGNS[int(abs_pos // 30)]))
+        for abs_pos, name in [(ascmc[0], 'Asc'), (ascmc[1], 'Mc')]:
+            planets.append(Planet(name, abs_pos % 30, abs_pos, SIGNS[int(abs_pos // 30)]))
+        charts.append(NatalChart(planets, jd))
+    return charts
+
+
+def batch(records, backend='swisseph'):
+    dts, lats, lons = zip(*records)
+    return charts_from_positions(ephemeris.compute_positions_batch(dts, lats, lons, backend))
+
+
+def timed(fn, records, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(records)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=2000, help="number of birth records")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--table", default=EPHE_TABLE_FILE, help="precomputed ephemeris table")
+    args = parser.parse_args()
+
+    records = random_records(args.n, args.seed)
+    t_loop, loop_charts = timed(per_body_loop, records, args.repeat)
+    t_batch, batch_charts = timed(batch, records, args.repeat)
+
+    print(f"records:         {args.n}")
+    print(f"per-body loop:   {args.n / t_loop:10.0f} charts/s")
+    print(f"batch:           {args.n / t_batch:10.0f} charts/s ({t_loop / t_batch:.2f}x)")
+    print(f"max |diff|:      {max_diff(loop_charts, batch_charts):.2e} deg")
+
+    if not os.path.exists(args.table):
+        print(f"no ephemeris table at {args.table}, skipping the 'table' backend")
+        return
+    t0 = time.perf_counter()
+    table = ephemeris_table.EphemerisTable.load(args.table)
+    batch(records[:1], table)
+    t_cold = time.perf_counter() - t0
+    t_table, table_charts = timed(lambda r: batch(r, table), records, args.repeat)
+    print(f"table (cold):    {1000 * t_cold:10.2f} ms to load + first chart")
+    print(f"table (warm):    {args.n / t_table:10.0f} charts/s ({t_loop / t_table:.2f}x)")
+    print(f"max |diff|:      {max_diff(loop_charts, table_charts):.2e} deg")
+
+
+def max_diff(charts_a, charts_b):
+    return max(
+        abs((a.objects[name].abs_pos - b.objects[name].abs_pos + 180) % 360 - 180)
+        for a, b in zip(charts_a, charts_b)
+        for name in a.objects
+    )
+
+
+if __name__ == "__main__":
+    main()
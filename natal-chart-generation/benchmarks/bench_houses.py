@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput of the batch house/angle computation (`houses.compute_houses_batch`)
+against one `swe.houses` call per record, for every supported house system.
+Runs once with distinct birth instants and once with records sharing a few instants
+(e.g. a backfill of charts for the same minting event).
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_houses.py [-n RECORDS] [--instants K]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import swisseph as swe
+
+from constants import EPHE_DIR
+import houses
+
+
+def per_record(jd, lats, lons, hsys):
+    cusps = []
+    for t, lat, lon in zip(jd.tolist(), lats.tolist(), lons.tolist()):
+        try:
+            cusps.append(swe.houses(t, lat, lon, hsys))
+        except swe.Error:
+            cusps.append(swe.houses(t, lat, lon, b'O'))
+    return cusps
+
+
+def batch(jd, lats, lons, house_system):
+    # measure cold, i.e. without sidereal terms cached by a previous run
+    houses.sidereal_terms.cache_clear()
+    return houses.compute_houses_batch(jd, lats, lons, house_system)
+
+
+def timed(fn, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10000, help="number of records")
+    parser.add_argument("--instants", type=int, default=100,
+                        help="number of distinct birth instants in the shared-instant run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    swe.set_ephe_path(EPHE_DIR)
+    rng = np.random.default_rng(args.seed)
+    lats = rng.uniform(-60, 60, args.n)
+    lons = rng.uniform(-180, 180, args.n)
+    distinct = rng.uniform(2415020.5, 2488069.5, args.n)
+    shared = rng.choice(distinct[:args.instants], args.n)
+
+    print(f"records: {args.n}")
+    print(f"{'system':>12} {'instants':>9} {'swe.houses':>14} {'batch':>14} {'speedup':>8}")
+    for name, hsys in houses.HOUSE_SYSTEMS.items():
+        for label, jd in [(args.n, distinct), (args.instants, shared)]:
+            t_loop = timed(per_record, jd, lats, lons, hsys)
+            t_batch = timed(batch, jd, lats, lons, name)
+            print(
+                f"{name:>12} {label:>9} {args.n / t_loop:>10.0f} r/s"
+                f" {args.n / t_batch:>10.0f} r/s {t_loop / t_batch:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory vs. render time of the image cache (see `image_cache.py`) for a range of budgets.
+
+Renders full resolution charts with random backgrounds (without a base layer cache, so every chart
+loads its background) through a `LocalImageLoader` with each budget, and reports per budget:
+
+    resident     bytes of decoded images held by the loader after the run (peak in parentheses)
+    hit rate     loads served from the cache
+    evictions    images evicted to stay within the budget
+    ms/chart     render time, including loading evicted backgrounds again
+
+The hot assets (wheel, house numbers, logo, glyphs) are pinned, so only backgrounds are evicted.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_image_cache.py [-n CHARTS] [--budgets none,256,128,64]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR, IMG_DIR, IMG_FILES
+import natal_chart
+import utils
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def run(budget, charts, bg_files):
+    image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES, cache_budget=budget)
+    image_loader.load_all_images()
+    image_loader.resize_all_images()
+    cache = image_loader.image_cache
+    cache.hits = cache.misses = 0
+    peak = cache.resident_bytes
+    t0 = time.perf_counter()
+    for chart, bg_file in zip(charts, bg_files):
+        natal_chart._generate(chart, image_loader, bg_file)
+        peak = max(peak, cache.resident_bytes)
+    return (time.perf_counter() - t0) / len(charts), peak, cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=40, help="number of charts")
+    parser.add_argument("--budgets", default="none,256,128,64", help="comma separated budgets in MB, 'none' for no limit")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    charts = [_utils.random_chart() for _ in range(args.n)]
+    bg_files = [natal_chart.random_asset(IMG_FILES['BACKGROUNDS']) for _ in range(args.n)]
+
+    print(f"{'budget':>8} {'resident (peak) MB':>19} {'hit rate':>9} {'evictions':>10} {'ms/chart':>9}")
+    for budget in args.budgets.split(','):
+        budget_bytes = None if budget == 'none' else int(float(budget) * 2**20)
+        t, peak, stats = run(budget_bytes, charts, bg_files)
+        loads = stats['hits'] + stats['misses']
+        resident = f"{stats['resident_bytes'] / 2**20:.0f} ({peak / 2**20:.0f})"
+        print(
+            f"{budget:>8} {resident:>19} {stats['hits'] / max(loads, 1):>9.1%}"
+            f" {stats['evictions']:>10} {1000 * t:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: repaint cost of `natal_chart.render_incremental` as a function of the number of objects
+that changed since the previous chart, vs. a full `_generate()` with cached base layers.
+
+For each k, a chart B is made from a random chart A by moving k objects (not the ascendant) by a
+few degrees, and the renderer alternates between A and B, so every render differs from the previous
+one in those k objects (or more, when the layout moves their neighbours too: "moved" is the number of
+objects whose planet glyph, sign glyph or label actually changed). The repainted area is the share of
+the chart restored from the base layer. "copy" renders onto a copy of the previous chart, "in place"
+repaints the previous chart itself (`in_place=True`).
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_incremental.py [-n CHARTS] [--repeat 10] [--resolution full|512|1024|2048]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR, IMG_FILES, SIGNS
+import natal_chart
+from natal_chart import NatalChart, Planet, _generate, render_incremental
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def chart_at(positions):
+    return NatalChart([Planet(name, pos % 30, pos, SIGNS[int(pos) // 30]) for name, pos in positions.items()])
+
+
+def alternate(a, b, image_loader, base_layers, bg_file, repeat, in_place):
+    """
+    Renders A, then B, A, B, ... incrementally. Returns the time per render.
+    """
+    previous = render_incremental(chart_at(a), image_loader, base_layers, bg_file=bg_file)
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        previous = render_incremental(chart_at(b if i % 2 == 0 else a), image_loader, base_layers, previous, in_place=in_place)
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=5, help="number of random charts (default: 5)")
+    parser.add_argument("--repeat", type=int, default=10, help="renders per chart and k (default: 10)")
+    parser.add_argument("--resolution", default="full", help="resolution tier (default: full)")
+    parser.add_argument("--shift", type=float, default=3, help="degrees each changed object moves (default: 3)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    resolution = args.resolution if args.resolution == 'full' else int(args.resolution)
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    image_loader = natal_chart.get_local_image_loader(resolution)
+    base_layers = natal_chart.get_local_base_layers(resolution)
+    bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+    charts = [{name: p.abs_pos for name, p in _utils.random_chart().objects.items()} for _ in range(args.n)]
+    movable = [name for name in charts[0] if name != 'Asc']
+
+    full = []
+    for positions in charts:
+        chart = chart_at(positions)
+        _generate(chart, image_loader, bg_file, base_layers)  # warm up the base layer
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            _generate(chart_at(positions), image_loader, bg_file, base_layers)
+        full.append((time.perf_counter() - t0) / args.repeat)
+    t_full = statistics.mean(full)
+    print(f"full render (cached base layer): {1000 * t_full:.2f} ms/chart")
+
+    print(f"{'k':>3} {'moved':>6} {'area %':>7} {'copy ms':>8} {'in place ms':>12} {'speedup (copy, in place)':>25}")
+    for k in range(len(movable) + 1):
+        moved, areas, t_copy, t_in_place = [], [], [], []
+        for a in charts:
+            b = dict(a)
+            for name in rng.sample(movable, k):
+                b[name] = (b[name] + rng.choice([-1, 1]) * args.shift) % 360
+            t_copy.append(alternate(a, b, image_loader, base_layers, bg_file, args.repeat, in_place=False))
+            t_in_place.append(alternate(a, b, image_loader, base_layers, bg_file, args.repeat, in_place=True))
+            previous = render_incremental(chart_at(a), image_loader, base_layers, bg_file=bg_file)
+            rendered = render_incremental(chart_at(b), image_loader, base_layers, previous)
+            changed = {
+                old.name for old, new in zip(previous.display.placements, rendered.display.placements) if old != new
+            }
+            moved.append(len(changed))
+            width, height = rendered.image.size
+            area = sum((right - left) * (bottom - top) for left, top, right, bottom in rendered.dirty)
+            areas.append(100 * area / (width * height))
+        print(
+            f"{k:>3} {statistics.mean(moved):>6.1f} {statistics.mean(areas):>7.2f}"
+            f" {1000 * statistics.mean(t_copy):>8.2f} {1000 * statistics.mean(t_in_place):>12.2f}"
+            f" {t_full / statistics.mean(t_copy):>16.1f}x {t_full / statistics.mean(t_in_place):>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the text stage of `_generate()` (13 degree labels per chart), with the
+original per-render `ImageFont.truetype()` + `ImageDraw.text()` vs. a `LabelAtlas`.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_labels.py [-n CHARTS]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from constants import FONT_FILE
+import image_params
+import labels
+
+# objects per chart
+N_OBJECTS = 13
+
+
+def text_stage_draw(im, labels_xy):
+    draw = ImageDraw.Draw(im)
+    font = ImageFont.truetype(FONT_FILE, image_params.TEXT_SIZE)
+    for xy, position in labels_xy:
+        draw.text(xy, labels.label_text(position), font=font)
+
+
+def text_stage_atlas(im, labels_xy):
+    atlas = labels.get_label_atlas()
+    for xy, position in labels_xy:
+        atlas.paste(im, xy, position)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=500, help="number of charts")
+    parser.add_argument("--size", type=int, default=2000, help="background size in pixels")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    im = Image.new("RGB", (args.size, args.size))
+    charts = [
+        [((random.randrange(args.size), random.randrange(args.size)), random.uniform(0, 30))
+         for _ in range(N_OBJECTS)]
+        for _ in range(args.n)
+    ]
+
+    t0 = time.perf_counter()
+    labels.get_label_atlas()
+    t_build = time.perf_counter() - t0
+
+    results = {}
+    for name, fn in [("draw.text", text_stage_draw), ("LabelAtlas", text_stage_atlas)]:
+        t0 = time.perf_counter()
+        for labels_xy in charts:
+            fn(im, labels_xy)
+        results[name] = (time.perf_counter() - t0) / args.n
+
+    print(f"atlas build (once):  {1000 * t_build:8.2f} ms")
+    for name, t in results.items():
+        print(f"{name:<19}  {1000 * t:8.3f} ms/chart ({results['draw.text'] / t:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
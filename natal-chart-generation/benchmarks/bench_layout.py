@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: `utils.spread_planets` vs. the least squares layout solver `utils.solve_layout`,
+on random charts and stellium-heavy charts (see `tests/_utils.py`): time per chart, share of
+charts that still have overlapping planets, and how far planets are moved from their longitude.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_layout.py [-n CHARTS]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import numpy as np
+import swisseph as swe
+
+from constants import EPHE_DIR
+from natal_chart import Planet
+import utils
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def run(layout, charts, theta):
+    """
+    Returns the time per chart, the share of charts with overlaps and the mean/max displacement.
+    """
+    # fresh Planet objects, since layouts modify `dpos`
+    planet_lists = [[Planet(*args) for args in chart] for chart in charts]
+    t0 = time.perf_counter()
+    for planets in planet_lists:
+        layout(planets, theta)
+    elapsed = (time.perf_counter() - t0) / len(charts)
+
+    overlapping = 0
+    moves = []
+    for planets in planet_lists:
+        dpos = [p.dpos for p in planets]
+        overlapping += bool(utils.find_overlaps(dpos, theta))
+        moves += [abs((p.dpos - p.abs_pos + 180) % 360 - 180) for p in planets]
+    return elapsed, overlapping / len(charts), float(np.mean(moves)), float(np.max(moves))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=2000, help="charts per corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    theta = utils.planet_theta()
+    corpora = {
+        "random": [_utils.random_chart() for _ in range(args.n)],
+        "stellium": [_utils.generate_stellium(random.randint(2, 10)) for _ in range(args.n)],
+        "stellium near 0": [_utils.generate_stellium_near_zero_degrees(random.randint(2, 10)) for _ in range(args.n)],
+    }
+    print(f"theta = {theta:.2f} deg, {args.n} charts per corpus")
+    print(f"{'corpus':<16} {'layout':<14} {'us/chart':>9} {'overlaps':>9} {'mean move':>10} {'max move':>9}")
+    for corpus, charts in corpora.items():
+        charts = [[(p.name, p.position, p.abs_pos, p.sign) for p in c.objects.values()] for c in charts]
+        for name, layout in [("spread_planets", utils.spread_planets), ("solve_layout", utils.solve_layout)]:
+            elapsed, overlapping, mean_move, max_move = run(layout, charts, theta)
+            print(f"{corpus:<16} {name:<14} {1e6 * elapsed:9.1f} {100 * overlapping:8.1f}% {mean_move:9.2f}° {max_move:8.2f}°")
+
+
+if __name__ == "__main__":
+    main()
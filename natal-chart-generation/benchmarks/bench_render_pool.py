@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scaling of the render farm (`render_pool.render_many`) with the number of worker
+processes, on a full resolution workload (local assets, PNG output). Reports charts/second,
+the speedup over one worker and the parallel efficiency (speedup / workers).
+
+The sequential baseline renders the same records in the parent process with `batch.render_record`.
+NOTE: Speedup is capped by the number of CPUs of the machine (printed first).
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_render_pool.py [-n CHARTS] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR
+import batch
+import natal_chart
+import render_pool
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def main():
+    cpus = os.cpu_count()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=8 * cpus, help="charts per run (default: 8 per CPU)")
+    parser.add_argument(
+        "--workers", type=int, nargs="+",
+        default=sorted({1, 2, 4, 8, 16, cpus} & set(range(1, cpus + 1))),
+        help="worker counts to run (default: powers of 2 up to the number of CPUs)"
+    )
+    parser.add_argument("--chunksize", type=int, default=render_pool.DEFAULT_CHUNKSIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    records = [
+        {'local_time': _utils.random_datetime().isoformat(), 'location': '{},{}'.format(*_utils.random_location()[::-1])}
+        for _ in range(args.n)
+    ]
+
+    t0 = time.perf_counter()
+    image_loader = natal_chart.get_local_image_loader()
+    base_layers = natal_chart.get_local_base_layers()
+    render_pool.preload(image_loader)
+    print(f"{cpus} CPUs, {args.n} charts per run, assets loaded in {time.perf_counter() - t0:.1f} s")
+
+    t0 = time.perf_counter()
+    for record in records:
+        batch.render_record(record, image_loader, base_layers)
+    t_sequential = time.perf_counter() - t0
+    print(f"{'sequential':<12} {args.n / t_sequential:8.2f} charts/s")
+
+    for workers in args.workers:
+        t0 = time.perf_counter()
+        results = render_pool.render_many(
+            records, workers, image_loader, base_layers, chunksize=args.chunksize
+        )
+        elapsed = time.perf_counter() - t0
+        failed = sum(r.error is not None for r in results)
+        speedup = t_sequential / elapsed
+        print(
+            f"{workers:>2} workers   {args.n / elapsed:8.2f} charts/s  speedup {speedup:5.2f}x"
+            f"  efficiency {100 * speedup / workers:5.1f}%" + (f"  ({failed} failed)" if failed else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Load test of the render server (`render_server.py`): sends `-n` chart requests with random birth
+data from `--concurrency` keep-alive connections and reports throughput, latency percentiles and
+status codes (503 = rejected by the bounded queue), then the server's /health.
+
+By default a server is started in-process (worker processes, charts stored in a temporary
+directory); `--url` load tests a running server instead. `--repeat` sends each birth data
+that many times, to measure render cache hits.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_render_server.py -n 200 --concurrency 16 --workers 4 [--queue-size 8]
+    python benchmarks/bench_render_server.py --url http://localhost:8080 -n 1000 --concurrency 64
+"""
+import argparse
+import asyncio
+from collections import Counter
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR
+import chart_request
+import render_cache
+import render_server
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+async def get(reader, writer, target):
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    headers = dict(line.lower().split(': ', 1) for line in head[1:] if line)
+    body = await reader.readexactly(int(headers['content-length']))
+    return int(head[0].split(' ')[1]), body
+
+
+async def load_test(host, port, targets, concurrency):
+    """
+    Sends all `targets` from `concurrency` connections. Returns a list of (status, seconds).
+    """
+    queue = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+    results = []
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        while not queue.empty():
+            target = queue.get_nowait()
+            t0 = time.perf_counter()
+            status, _ = await get(reader, writer, target)
+            results.append((status, time.perf_counter() - t0))
+        writer.close()
+
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return results
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=100, help="number of requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent connections (default: 8)")
+    parser.add_argument("--repeat", type=int, default=1, help="requests per birth data (default: 1)")
+    parser.add_argument("--format", default="png")
+    parser.add_argument("--resolution", default="full")
+    parser.add_argument("--url", help="load test a running server instead")
+    parser.add_argument("--workers", type=int, help="worker processes of the in-process server")
+    parser.add_argument("--queue-size", type=int, default=render_server.DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    targets = []
+    for _ in range(-(-args.n // args.repeat)):
+        lon, lat = _utils.random_location()
+        params = {
+            'local_time': _utils.random_datetime().strftime('%Y-%m-%dT%H:%M:%S'),
+            'location': f"{lat:.4f},{lon:.4f}",
+            'format': args.format,
+            'resolution': args.resolution,
+        }
+        targets += [f"/?{urlencode(params)}"] * args.repeat
+    targets = targets[:args.n]
+    random.shuffle(targets)
+
+    async def run():
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            tmp_dir = tempfile.TemporaryDirectory()
+            server = render_server.RenderServer(
+                render_cache.LocalStore(tmp_dir.name), args.workers, args.queue_size,
+                preload=(chart_request.parse_resolution(args.resolution),),
+            )
+            t0 = time.perf_counter()
+            await server.start(port=0)
+            print(f"server started in {time.perf_counter() - t0:.1f} s ({server.workers} workers)")
+            host, port = '127.0.0.1', server.port
+        try:
+            t0 = time.perf_counter()
+            results = await load_test(host, port, targets, args.concurrency)
+            seconds = time.perf_counter() - t0
+            reader, writer = await asyncio.open_connection(host, port)
+            _, health = await get(reader, writer, '/health')
+            writer.close()
+        finally:
+            if not args.url:
+                await server.close()
+                tmp_dir.cleanup()
+        return results, seconds, json.loads(health)
+
+    results, seconds, health = asyncio.run(run())
+    ok = [t for status, t in results if status == 200]
+    print(f"{len(results)} requests in {seconds:.1f} s: {len(results) / seconds:.2f} requests/s, "
+          f"{len(ok) / seconds:.2f} charts/s")
+    print(f"status codes: {dict(sorted(Counter(status for status, _ in results).items()))}")
+    if ok:
+        print(
+            f"latency (200): mean {1000 * statistics.mean(ok):.0f} ms, p50 {1000 * percentile(ok, 50):.0f} ms,"
+            f" p95 {1000 * percentile(ok, 95):.0f} ms, p99 {1000 * percentile(ok, 99):.0f} ms"
+        )
+    print(f"health: {json.dumps(health)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-chart cost of rendering + encoding (PNG) at each resolution tier natively
+(`image_params.RESOLUTIONS`, assets resized for the tier) vs. rendering at full resolution
+and downscaling the result, plus the time to load each tier's assets.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_resolution.py [-n CHARTS] [--tiers 512 1024]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+from PIL import Image
+import swisseph as swe
+
+from constants import EPHE_DIR, IMG_DIR, IMG_FILES
+from image_encoding import encode_image
+from image_params import RESOLUTIONS
+from natal_chart import BaseLayerCache, _generate
+import utils
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def mean_time(fn, args_list):
+    t0 = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - t0) / len(args_list)
+
+
+def load_tier(bg_size):
+    image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES, bg_size)
+    image_loader.load_all_images()
+    image_loader.resize_all_images()
+    return image_loader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10, help="number of charts per tier")
+    parser.add_argument("--tiers", type=int, nargs="+", default=[r for r in RESOLUTIONS if r != 'full'])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    charts = [(_utils.random_chart(),) for _ in range(args.n)]
+    bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+
+    t0 = time.perf_counter()
+    full_loader = load_tier(None)
+    t_load_full = time.perf_counter() - t0
+    full_layers = BaseLayerCache(full_loader)
+    full_layers.warm([bg_file])
+
+    def full_downscaled(chart, size):
+        im = _generate(chart, full_loader, bg_file, full_layers)
+        return encode_image(im.resize((size, size), Image.LANCZOS))
+
+    t_full = mean_time(lambda c: encode_image(_generate(c, full_loader, bg_file, full_layers)), charts)
+    print(f"{'tier':>6} {'load':>9} {'native':>14} {'full+downscale':>16} {'speedup':>8}")
+    print(f"{full_loader.bg_im_size:>6} {t_load_full:8.1f}s {1000 * t_full:11.1f} ms {'-':>16} {'-':>8}")
+
+    for size in args.tiers:
+        t0 = time.perf_counter()
+        image_loader = load_tier(size)
+        t_load = time.perf_counter() - t0
+        base_layers = BaseLayerCache(image_loader)
+        base_layers.warm([bg_file])
+        t_native = mean_time(lambda c: encode_image(_generate(c, image_loader, bg_file, base_layers)), charts)
+        t_downscaled = mean_time(lambda c: full_downscaled(c, size), charts)
+        print(
+            f"{size:>6} {t_load:8.1f}s {1000 * t_native:11.1f} ms {1000 * t_downscaled:13.1f} ms"
+            f" {t_downscaled / t_native:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start cost of loading all planet and sign glyphs (already resized),
+as individual PNGs vs. one sprite atlas, from disk and over HTTP (local server with
+artificial per-request latency).
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_sprite_atlas.py [--latency SECONDS] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+from PIL import Image
+import swisseph as swe
+
+from constants import EPHE_DIR, IMG_DIR, IMG_FILES, SPRITE_ATLAS_FILE
+import sprite_atlas
+import utils
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def load_files(image_dir, filenames):
+    for fname in filenames:
+        Image.open(Path(image_dir) / fname).load()
+
+
+def load_atlas(image_dir, filenames):
+    loader = sprite_atlas.AtlasImageLoader(_FileImageLoader(image_dir))
+    for fname in filenames:
+        loader.load(fname)
+
+
+def fetch_files(url, filenames):
+    utils.RemoteImageLoader(url, manifest=filenames).prefetch()
+
+
+def fetch_atlas(url, filenames):
+    loader = sprite_atlas.AtlasImageLoader(utils.RemoteImageLoader(url, manifest=[SPRITE_ATLAS_FILE]))
+    for fname in filenames:
+        loader.load(fname)
+
+
+class _FileImageLoader(utils.ImageLoader):
+    def __init__(self, image_dir):
+        self.image_dir = image_dir
+        self.image_cache = {}
+
+    def load(self, filename):
+        if filename not in self.image_cache:
+            im = Image.open(Path(self.image_dir) / filename)
+            im.load()
+            self.image_cache[filename] = im
+        return self.image_cache[filename]
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="per-request latency of the HTTP server (default: 0.02)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES)
+    image_loader.resize_all_images()
+    filenames = sprite_atlas.glyph_filenames()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for fname in filenames:
+            os.makedirs(os.path.join(temp_dir, os.path.dirname(fname)), exist_ok=True)
+            image_loader.load(fname).save(os.path.join(temp_dir, fname))
+        atlas, index = sprite_atlas.build_atlas(image_loader, filenames)
+        sprite_atlas.save_atlas(atlas, index, os.path.join(temp_dir, SPRITE_ATLAS_FILE))
+
+        results = [
+            ("disk, files", len(filenames), best_time(lambda: load_files(temp_dir, filenames), args.repeat)),
+            ("disk, atlas", 1, best_time(lambda: load_atlas(temp_dir, filenames), args.repeat)),
+        ]
+        with _utils.LocalHTTPServer(temp_dir, latency=args.latency) as server:
+            results += [
+                ("http, files", len(filenames), best_time(lambda: fetch_files(server.url, filenames), args.repeat)),
+                ("http, atlas", 1, best_time(lambda: fetch_atlas(server.url, filenames), args.repeat)),
+            ]
+
+    print(f"{len(filenames)} glyphs, atlas {atlas.size[0]}x{atlas.size[1]}px, latency {1000 * args.latency:.0f} ms/request")
+    for name, opens, t in results:
+        print(f"{name:<12} {opens:3d} opens/requests  {1000 * t:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
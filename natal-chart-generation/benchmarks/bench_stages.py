@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: times each stage of the render pipeline in isolation, on fixed seeded inputs,
+plus an end-to-end `_generate()`:
+
+    julian_day             ephemeris.julian_days (one record)
+    ephemeris              ephemeris.compute_positions_batch (one record, incl. houses)
+    houses                 houses.compute_houses_batch (one record)
+    find_clumps            utils.find_clumps
+    spread_planets         utils.spread_planets
+    place_objects          display_list.place_objects (layout of all glyphs and labels, no drawing)
+    set_background_layers  compositing background, wheel, house numbers and logo
+    draw_objects           the per-object paste/label loop of `_generate`
+    encode_png             image_encoding.encode_image (PNG, default settings)
+    generate               _generate end to end (composited base layers)
+
+Each stage is run `--repeat` times over the same inputs; the median and the minimum time per
+call are reported. Results can be written as JSON (`--json`) and compared against a previous
+JSON result (`--baseline`): a stage whose median got slower by more than `--threshold` (relative)
+is a regression, and the script exits with status 1.
+
+By default the full resolution assets in `images/` are used; `--synthetic` renders with small
+synthetic images instead (see `tests/_utils.SyntheticImageLoader`), e.g. on CI machines without
+the assets.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_stages.py --json baseline.json
+    ... make changes ...
+    python benchmarks/bench_stages.py --baseline baseline.json [--threshold 0.1]
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR, IMG_DIR, IMG_FILES
+import display_list
+import ephemeris
+import houses
+import image_encoding
+import natal_chart
+import utils
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def time_stage(fn, inputs, repeat):
+    """
+    Calls `fn(*args)` for all `inputs`, `repeat` times. Returns the median and minimum
+    time per call (seconds) over the repeats.
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for args in inputs:
+            fn(*args)
+        times.append((time.perf_counter() - t0) / len(inputs))
+    return statistics.median(times), min(times)
+
+
+def reset_layout(planets):
+    for p in planets:
+        p.dpos = p.abs_pos
+    return planets
+
+
+def build_stages(image_loader, n, seed):
+    """
+    Returns a dict {stage name: (function, list of argument tuples)} with seeded inputs.
+    """
+    random.seed(seed)
+    dts = [_utils.random_datetime().replace(tzinfo=None) for _ in range(n)]
+    locations = [_utils.random_location() for _ in range(n)]
+    jds = [ephemeris.julian_days([dt]) for dt in dts]
+    charts = natal_chart.charts_from_positions(
+        ephemeris.compute_positions_batch(dts, [lat for lat, _ in locations], [lon for _, lon in locations])
+    )
+    planet_lists = [list(chart.objects.values()) for chart in charts]
+    theta = utils.planet_theta()
+    bg_files = [natal_chart.random_asset(IMG_FILES['BACKGROUNDS']) for _ in range(n)]
+    ascs = [chart.objects['Asc'].sign for chart in charts]
+    base_layers = [natal_chart.set_background_layers(asc, bg, image_loader) for asc, bg in zip(ascs, bg_files)]
+    for planets in planet_lists:
+        utils.spread_planets(planets, theta)
+    charts_im = [natal_chart._generate(chart, image_loader, bg) for chart, bg in zip(charts, bg_files)]
+
+    return {
+        'julian_day': (ephemeris.julian_days, [([dt],) for dt in dts]),
+        'ephemeris': (
+            ephemeris.compute_positions_batch,
+            [([dt], [lat], [lon]) for dt, (lat, lon) in zip(dts, locations)],
+        ),
+        'houses': (
+            houses.compute_houses_batch,
+            [(jd, [lat], [lon]) for jd, (lat, lon) in zip(jds, locations)],
+        ),
+        'find_clumps': (utils.find_clumps, [(planets, theta) for planets in planet_lists]),
+        'spread_planets': (
+            lambda planets: utils.spread_planets(reset_layout(planets), theta),
+            [(planets,) for planets in planet_lists],
+        ),
+        'place_objects': (
+            display_list.place_objects,
+            [(planets, asc, bg_im.size, image_loader) for planets, asc, bg_im in zip(planet_lists, ascs, base_layers)],
+        ),
+        'set_background_layers': (
+            natal_chart.set_background_layers,
+            [(asc, bg, image_loader) for asc, bg in zip(ascs, bg_files)],
+        ),
+        # NOTE: draws onto the same layers again, the cost doesn't depend on the content
+        'draw_objects': (
+            natal_chart.draw_objects,
+            [(bg_im, planets, asc, image_loader) for bg_im, planets, asc in zip(base_layers, planet_lists, ascs)],
+        ),
+        'encode_png': (image_encoding.encode_image, [(im,) for im in charts_im]),
+        'generate': (
+            lambda chart, bg: natal_chart._generate(chart, image_loader, bg),
+            [(chart, bg) for chart, bg in zip(charts, bg_files)],
+        ),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints the comparison of `results` with `baseline`. Returns the names of the regressed stages.
+    """
+    regressions = []
+    print(f"\n{'stage':<22} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, stats in results['stages'].items():
+        if name not in baseline['stages']:
+            print(f"{name:<22} {'-':>12} {format_time(stats['median']):>12}")
+            continue
+        base = baseline['stages'][name]['median']
+        change = stats['median'] / base - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<22} {format_time(base):>12} {format_time(stats['median']):>12} {100 * change:+7.1f}%"
+            + ("  REGRESSION" if regressed else "")
+        )
+    return regressions
+
+
+def format_time(seconds):
+    if seconds >= 1e-3:
+        return f"{1e3 * seconds:.2f} ms"
+    return f"{1e6 * seconds:.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=5, help="number of seeded charts (inputs per stage)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage (default: 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", help="only run these stages")
+    parser.add_argument("--synthetic", action="store_true", help="use small synthetic images instead of the assets")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare with the results in this file")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="relative slowdown of a stage's median that counts as a regression (default: 0.2)"
+    )
+    args = parser.parse_args()
+
+    if args.synthetic:
+        image_loader = _utils.SyntheticImageLoader(bg_size=1024)
+    else:
+        image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES)
+        image_loader.load_all_images()
+        image_loader.resize_all_images()
+
+    stages = build_stages(image_loader, args.n, args.seed)
+    if args.stages:
+        unknown = set(args.stages) - set(stages)
+        if unknown:
+            parser.error(f"unknown stages: {sorted(unknown)}, must be in {list(stages)}")
+        stages = {name: stages[name] for name in args.stages}
+
+    results = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'bg_size': image_loader.bg_im_size,
+            'synthetic': args.synthetic,
+            'n': args.n,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'stages': {},
+    }
+    print(f"{'stage':<22} {'median':>12} {'min':>12}")
+    for name, (fn, inputs) in stages.items():
+        median, best = time_stage(fn, inputs, args.repeat)
+        results['stages'][name] = {'median': median, 'min': best}
+        print(f"{name:<22} {format_time(median):>12} {format_time(best):>12}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ('bg_size', 'synthetic'):
+            if baseline['meta'].get(key) != results['meta'][key]:
+                print(f"WARNING: baseline was run with {key}={baseline['meta'].get(key)}")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {100 * args.threshold:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start cost, each measurement in a fresh interpreter.
+
+- import: `import natal_chart` (`python -X importtime`), with the slowest modules.
+- first chart: wall-clock time from interpreter start (before any import)
+  to the first chart rendered with `generate(..., local=True)`.
+
+Exits with status 1 if a time exceeds its budget, or if a module that is
+supposed to be imported lazily (`LAZY_MODULES`) is loaded by `import natal_chart`.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_startup.py [--import-budget MS] [--first-chart-budget MS] [--repeat N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# slow to import & not needed for every chart, must not be imported by `import natal_chart`
+LAZY_MODULES = ('requests', 'boto3', 'pytz', 'multiprocessing')
+
+FIRST_CHART_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+import natal_chart
+t1 = time.perf_counter()
+lazy_loaded = [m for m in %r if m in sys.modules]
+natal_chart.generate('1994-01-11T07:33:00', '44.20169,17.90397', local=True)
+t2 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'first_chart': t2 - t0, 'lazy_loaded': lazy_loaded}))
+""" % (LAZY_MODULES,)
+
+
+def import_times():
+    """
+    Returns the cumulative import time of `natal_chart` and a list of (self time, module) tuples, in seconds.
+    """
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import natal_chart'],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True,
+    ).stderr
+    total = None
+    modules = []
+    for line in out.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((int(self_us) / 1e6, name.strip()))
+        if name.strip() == 'natal_chart':
+            total = int(cumulative_us) / 1e6
+    return total, sorted(modules, reverse=True)
+
+
+def first_chart_times():
+    out = subprocess.run(
+        [sys.executable, '-c', FIRST_CHART_SCRIPT],
+        stdout=subprocess.PIPE, universal_newlines=True, check=True,
+    ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--import-budget", type=float, default=250, help="budget of `import natal_chart`, in ms (default: 250)")
+    parser.add_argument("--first-chart-budget", type=float, default=6000, help="budget of the first chart, in ms (default: 6000)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the fastest one is reported")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest modules to show")
+    args = parser.parse_args()
+    # run the children from the package directory, like this script
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    runs = [import_times() for _ in range(args.repeat)]
+    t_import, modules = min(runs, key=lambda run: run[0])
+    print(f"import natal_chart: {1000 * t_import:8.1f} ms (budget {args.import_budget:.0f} ms)")
+    for self_time, name in modules[:args.top]:
+        print(f"    {1000 * self_time:8.1f} ms  {name}")
+
+    charts = [first_chart_times() for _ in range(args.repeat)]
+    chart = min(charts, key=lambda c: c['first_chart'])
+    print(f"first chart:        {1000 * chart['first_chart']:8.1f} ms (budget {args.first_chart_budget:.0f} ms)"
+          f", of which imports {1000 * chart['import']:.1f} ms")
+
+    failures = []
+    if 1000 * t_import > args.import_budget:
+        failures.append("import time over budget")
+    if 1000 * chart['first_chart'] > args.first_chart_budget:
+        failures.append("first chart over budget")
+    if chart['lazy_loaded']:
+        failures.append(f"lazy modules imported by natal_chart: {chart['lazy_loaded']}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
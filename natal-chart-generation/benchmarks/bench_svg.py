@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-chart time and output size of the SVG backend (`generate(format='svg')`: layout and
+SVG serialization, see `svg_chart.py`) vs. rendering the raster chart (with cached base layers) and
+encoding it (PNG, lossy WebP).
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_svg.py [-n CHARTS] [--resolution full]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR, IMG_FILES
+from image_encoding import encode_image
+import natal_chart
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def mean_time(fn, args_list):
+    t0 = time.perf_counter()
+    results = [fn(*args) for args in args_list]
+    return (time.perf_counter() - t0) / len(args_list), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=50, help="number of charts")
+    parser.add_argument("--resolution", default="full", help="resolution tier (default: full)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    resolution = args.resolution if args.resolution == 'full' else int(args.resolution)
+
+    random.seed(args.seed)
+    positions = [
+        {name: p.abs_pos for name, p in _utils.random_chart().objects.items()} for _ in range(args.n)
+    ]
+    image_loader = natal_chart.get_local_image_loader(resolution)
+    base_layers = natal_chart.get_local_base_layers(resolution)
+    bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+
+    def charts():
+        # fresh charts, the layout changes the display positions
+        return [(_utils.create_mock_natal_chart([p[name] for name in natal_chart.NatalChart.required_objects]),) for p in positions]
+
+    # warm up (label atlas, base layer)
+    natal_chart._generate_svg(charts()[0][0], image_loader, bg_file)
+    natal_chart._generate(charts()[0][0], image_loader, bg_file, base_layers)
+
+    t_svg, svgs = mean_time(lambda c: natal_chart._generate_svg(c, image_loader, bg_file), charts())
+    t_render, images = mean_time(lambda c: natal_chart._generate(c, image_loader, bg_file, base_layers), charts())
+    print(f"{'output':<22} {'ms/chart':>9} {'KB':>9}")
+    print(f"{'svg':<22} {1000 * t_svg:>9.3f} {statistics.mean(len(s.encode()) for s in svgs) / 1000:>9.1f}")
+    print(f"{'raster (render only)':<22} {1000 * t_render:>9.3f} {'':>9}")
+    for fmt in ['png', 'webp']:
+        t_encode, encoded = mean_time(lambda im: encode_image(im, fmt), [(im,) for im in images[:10]])
+        print(
+            f"{'raster + ' + fmt:<22} {1000 * (t_render + t_encode):>9.3f}"
+            f" {statistics.mean(e.size for e in encoded) / 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local time -> UT conversion (see `timezones.py`). Lookups/second of:
+
+    zone_at        one binary search per location
+    zone_ids_at    all locations at once (numpy)
+    to_ut          one conversion per record (lookup + pytz)
+    to_ut_batch    all records at once (how `batch` and `render_pool` convert)
+
+and the time to load the index.
+
+Run from the `natal-chart-generation` directory:
+    python benchmarks/bench_timezones.py [-n LOCATIONS]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import swisseph as swe
+
+from constants import EPHE_DIR
+import timezones
+import _utils
+
+# `_utils` expects to be run from the tests directory
+swe.set_ephe_path(EPHE_DIR)
+
+
+def best_time(fn, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=100000, help="number of locations")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = timezones.get_index()
+    load_time = time.perf_counter() - t0
+
+    random.seed(args.seed)
+    lons, lats = zip(*[_utils.random_location() for _ in range(args.n)])
+    dts = [_utils.random_datetime() for _ in range(args.n)]
+    # warm up (pytz zones)
+    timezones.to_ut_batch(dts, lats, lons)
+
+    rows = []
+    t, expected = best_time(lambda: [index.zone_at(lat, lon) for lat, lon in zip(lats, lons)], args.repeat)
+    rows.append(('zone_at', t))
+    t, zones = best_time(lambda: index.zones_at(lats, lons), args.repeat)
+    rows.append(('zone_ids_at', t))
+    assert zones == expected
+    t, expected = best_time(lambda: [timezones.to_ut(dt, lat, lon) for dt, lat, lon in zip(dts, lats, lons)], args.repeat)
+    rows.append(('to_ut', t))
+    t, uts = best_time(lambda: timezones.to_ut_batch(dts, lats, lons), args.repeat)
+    rows.append(('to_ut_batch', t))
+    assert uts == expected
+
+    print(f"index: {len(index.zone_names)} timezones, {len(index.keys)} runs, loaded in {1000 * load_time:.1f} ms")
+    print(f"{'':<14} {'per second':>12} {'us each':>9}")
+    for name, t in rows:
+        print(f"{name:<14} {args.n / t:>12,.0f} {1e6 * t / args.n:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Chart requests, shared by the Lambda handler (`cdk/lambda/lambda.py`) and the render server
+(`render_server.py`): both take the same query parameters and answer with the same response
+shape (an API Gateway Lambda proxy response).
+
+Query parameters:
+    - local_time, location: The birth data, see `natal_chart.generate`.
+    - format, compress_level, quality: The output format, see `image_encoding.encode_image`. (default: PNG)
+    - resolution: The chart size, one of `image_params.RESOLUTIONS`. (default: 'full')
+
+Example usage:
+    try:
+        request = parse_request(event['queryStringParameters'])
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+    url = cache.get(request.filename)
+    ...
+    return response(200, {'url': url})
+"""
+from collections import namedtuple
+import json
+
+import ephemeris
+from image_encoding import OUTPUT_FORMATS, check_output_params
+from image_params import RESOLUTIONS
+from natal_chart import parse_birth_data
+import render_cache
+
+# - local_time, location: The query parameters, as passed to `natal_chart.generate`.
+# - output_params: Arguments of `image_encoding.encode_image`.
+# - resolution: One of `image_params.RESOLUTIONS`.
+# - ephemeris_backend: One of `ephemeris.EPHEMERIS_BACKENDS`.
+# - bg_file: The background, seeded from the request (see `render_cache.seeded_background`).
+# - filename: The content-addressed filename of the chart (render key + extension).
+ChartRequest = namedtuple('ChartRequest', [
+    'local_time', 'location', 'output_params', 'resolution', 'ephemeris_backend', 'bg_file', 'filename',
+])
+
+def parse_resolution(value):
+    """
+    Parses a resolution query parameter ('512', ..., 'full').
+    """
+    resolution = int(value) if value.isdigit() else value
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Invalid resolution: {value}. Must be one of {RESOLUTIONS}.")
+    return resolution
+
+def parse_request(params, ephemeris_backend='swisseph'):
+    """
+    Validates the query parameters of a chart request and computes the filename of its chart.
+
+    Args:
+        params (dict): The query parameters (strings).
+        ephemeris_backend (str, optional): The ephemeris backend of the server, part of the render key.
+
+    Returns:
+        ChartRequest
+
+    Raises:
+        ValueError: If a parameter is missing or invalid.
+    """
+    params = params or {}
+    for name in ('local_time', 'location'):
+        if name not in params:
+            raise ValueError(f"Missing query parameter: {name}.")
+    # output format (default: PNG), validated before rendering
+    output_params = {
+        'fmt': params.get('format', 'png'),
+        'compress_level': int(params.get('compress_level', 6)),
+        'quality': int(params.get('quality', 80)),
+    }
+    check_output_params(**output_params)
+    dt, lat, lon = parse_birth_data(params['local_time'], params['location'])
+    # chart size in pixels (default: full resolution)
+    resolution = parse_resolution(params.get('resolution', 'full'))
+
+    # content-addressed filename: the same request is only rendered and uploaded once
+    # NOTE: keyed by the Julian day in UT (`local_time` converted with the timezone of the location),
+    # so the same birth moment given in different UTC offsets maps to the same chart
+    jd = float(ephemeris.julian_days([dt])[0])
+    render_params = dict(output_params, ephemeris_backend=ephemeris_backend, resolution=resolution)
+    bg_file = render_cache.seeded_background(jd, lat, lon, render_params)
+    key = render_cache.render_key(jd, lat, lon, bg_file, render_params)
+    return ChartRequest(
+        local_time=params['local_time'],
+        location=params['location'],
+        output_params=output_params,
+        resolution=resolution,
+        ephemeris_backend=ephemeris_backend,
+        bg_file=bg_file,
+        filename=f"{key}.{OUTPUT_FORMATS[output_params['fmt']][2]}",
+    )
+
+def response(status_code, body, headers=None):
+    """
+    Returns a Lambda proxy response with a JSON `body`.
+    """
+    return {
+        'statusCode': status_code,
+        'headers': dict({'Content-Type': 'text/plain'}, **(headers or {})),
+        'body': json.dumps(body),
+    }
@@ -74,3 +74,18 @@ IMG_FILES = {
     }
 }
 
+
+# precomputed ephemeris table, see `ephemeris_table.py`
+EPHE_TABLE_FILE = 'ephe/planet_table.bin'
+
+# all planet and sign glyphs packed into one image (relative to IMG_DIR), see `sprite_atlas.py`
+SPRITE_ATLAS_FILE = 'sprite_atlas.png'
+
+# resized, uncompressed assets, see `asset_bundle.py`
+ASSET_BUNDLE_FILE = 'assets.bundle'
+
+# SVG sprite sheet of the planet and sign glyphs (relative to IMG_DIR), see `svg_chart.py`
+SVG_SPRITE_SHEET_FILE = 'glyphs.svg'
+
+# timezone index (bundled, built from the timezone-boundary-builder polygons), see `timezones.py`
+TIMEZONE_INDEX_FILE = 'tz/timezones.bin'
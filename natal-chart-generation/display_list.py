@@ -0,0 +1,177 @@
+"""
+Layout stage of a chart: where every glyph and label goes, separately from drawing it.
+
+`place_objects` computes the placements of all items of a chart (a planet glyph, a sign glyph and a
+degree label per object, 39 for a full chart) in one vectorized pass. A `DisplayList` holds them with
+what is needed to draw the chart (its size, ascendant sign and background) and is plain data: it can be
+serialized (`to_json`, `from_json`), cached, diffed (`dirty_rects`), sent to a client, and replayed by a
+backend, e.g. `draw` (raster, see `natal_chart.rasterize`) or `svg_chart.chart_svg`.
+
+Example usage:
+    display = natal_chart.layout_chart(chart, image_loader, bg_file)
+    im = natal_chart.rasterize(display, image_loader, base_layers)
+    data = to_json(display)
+"""
+from collections import namedtuple
+import json
+import math
+
+import numpy as np
+
+from constants import SIGNS
+import image_params
+import labels
+
+# the items of an object, in drawing order, and their distance from the center (fraction of the chart height)
+LAYERS = ('planet', 'sign', 'label')
+LAYER_RADII = (image_params.PLANET_RADIUS, image_params.SIGN_RADIUS, image_params.TEXT_RADIUS)
+
+# one drawn item of a chart:
+# - name: the name of the object (planet or angle) the item belongs to
+# - layer: one of LAYERS
+# - asset: the image filename of a glyph, or the degree of a label
+# - x, y: where the item is pasted (top left corner of a glyph, text origin of a label)
+# - box: the (left, top, right, bottom) box of the pixels the item draws on
+Placement = namedtuple('Placement', ['name', 'layer', 'asset', 'x', 'y', 'box'])
+
+# the layout of a chart:
+# - size: (width, height) of the chart in pixels
+# - asc: the ascendant sign, which rotates the zodiac wheel
+# - bg_file: the background, one of IMG_FILES['BACKGROUNDS']
+# - placements: the Placements of all items, in drawing order
+DisplayList = namedtuple('DisplayList', ['size', 'asc', 'bg_file', 'placements'])
+
+
+def place_objects(objects, asc, size, image_loader):
+    """
+    Returns the Placements of the planet glyph, sign glyph and degree label of each object, in drawing
+    order, at the objects' display positions (`dpos`) on a chart of `size` with ascendant sign `asc`.
+
+    The positions are the ones of `natal_chart.add_object` (`get_center`, `get_coordinates`, rounded to
+    whole pixels), computed for all items at once.
+    """
+    objects = list(objects)
+    width, height = size
+    # pre-rasterized degree labels (font is loaded once per process and resolution)
+    text_size = image_params.text_size(height)
+    label_atlas = labels.get_label_atlas(text_size)
+
+    # one row per item: planet, sign and label of each object
+    assets, item_sizes = [], []
+    for p in objects:
+        planet, sign = p.images['planet'], p.images['sign']
+        assets += [planet, sign, math.floor(p.position)]
+        item_sizes += [image_loader.load(planet).size, image_loader.load(sign).size, (text_size, text_size)]
+    sizes = np.array(item_sizes, dtype=np.int64).reshape(-1, 2)
+    # center of the circle for each item (see `natal_chart.get_center`)
+    a = (width - sizes[:, 0]) // 2
+    b = (height - sizes[:, 1]) // 2
+    r = np.tile(LAYER_RADII, len(objects)) * height
+    # position of 0 degree Aries, then rotated by the display position (see `natal_chart.get_coordinates`)
+    deg = -90 - SIGNS.index(asc) * 30
+    x = a + r * math.sin(math.radians(deg))
+    y = b + r * math.cos(math.radians(deg))
+    theta = np.radians(np.repeat([p.dpos for p in objects], len(LAYERS)))
+    cos_theta = np.cos(theta)
+    sin_theta = np.sin(theta)
+    u = np.rint(a + (x - a) * cos_theta + (y - b) * sin_theta).astype(np.int64).tolist()
+    v = np.rint(b - (x - a) * sin_theta + (y - b) * cos_theta).astype(np.int64).tolist()
+
+    placements = []
+    for i, p in enumerate(objects):
+        for j, layer in enumerate(LAYERS):
+            k = len(LAYERS) * i + j
+            if layer == 'label':
+                mask, (left, top) = label_atlas.masks[assets[k]]
+                box = (u[k] + left, v[k] + top, u[k] + left + mask.size[0], v[k] + top + mask.size[1])
+            else:
+                w, h = item_sizes[k]
+                box = (u[k], v[k], u[k] + w, v[k] + h)
+            placements.append(Placement(p.name, layer, assets[k], u[k], v[k], box))
+    return placements
+
+
+def draw(im, placements, image_loader):
+    """
+    Draws `placements` onto the chart `im` (an RGB image, modified in place), in order.
+    """
+    draw_region(im, (0, 0) + im.size, placements, image_loader, im.size[1])
+
+
+def draw_region(im, rect, placements, image_loader, chart_height):
+    """
+    Draws the placements that overlap `rect` (left, top, right, bottom) onto `im`, a region of that
+    size cut out of a chart of height `chart_height` (e.g. `base_layer.crop(rect)`).
+    """
+    label_atlas = labels.get_label_atlas(image_params.text_size(chart_height))
+    left, top = rect[:2]
+    for p in placements:
+        if not overlaps(p.box, rect):
+            continue
+        if p.layer == 'label':
+            label_atlas.paste(im, (p.x - left, p.y - top), p.asset)
+        else:
+            glyph = image_loader.load(p.asset)
+            im.paste(glyph, (p.x - left, p.y - top), glyph)
+
+
+def dirty_rects(old, new, size):
+    """
+    Returns the regions to repaint to turn a chart with placements `old` into one with placements
+    `new`: the boxes of all items that differ (old and new positions), clipped to an image of
+    `size` and merged until no two regions overlap. Returns None if the charts don't draw the
+    same items (objects and layers, in the same order).
+    """
+    if len(old) != len(new) or any(a[:2] != b[:2] for a, b in zip(old, new)):
+        return None
+    width, height = size
+    rects = []
+    for a, b in zip(old, new):
+        if a != b:
+            for (left, top, right, bottom) in (a.box, b.box):
+                rect = (max(left, 0), max(top, 0), min(right, width), min(bottom, height))
+                if rect[0] < rect[2] and rect[1] < rect[3]:
+                    rects.append(rect)
+    merged = []
+    for rect in rects:
+        # absorb the merged regions this one overlaps, until it overlaps none of them
+        i = 0
+        while i < len(merged):
+            if overlaps(rect, merged[i]):
+                other = merged.pop(i)
+                rect = (min(rect[0], other[0]), min(rect[1], other[1]), max(rect[2], other[2]), max(rect[3], other[3]))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
+def overlaps(a, b):
+    """
+    Returns whether two (left, top, right, bottom) boxes overlap.
+    """
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def to_json(display_list):
+    """
+    Serializes a DisplayList as compact JSON, placements as arrays:
+        {"size": [w, h], "asc": "Leo", "bg_file": "...", "placements": [[name, layer, asset, x, y, [box]], ...]}
+    """
+    return json.dumps(display_list._asdict(), separators=(',', ':'), ensure_ascii=False)
+
+
+def from_json(data):
+    """
+    Returns the DisplayList serialized by `to_json`.
+    """
+    d = json.loads(data)
+    return DisplayList(
+        size=tuple(d['size']),
+        asc=d['asc'],
+        bg_file=d['bg_file'],
+        placements=[
+            Placement(name, layer, asset, x, y, tuple(box)) for name, layer, asset, x, y, box in d['placements']
+        ],
+    )
@@ -0,0 +1,147 @@
+"""
+Batch ephemeris calculations.
+
+Computes the positions of all chart objects (the bodies in `PLANET_NAMES` plus
+the Ascendant and Midheaven) for many birth records in a single call.
+Inputs are converted to Julian days with NumPy, and the results are returned as
+arrays with one row per record and one column per object (see `OBJECT_NAMES`).
+
+NOTE: The Swiss Ephemeris has no vectorized API, so with the default 'swisseph'
+backend bodies are still looked up with one `swe.calc_ut` call per body and record.
+Everything around those calls (date conversion, sign/degree split, chart bookkeeping)
+is done on whole arrays. The 'table' backend interpolates a precomputed,
+memory-mapped table instead (see `ephemeris_table.py`).
+"""
+from collections import namedtuple
+from datetime import timezone
+
+import numpy as np
+import swisseph as swe
+
+from constants import PLANET_NAMES
+import ephemeris_table
+import houses
+
+# column order of the position arrays
+OBJECT_NAMES = tuple(PLANET_NAMES.keys()) + ('Asc', 'Mc')
+
+# see `positions_from_julian_days`
+EPHEMERIS_BACKENDS = ('swisseph', 'table')
+
+# Julian day number of the Unix epoch (1970-01-01T00:00:00 UT)
+UNIX_EPOCH_JD = 2440587.5
+_EPOCH = np.datetime64('1970-01-01T00:00:00', 'us')
+_DAY = np.timedelta64(86400 * 10**6, 'us')
+
+# Positions of all objects for a batch of charts:
+# - jd: (n,) array of Julian days (UT).
+# - abs_pos: (n, 13) array of absolute ecliptic longitudes in degrees, columns ordered as `OBJECT_NAMES`.
+# - signs: (n, 13) array of sign indices into `constants.SIGNS`.
+# - degrees: (n, 13) array of positions within the sign, between 0 (inclusive) and 30 (exclusive).
+# - cusps: (n, 12) array of house cusps in degrees (see `houses.compute_houses_batch`).
+PositionBatch = namedtuple('PositionBatch', ['jd', 'abs_pos', 'signs', 'degrees', 'cusps'])
+
+def julian_days(datetimes):
+    """
+    Converts datetimes to Julian days (UT).
+
+    Args:
+        datetimes: An iterable of `datetime.datetime` or `numpy.datetime64` values.
+            Naive datetimes are interpreted as UT, timezone-aware ones are converted to UT.
+
+    Returns:
+        numpy.ndarray: A float64 array of Julian days.
+
+    Note:
+        Equivalent to `swe.julday(year, month, day, hour)` (Gregorian calendar),
+        but computed for the whole array at once.
+    """
+    if not isinstance(datetimes, np.ndarray):
+        datetimes = [
+            dt.astimezone(timezone.utc).replace(tzinfo=None)
+            if getattr(dt, 'tzinfo', None) else dt
+            for dt in datetimes
+        ]
+    dts = np.asarray(datetimes, dtype='datetime64[us]')
+    return (dts - _EPOCH) / _DAY + UNIX_EPOCH_JD
+
+def compute_positions_batch(datetimes, lats, lons, backend='swisseph', house_system='whole_sign'):
+    """
+    Computes the positions of all chart objects for many birth records at once.
+
+    Args:
+        datetimes: An iterable of birth times (see `julian_days`).
+        lats: An iterable of latitudes, one per record.
+        lons: An iterable of longitudes, one per record.
+        backend (optional): The ephemeris backend used for the planets, see `positions_from_julian_days`.
+        house_system (str, optional): One of `houses.HOUSE_SYSTEMS`. (default: 'whole_sign')
+
+    Returns:
+        PositionBatch: The positions of all 13 objects for every record.
+
+    Raises:
+        ValueError: If the input arrays have different lengths, or the backend/house system is unknown.
+
+    Example usage:
+        compute_positions_batch([datetime(2022, 1, 1, 12)], [40.7128], [-74.0060])
+    """
+    jd = julian_days(datetimes)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if not (jd.shape == lats.shape == lons.shape) or jd.ndim != 1:
+        raise ValueError(
+            "datetimes, lats and lons must be one-dimensional and of equal length."
+        )
+    return positions_from_julian_days(jd, lats, lons, backend, house_system)
+
+def positions_from_julian_days(jd, lats, lons, backend='swisseph', house_system='whole_sign'):
+    """
+    Same as `compute_positions_batch`, but takes Julian days (UT) instead of datetimes.
+
+    Args:
+        backend (optional): One of `EPHEMERIS_BACKENDS` or an `ephemeris_table.EphemerisTable`.
+            - 'swisseph': one `swe.calc_ut` call per body and record (default).
+            - 'table': interpolate the process-wide precomputed table (`ephemeris_table.get_table`).
+            Records outside the range of the table fall back to the Swiss Ephemeris.
+
+    Raises:
+        ValueError: If the backend or house system is unknown.
+    """
+    n = len(jd)
+    abs_pos = np.empty((n, len(OBJECT_NAMES)), dtype=np.float64)
+
+    if isinstance(backend, ephemeris_table.EphemerisTable):
+        table = backend
+    elif backend == 'table':
+        table = ephemeris_table.get_table()
+    elif backend == 'swisseph':
+        table = None
+    else:
+        raise ValueError(
+            f"Invalid ephemeris backend: {backend}."
+            f" Must be one of {EPHEMERIS_BACKENDS}."
+        )
+
+    if table is not None:
+        inside = table.contains(jd)
+        cols = [table.body_numbers.index(no_body) for no_body in PLANET_NAMES.values()]
+        abs_pos[inside, :len(PLANET_NAMES)] = table.longitudes(jd[inside])[:, cols]
+        missing = np.flatnonzero(~inside)
+    else:
+        missing = np.arange(n)
+
+    jd_list = jd[missing].tolist()
+    for col, no_body in enumerate(PLANET_NAMES.values()):
+        # speeds are not needed, so skip computing them
+        abs_pos[missing, col] = [
+            swe.calc_ut(t, no_body, swe.FLG_SWIEPH)[0][0] for t in jd_list
+        ]
+
+    # add angles
+    house_batch = houses.compute_houses_batch(jd, lats, lons, house_system)
+    abs_pos[:, len(PLANET_NAMES)] = house_batch.asc
+    abs_pos[:, len(PLANET_NAMES) + 1] = house_batch.mc
+
+    signs = (abs_pos // 30).astype(np.int64) % 12
+    degrees = abs_pos % 30
+    return PositionBatch(jd, abs_pos, signs, degrees, house_batch.cusps)
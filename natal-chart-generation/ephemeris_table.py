@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Precomputed ephemeris table.
+
+The positions of the bodies in `PLANET_NAMES` only depend on time, so they can be
+tabulated once (offline) and looked up without calling the Swiss Ephemeris.
+The table stores the longitude and speed of every body at a fixed time step as
+float32 values and is memory-mapped when loaded. Positions in between two nodes
+are computed with cubic Hermite interpolation (longitudes + speeds).
+
+Accuracy (1900-2100, 1 day step, 100k random instants vs. `swe.calc_ut`):
+    Sun 1.5e-5, Moon 1.8e-4, North Node 1.9e-4, Mars 8.6e-5, Venus 5.2e-4,
+    Chiron 6.0e-4, Jupiter 8.5e-4, Uranus 1.7e-3, Saturn 2.2e-3, Neptune 2.3e-3,
+    Pluto 3.6e-3 (max. absolute error, in degrees).
+
+The larger errors of the outer planets are not caused by the interpolation:
+only `seas_18.se1` is shipped, so the Swiss Ephemeris falls back to the Moshier
+ephemeris for the planets, whose output has small jumps (a few 1e-3 degrees).
+All errors are far below what is visible on the chart (a glyph spans ~5 degrees)
+and only affect the printed degree label if a body lies within that distance
+of a whole degree. Re-run the check with `--check N` after rebuilding.
+
+File format (little-endian):
+    - header: magic (8 bytes), jd0 (float64), step (float64), rows (uint32), bodies (uint32)
+    - body numbers: `bodies` x int32
+    - data: `rows` x `bodies` x 2 float32 values (longitude, speed)
+
+Usage:
+    python ephemeris_table.py [--start 1900] [--end 2100] [--step 1.0] [--out ephe/planet_table.bin] [--check 10000]
+"""
+import argparse
+import struct
+
+import numpy as np
+import swisseph as swe
+
+from constants import EPHE_DIR, EPHE_TABLE_FILE, PLANET_NAMES
+
+MAGIC = b'NCEPHT01'
+_HEADER = struct.Struct('<8sddII')
+# time offset (in days) used to compute speeds
+_SPEED_DT = 0.01
+
+
+class EphemerisTable:
+    """
+    Attributes:
+        - jd0: Julian day (UT) of the first row.
+        - step: Time between two rows, in days.
+        - body_numbers: A list of Swiss Ephemeris body numbers, one per table column.
+        - data: A (rows, bodies, 2) float32 array of (longitude, speed) values (usually memory-mapped).
+    """
+
+    def __init__(self, jd0, step, body_numbers, data):
+        self.jd0 = jd0
+        self.step = step
+        self.body_numbers = list(body_numbers)
+        self.data = data
+
+    @property
+    def jd_range(self):
+        """
+        Returns the (first, last) Julian day covered by the table.
+        """
+        return self.jd0, self.jd0 + (len(self.data) - 1) * self.step
+
+    def contains(self, jd):
+        """
+        Returns a boolean array, True where `jd` lies inside the table range.
+        """
+        first, last = self.jd_range
+        jd = np.asarray(jd, dtype=np.float64)
+        return (jd >= first) & (jd <= last)
+
+    def longitudes(self, jd):
+        """
+        Interpolates the longitudes of all tabulated bodies.
+
+        Args:
+            jd: An array of Julian days (UT), all inside `jd_range`.
+
+        Returns:
+            numpy.ndarray: A (n, bodies) float64 array of longitudes in degrees, between 0 and 360.
+
+        Raises:
+            ValueError: If any Julian day lies outside the table range.
+        """
+        jd = np.asarray(jd, dtype=np.float64)
+        if not self.contains(jd).all():
+            raise ValueError(
+                f"Julian day out of table range {self.jd_range}."
+            )
+        x = (jd - self.jd0) / self.step
+        i = np.minimum(x.astype(np.int64), len(self.data) - 2)
+        t = (x - i)[:, None]
+
+        node0 = self.data[i].astype(np.float64)
+        node1 = self.data[i + 1].astype(np.float64)
+        lon0, speed0 = node0[..., 0], node0[..., 1]
+        lon1, speed1 = node1[..., 0], node1[..., 1]
+        # unwrap across 0/360 degrees (no body moves more than 180 degrees per step)
+        delta = (lon1 - lon0 + 180) % 360 - 180
+
+        # cubic Hermite basis
+        t2 = t * t
+        t3 = t2 * t
+        h10 = t3 - 2 * t2 + t
+        h01 = -2 * t3 + 3 * t2
+        h11 = t3 - t2
+        offset = h01 * delta + self.step * (h10 * speed0 + h11 * speed1)
+        return (lon0 + offset) % 360
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, self.jd0, self.step, len(self.data), len(self.body_numbers)))
+            f.write(np.asarray(self.body_numbers, dtype='<i4').tobytes())
+            f.write(np.ascontiguousarray(self.data, dtype='<f4').tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps a table written by `save`.
+
+        Raises:
+            ValueError: If the file is not an ephemeris table.
+        """
+        with open(path, 'rb') as f:
+            magic, jd0, step, rows, bodies = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an ephemeris table.")
+            body_numbers = np.frombuffer(f.read(4 * bodies), dtype='<i4').tolist()
+        data = np.memmap(
+            path, dtype='<f4', mode='r',
+            offset=_HEADER.size + 4 * bodies,
+            shape=(rows, bodies, 2),
+        )
+        return cls(jd0, step, body_numbers, data)
+
+
+def build_table(start_year=1900, end_year=2100, step=1.0, body_numbers=None):
+    """
+    Tabulates longitudes and speeds with the Swiss Ephemeris.
+
+    Args:
+        start_year (int): First year covered by the table (from January 1st).
+        end_year (int): Last year covered by the table (until December 31st).
+        step (float): Time between two rows, in days.
+        body_numbers (list, optional): Swiss Ephemeris body numbers. Defaults to all `PLANET_NAMES` bodies.
+
+    Returns:
+        EphemerisTable: An in-memory table.
+    """
+    if body_numbers is None:
+        body_numbers = list(PLANET_NAMES.values())
+    jd0 = swe.julday(start_year, 1, 1, 0.0)
+    jd1 = swe.julday(end_year + 1, 1, 1, 0.0)
+    rows = int(np.ceil((jd1 - jd0) / step)) + 1
+    data = np.empty((rows, len(body_numbers), 2), dtype=np.float32)
+    h = _SPEED_DT
+    for row in range(rows):
+        jd = jd0 + row * step
+        for col, no_body in enumerate(body_numbers):
+            lon = swe.calc_ut(jd, no_body, swe.FLG_SWIEPH)[0][0]
+            # NOTE: speeds are central differences, since the speeds returned by
+            # `swe.calc_ut(..., FLG_SPEED)` occasionally jump (seen for Pluto & co.)
+            before = swe.calc_ut(jd - h, no_body, swe.FLG_SWIEPH)[0][0]
+            after = swe.calc_ut(jd + h, no_body, swe.FLG_SWIEPH)[0][0]
+            speed = ((after - before + 180) % 360 - 180) / (2 * h)
+            data[row, col] = (lon, speed)
+    return EphemerisTable(jd0, step, body_numbers, data)
+
+
+def max_error(table, n=10000, seed=0):
+    """
+    Compares the table against `swe.calc_ut` at `n` random instants.
+
+    Returns:
+        dict: The maximum absolute error in degrees, per body number.
+    """
+    rng = np.random.default_rng(seed)
+    first, last = table.jd_range
+    jd = rng.uniform(first, last, n)
+    approx = table.longitudes(jd)
+    errors = {}
+    for col, no_body in enumerate(table.body_numbers):
+        exact = np.array([swe.calc_ut(t, no_body, swe.FLG_SWIEPH)[0][0] for t in jd.tolist()])
+        diff = np.abs((approx[:, col] - exact + 180) % 360 - 180)
+        errors[no_body] = float(diff.max())
+    return errors
+
+
+# loaded once per process, see `get_table`
+_table = None
+
+def get_table(path=EPHE_TABLE_FILE):
+    """
+    Returns the process-wide table, memory-mapping it on first use.
+    """
+    global _table
+    if _table is None:
+        _table = EphemerisTable.load(path)
+    return _table
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the precomputed ephemeris table used by the 'table' ephemeris backend."
+    )
+    parser.add_argument("--start", type=int, default=1900, help="first year (default: 1900)")
+    parser.add_argument("--end", type=int, default=2100, help="last year (default: 2100)")
+    parser.add_argument("--step", type=float, default=1.0, help="table step in days (default: 1.0)")
+    parser.add_argument("--out", default=EPHE_TABLE_FILE, help=f"output file (default: {EPHE_TABLE_FILE})")
+    parser.add_argument("--check", type=int, default=0, metavar="N",
+                        help="report the max interpolation error at N random instants")
+    args = parser.parse_args()
+
+    swe.set_ephe_path(EPHE_DIR)
+    table = build_table(args.start, args.end, args.step)
+    table.save(args.out)
+    print(f"Wrote {len(table.data)} rows x {len(table.body_numbers)} bodies to {args.out}")
+
+    if args.check:
+        names = {v: k for k, v in PLANET_NAMES.items()}
+        for no_body, err in max_error(table, args.check).items():
+            print(f"{names.get(no_body, no_body):>12}: max error {err:.2e} deg")
+
+
+if __name__ == "__main__":
+    main()
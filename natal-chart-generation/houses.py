@@ -0,0 +1,106 @@
+"""
+Batch house and angle calculations.
+
+Computes the Ascendant, Midheaven and the 12 house cusps for many
+(Julian day, latitude, longitude) triples in one call.
+
+The only time-dependent inputs are the sidereal time and the true obliquity
+of the ecliptic. They are computed once per distinct instant (and cached across
+calls), so charts born at the same instant share them. The Ascendant, MC and the
+Equal/Whole Sign cusps are then computed with NumPy for the whole batch, while
+Placidus/Koch cusps use one `swe.houses_armc` call per record.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import swisseph as swe
+
+# house system names and their Swiss Ephemeris identifiers
+HOUSE_SYSTEMS = {
+    'placidus': b'P',
+    'koch': b'K',
+    'equal': b'E',
+    'whole_sign': b'W',
+}
+
+# - asc: (n,) array of Ascendant longitudes in degrees.
+# - mc: (n,) array of Midheaven longitudes in degrees.
+# - cusps: (n, 12) array of house cusp longitudes in degrees, starting with the 1st house.
+# - armc: (n,) array of the sidereal time at the birth location, in degrees (ARMC).
+HouseBatch = namedtuple('HouseBatch', ['asc', 'mc', 'cusps', 'armc'])
+
+@lru_cache(maxsize=4096)
+def sidereal_terms(jd):
+    """
+    Returns the Greenwich sidereal time (in degrees) and the true obliquity
+    of the ecliptic (in degrees) at Julian day `jd` (UT).
+
+    Note: Results are cached, since they are shared by all charts born at the same instant.
+    """
+    # NOTE: `swe.sidtime` would compute the nutation a second time
+    eps, _, dpsi, _ = swe.calc_ut(jd, swe.ECL_NUT)[0][:4]
+    return swe.sidtime0(jd, eps, dpsi) * 15, eps
+
+def compute_houses_batch(jd, lats, lons, house_system='whole_sign'):
+    """
+    Computes angles and house cusps for many charts at once.
+
+    Args:
+        jd: An array of Julian days (UT).
+        lats: An array of latitudes, one per record.
+        lons: An array of longitudes, one per record.
+        house_system (str, optional): One of the keys of `HOUSE_SYSTEMS`. (default: 'whole_sign')
+
+    Returns:
+        HouseBatch: Angles and cusps for every record.
+
+    Raises:
+        ValueError: If the house system is unknown.
+
+    Note:
+        Placidus and Koch houses are undefined inside the polar circles.
+        Like the Swiss Ephemeris, Porphyry cusps are returned for those records.
+    """
+    if house_system not in HOUSE_SYSTEMS:
+        raise ValueError(
+            f"Invalid house system: {house_system}."
+            f" Must be one of {tuple(HOUSE_SYSTEMS)}."
+        )
+    jd = np.asarray(jd, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+
+    # sidereal time & obliquity, once per distinct instant
+    instants, inverse = np.unique(jd, return_inverse=True)
+    terms = np.array([sidereal_terms(t) for t in instants.tolist()]).reshape(-1, 2)
+    gst, eps_deg = terms[inverse, 0], terms[inverse, 1]
+
+    armc_deg = (gst + lons) % 360
+    armc = np.radians(armc_deg)
+    eps = np.radians(eps_deg)
+    phi = np.radians(lats)
+
+    mc = np.degrees(np.arctan2(np.sin(armc), np.cos(armc) * np.cos(eps))) % 360
+    asc = np.degrees(np.arctan2(
+        np.cos(armc),
+        -(np.sin(armc) * np.cos(eps) + np.tan(phi) * np.sin(eps))
+    )) % 360
+    # inside the polar circles the formula may yield the descendant;
+    # like the Swiss Ephemeris, keep the Ascendant in the eastern half (0-180 degrees after the MC)
+    asc = np.where((asc - mc) % 360 >= 180, (asc + 180) % 360, asc)
+
+    offsets = 30 * np.arange(12)
+    if house_system == 'whole_sign':
+        cusps = ((asc // 30 * 30)[:, None] + offsets) % 360
+    elif house_system == 'equal':
+        cusps = (asc[:, None] + offsets) % 360
+    else:
+        hsys = HOUSE_SYSTEMS[house_system]
+        cusps = np.empty((len(jd), 12))
+        for row, (a, lat, e) in enumerate(zip(armc_deg.tolist(), lats.tolist(), eps_deg.tolist())):
+            try:
+                cusps[row] = swe.houses_armc(a, lat, e, hsys)[0][:12]
+            except swe.Error:
+                cusps[row] = swe.houses_armc(a, lat, e, b'O')[0][:12]
+    return HouseBatch(asc, mc, cusps, armc_deg)
@@ -0,0 +1,160 @@
+"""
+Memory-budgeted cache of decoded images, shared by the image loaders (see `utils.py`).
+
+Each image is accounted for by the size of its decoded pixel buffer (what it takes in memory once
+loaded, see `image_bytes`), not by the size of its file: a full resolution background is a 1.5-3.5 MB
+PNG but a 2203x2203 RGBA buffer of ~18.5 MB (the 12 backgrounds ~222 MB, the other assets ~24 MB once
+resized). When the resident bytes exceed the budget, the least recently used images are
+evicted, except pinned ones (the assets drawn on every chart, see `utils.hot_filenames`), which stay
+resident and count towards the budget. An evicted image is loaded again on its next use, so the
+budget trades memory for decoding time.
+
+    cache = ImageCache(budget=64 * 2**20, pinned=utils.hot_filenames(IMG_FILES))
+    im = cache.get(key)
+    if im is None:
+        im = cache.put(key, decode(key))
+    cache.stats()  # hits, misses, evictions, resident bytes...
+"""
+from collections import OrderedDict
+import threading
+
+import metrics
+
+# bytes per pixel of Pillow's image buffers by mode (3 band modes are padded to 4 bytes), 4 otherwise
+_PIXEL_SIZE = {'1': 1, 'L': 1, 'P': 1, 'I;16': 2, 'I;16L': 2, 'I;16B': 2, 'I;16N': 2}
+
+def image_bytes(im):
+    """
+    Returns the size in bytes of the decoded pixel buffer of an image (whether it is decoded yet or not).
+    """
+    return im.size[0] * im.size[1] * _PIXEL_SIZE.get(im.mode, 4)
+
+class ImageCache:
+    """
+    A dict-like cache of images (key -> PIL image) with a byte budget, evicted in least recently used order.
+
+    The entry that was put last is never evicted by its own `put` (an image larger than the whole
+    budget is still returned to, and kept for, its caller until the next `put`).
+
+    Attributes:
+        - budget: Maximum resident bytes, or None for no limit.
+        - pinned: Keys that are never evicted (they don't have to be cached yet).
+        - resident_bytes: Bytes of all cached images (see `image_bytes`).
+        - hits: Number of `get()` calls that found the image.
+        - misses: Number of `get()` calls that did not.
+        - evictions: Number of images evicted to stay within the budget.
+    """
+
+    def __init__(self, budget=None, pinned=()):
+        self.budget = budget
+        self.pinned = set(pinned)
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (image, bytes), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def __getitem__(self, key):
+        im = self.get(key)
+        if im is None:
+            raise KeyError(key)
+        return im
+
+    def __setitem__(self, key, im):
+        self.put(key, im)
+
+    def items(self):
+        return [(key, im) for key, (im, _) in list(self._entries.items())]
+
+    def get(self, key):
+        """
+        Returns the cached image of `key` (and marks it as most recently used), or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """
+        Returns the cached image of `key`, or None, without counting a hit or a miss or changing its recency.
+        """
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def put(self, key, im):
+        """
+        Caches (or replaces) the image of `key`, evicting least recently used images as needed.
+
+        Returns:
+            Image: `im`
+        """
+        size = image_bytes(im)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.resident_bytes -= old[1]
+            self._entries[key] = (im, size)
+            self.resident_bytes += size
+            self._evict(keep=key)
+        return im
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.resident_bytes -= entry[1]
+            return entry[0]
+
+    def pin(self, key):
+        """
+        Keeps the image of `key` resident (once it is cached).
+        """
+        with self._lock:
+            self.pinned.add(key)
+
+    def unpin(self, key):
+        with self._lock:
+            self.pinned.discard(key)
+            self._evict()
+
+    def _evict(self, keep=None):
+        if self.budget is None or self.resident_bytes <= self.budget:
+            return
+        for key in list(self._entries):
+            if self.resident_bytes <= self.budget:
+                break
+            if key in self.pinned or key == keep:
+                continue
+            _, size = self._entries.pop(key)
+            self.resident_bytes -= size
+            self.evictions += 1
+            metrics.increment('asset_cache_evictions')
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'resident_bytes': self.resident_bytes,
+                'pinned_bytes': sum(size for key, (_, size) in self._entries.items() if key in self.pinned),
+                'budget': self.budget,
+            }
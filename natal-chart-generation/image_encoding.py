@@ -0,0 +1,86 @@
+"""
+Output stage: encodes a rendered natal chart exactly once, in a selectable format.
+
+Encoding a full size chart is one of the most expensive steps of a request, so the
+format and its CPU/size trade-off can be chosen per channel, e.g. a compressed PNG
+for the NFT master and a lossy WebP for previews.
+"""
+from collections import namedtuple
+from io import BytesIO
+import time
+
+from PIL import Image
+
+# format name -> (PIL format, content type, file extension)
+OUTPUT_FORMATS = {
+    # PNG, zlib level `compress_level`
+    'png': ('PNG', 'image/png', 'png'),
+    # PNG quantized to a 256 color palette (much smaller, slight color loss)
+    'png-palette': ('PNG', 'image/png', 'png'),
+    # lossy WebP, `quality` 0-100
+    'webp': ('WEBP', 'image/webp', 'webp'),
+    # lossless WebP, `quality` is the compression effort 0-100
+    'webp-lossless': ('WEBP', 'image/webp', 'webp'),
+}
+
+# - data: The encoded image (bytes).
+# - format: The output format name (a key of `OUTPUT_FORMATS`).
+# - content_type: MIME type of `data`.
+# - extension: File extension for `data`.
+# - size: Length of `data` in bytes.
+# - encode_seconds: Wall-clock time spent encoding.
+EncodedImage = namedtuple(
+    'EncodedImage',
+    ['data', 'format', 'content_type', 'extension', 'size', 'encode_seconds']
+)
+
+def check_output_params(fmt='png', compress_level=6, quality=80):
+    """
+    Validates the parameters of `encode_image` (e.g. before spending time on rendering).
+
+    Raises:
+        ValueError: If the format or one of the parameters is invalid.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Invalid output format: {fmt}."
+            f" Must be one of {tuple(OUTPUT_FORMATS)}."
+        )
+    if not 0 <= compress_level <= 9:
+        raise ValueError(f"Invalid compress_level: {compress_level}. Must be between 0 and 9.")
+    if not 0 <= quality <= 100:
+        raise ValueError(f"Invalid quality: {quality}. Must be between 0 and 100.")
+
+def encode_image(im, fmt='png', compress_level=6, quality=80):
+    """
+    Encodes an image into one of the `OUTPUT_FORMATS`.
+
+    Args:
+        im (Image): The image to encode.
+        fmt (str, optional): The output format. (default: 'png')
+        compress_level (int, optional): zlib compression level 0-9 of the PNG formats. (default: 6)
+        quality (int, optional): Quality (lossy) or effort (lossless) 0-100 of the WebP formats. (default: 80)
+
+    Returns:
+        EncodedImage: The encoded image, with its size and encode time.
+
+    Raises:
+        ValueError: If the format or one of the parameters is invalid.
+    """
+    check_output_params(fmt, compress_level, quality)
+    pil_format, content_type, extension = OUTPUT_FORMATS[fmt]
+    buffer = BytesIO()
+    t0 = time.perf_counter()
+    if fmt == 'png':
+        im.save(buffer, pil_format, compress_level=compress_level)
+    elif fmt == 'png-palette':
+        palette_im = im.quantize(256, method=Image.Quantize.FASTOCTREE)
+        palette_im.save(buffer, pil_format, compress_level=compress_level)
+    elif fmt == 'webp':
+        im.save(buffer, pil_format, quality=quality)
+    else:
+        im.save(buffer, pil_format, lossless=True, quality=quality)
+    encode_seconds = time.perf_counter() - t0
+
+    data = buffer.getvalue()
+    return EncodedImage(data, fmt, content_type, extension, len(data), encode_seconds)
@@ -15,8 +15,10 @@ SIGN_RADIUS = 0.235
 
 # obj size as % of background image
 PLANET_SIZE = 0.055
-# !important NOTE: TEXT_SIZE is in pixels.
+# !important NOTE: TEXT_SIZE is in pixels, for a background of TEXT_SIZE_BG pixels
+# (the size of the original backgrounds). Use `text_size()` for other resolutions.
 TEXT_SIZE = 30 
+TEXT_SIZE_BG = 2203
 SIGN_SIZE = 0.040
 
 # radius of inner circle containing house numbers
@@ -24,3 +26,13 @@ HOUSE_NUMBER_RADIUS = 0.45
 
 # radius of central astrace logo
 LOGO_RADIUS = 0.07
+
+# resolution tiers of `natal_chart.generate`: background size in pixels,
+# or 'full' for the size of the original background images
+RESOLUTIONS = (512, 1024, 2048, 'full')
+
+def text_size(bg_size):
+    """
+    Returns the font size (in pixels) of the degree labels on a background of `bg_size` pixels.
+    """
+    return max(1, round(TEXT_SIZE * bg_size / TEXT_SIZE_BG))
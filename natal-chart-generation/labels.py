@@ -0,0 +1,78 @@
+"""
+Degree labels ("0°" to "29°") of the chart objects.
+
+A chart only ever shows 30 different labels, all in the same font and size
+(`image_params.text_size()` of the background size). Instead of loading the font and rasterizing every
+label with `ImageDraw.text()` on each render, a `LabelAtlas` rasterizes the 30
+labels once per process and pastes the cached masks. The output is pixel-identical
+to drawing the text with the default (white) ink.
+"""
+import math
+import os
+
+from PIL import Image, ImageDraw, ImageFont
+
+from constants import FONT_FILE
+import image_params
+
+# number of distinct labels, one per whole degree within a sign
+NUM_LABELS = 30
+
+
+class LabelAtlas:
+    """
+    Pre-rasterized degree labels.
+
+    Attributes:
+        - font: The ImageFont the labels were rasterized with.
+        - masks: A list of (mask, offset) tuples, indexed by degree. `mask` is an 'L' image
+          cropped to the label's bounding box, `offset` is the (x, y) position of the box
+          relative to the text origin (see `ImageFont.getbbox`).
+    """
+
+    def __init__(self, font_path=None, text_size=image_params.TEXT_SIZE):
+        if font_path is None:
+            # relative to this file, so the atlas works from any working directory
+            font_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), FONT_FILE)
+        self.font = ImageFont.truetype(font_path, text_size)
+        self.masks = [self._rasterize(label_text(degree)) for degree in range(NUM_LABELS)]
+
+    def _rasterize(self, text):
+        left, top, right, bottom = self.font.getbbox(text)
+        mask = Image.new('L', (right - left, bottom - top))
+        ImageDraw.Draw(mask).text((-left, -top), text, font=self.font, fill=255)
+        return mask, (left, top)
+
+    def paste(self, im, xy, position, fill=(255, 255, 255)):
+        """
+        Draws the label of `position` onto `im`, like `ImageDraw.Draw(im).text(xy, label_text(position), font=self.font)`.
+
+        Args:
+            im (Image): An RGB image, modified in place.
+            xy (tuple): The (x, y) text origin, in whole pixels.
+            position (float): A position within the sign, between 0 (inclusive) and 30 (exclusive).
+            fill (optional): The text color. (default: white)
+        """
+        mask, (left, top) = self.masks[math.floor(position)]
+        x, y = xy
+        im.paste(fill, (x + left, y + top), mask)
+
+
+def label_text(position):
+    """
+    Returns the label shown next to an object at `position` degrees within its sign.
+    """
+    return "{}°".format(math.floor(position))
+
+
+# built once per process and text size, see `get_label_atlas`
+_label_atlases = {}
+
+def get_label_atlas(text_size=image_params.TEXT_SIZE):
+    """
+    Returns the process-wide LabelAtlas of `text_size`, building it on first use.
+    """
+    atlas = _label_atlases.get(text_size)
+    if atlas is None:
+        atlas = _label_atlases[text_size] = LabelAtlas(text_size=text_size)
+    return atlas
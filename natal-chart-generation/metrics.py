@@ -0,0 +1,153 @@
+"""
+Lightweight timing spans and counters for the hot path, emitted as CloudWatch Embedded Metric
+Format (EMF) log lines.
+
+Instrumented code calls the module-level functions, which do nothing unless metrics are being
+recorded (one global lookup and a shared no-op context manager):
+
+    with metrics.span('encode'):
+        ...
+    metrics.increment('asset_cache_hits')
+
+The caller of a request (e.g. the Lambda handler) records and emits them:
+
+    with metrics.recording() as m:
+        ... handle the request ...
+    m.emit()  # prints one JSON line, picked up by CloudWatch Logs
+
+Spans with the same name add up, e.g. all image downloads of a request count towards 'fetch'
+(concurrent downloads overlap, so the sum can exceed the wall-clock time of 'prefetch').
+Recording is process-wide (not per thread), so spans and counters of worker threads
+started during a request are included.
+
+See: https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/CloudWatch_Embedded_Metric_Format_Specification.html
+"""
+from contextlib import contextmanager
+import json
+import threading
+import time
+
+NAMESPACE = 'NatalChart'
+
+class Metrics:
+    """
+    Timings (milliseconds) and counters of one request.
+
+    Attributes:
+        - namespace: CloudWatch namespace of the metrics.
+        - dimensions: A dict of dimension names to values, e.g. {'Format': 'png'}.
+        - properties: Other values logged with the metrics (not metrics themselves).
+        - timings: A dict {span name: milliseconds}.
+        - counters: A dict {counter name: count}.
+    """
+
+    def __init__(self, namespace=NAMESPACE, dimensions=None):
+        self.namespace = namespace
+        self.dimensions = dict(dimensions or {})
+        self.properties = {}
+        self.timings = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def add_time(self, name, ms):
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + ms
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_emf(self, timestamp=None):
+        """
+        Returns the metrics as an Embedded Metric Format document (a dict).
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        metric_defs = (
+            [{'Name': name, 'Unit': 'Milliseconds'} for name in self.timings]
+            + [{'Name': name, 'Unit': 'Count'} for name in self.counters]
+        )
+        document = {
+            '_aws': {
+                'Timestamp': int(1000 * timestamp),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [list(self.dimensions)],
+                    'Metrics': metric_defs,
+                }],
+            },
+        }
+        document.update(self.properties)
+        document.update(self.dimensions)
+        document.update((name, round(ms, 3)) for name, ms in self.timings.items())
+        document.update(self.counters)
+        return document
+
+    def emit(self, write=print):
+        """
+        Writes the metrics as one EMF JSON line (by default to stdout, i.e. CloudWatch Logs in Lambda).
+        """
+        write(json.dumps(self.to_emf()))
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.add_time(self.name, 1000 * (time.perf_counter() - self.start))
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+# the metrics being recorded, see `recording`
+_current = None
+
+def span(name):
+    """
+    Returns a context manager that adds its wall-clock time to the timing `name`
+    of the metrics being recorded, if any.
+    """
+    if _current is None:
+        return _NULL_SPAN
+    return _Span(_current, name)
+
+def increment(name, value=1):
+    """
+    Adds `value` to the counter `name` of the metrics being recorded, if any.
+    """
+    if _current is not None:
+        _current.increment(name, value)
+
+@contextmanager
+def recording(namespace=NAMESPACE, dimensions=None):
+    """
+    Records spans and counters until the end of the `with` block.
+
+    Yields:
+        Metrics: The recorded metrics (still available after the block, e.g. to `emit()`).
+    """
+    global _current
+    metrics = Metrics(namespace, dimensions)
+    previous, _current = _current, metrics
+    try:
+        yield metrics
+    finally:
+        _current = previous
@@ -1,18 +1,21 @@
-from datetime import datetime, timezone
-from io import BytesIO
-from numpy.random import choice
-from pathlib import Path
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta, timezone
 import math
-import multiprocessing
-import re
 import os
+import random
 
-from PIL import Image, ImageFont, ImageDraw
-import pytz
+from PIL import Image
 import swisseph as swe
 
-from constants import EPHE_DIR, FONT_FILE, IMG_DIR, IMG_FILES, PLANET_NAMES, SIGNS
+from constants import EPHE_DIR, IMG_DIR, IMG_FILES, SIGNS, SPRITE_ATLAS_FILE
+import asset_bundle
+import display_list
+import ephemeris
+import houses
 import image_params
+import metrics
+import sprite_atlas
+import timezones
 import utils
 
 swe.set_ephe_path(EPHE_DIR)
@@ -58,6 +61,8 @@ class NatalChart:
         -objects: A dictionary containing planet names as keys and corresponding Planet objects as values.
         -jd : Julian day integer representing the date and time of the natal chart. If None, it is assumed that the 
         chart is for the current date and time.
+        -cusps: A list of the 12 house cusps (absolute positions in degrees), or None if not computed.
+        -house_system: The house system `cusps` were computed with (see `houses.HOUSE_SYSTEMS`), or None.
 
     Notes:
         - The Julian date format is used becasue the swisseph astrolibrary requires it.
@@ -69,12 +74,14 @@ class NatalChart:
         "Asc", "Mc"
     ])
 
-    def __init__(self, planets, jd=None):
+    def __init__(self, planets, jd=None, cusps=None, house_system=None):
         """
         Parameters:
         - planets: A list of Planet objects representing the planets in the natal chart.
         - jd : optional (default=None) Julian day number representing the date and time of the natal chart. If None, it is assumed that the 
             chart is for the current date and time.
+        - cusps: optional (default=None) A list of the 12 house cusps.
+        - house_system: optional (default=None) The house system of `cusps`.
         
         Raises:
         - Exception : if any planet/object is missing in the chart
@@ -89,6 +96,8 @@ class NatalChart:
                 self.required_objects - s1 
             )
         self.jd = jd
+        self.cusps = cusps
+        self.house_system = house_system
 
     def positions(self):
         """
@@ -96,13 +105,106 @@ class NatalChart:
         """
         return sorted(x.abs_pos for x in self.objects.values())
 
-def generate(local_time: str, location: str, local: bool = False) -> Image:
+def charts_from_positions(positions, house_system='whole_sign'):
+    """
+    Builds one NatalChart per record of a batch of computed positions.
+
+    Args:
+        positions (ephemeris.PositionBatch): Positions returned by `ephemeris.compute_positions_batch`.
+        house_system (str, optional): The house system the positions were computed with. (default: 'whole_sign')
+
+    Returns:
+        list: A list of NatalChart objects, in the same order as the records.
+    """
+    charts = []
+    for jd, abs_row, sign_row, deg_row, cusps in zip(
+        positions.jd.tolist(),
+        positions.abs_pos.tolist(),
+        positions.signs.tolist(),
+        positions.degrees.tolist(),
+        positions.cusps.tolist(),
+    ):
+        planets = [
+            Planet(name, pos, abs_pos, SIGNS[sign])
+            for name, abs_pos, sign, pos in zip(ephemeris.OBJECT_NAMES, abs_row, sign_row, deg_row)
+        ]
+        charts.append(NatalChart(planets, jd, cusps, house_system))
+    return charts
+
+def parse_local_time(local_time, name='local_time'):
+    """
+    Parses and validates an ISO 8601 date and time (YYYY-MM-DDTHH:MM:SS).
+
+    Raises:
+        ValueError: If `local_time` is invalid (`name` is the argument in the message).
+    """
+    try:
+        return datetime.fromisoformat(local_time)
+    except ValueError:
+        raise ValueError(
+            f"Invalid {name}: {local_time}."
+            " Must be in ISO 8601 format (YYYY-MM-DDTHH:MM:SS)."
+        )
+
+def parse_birth_data(local_time, location, ut=True):
+    """
+    Parses and validates the birth information passed to `generate`.
+
+    Args:
+        local_time (str): See `generate`.
+        location (str): See `generate`.
+        ut (bool, optional): Convert the local time to UT with the timezone of the location
+            (see `timezones.to_ut`). Callers with many records convert them at once instead
+            (`timezones.to_ut_batch`). (default: True)
+
+    Returns:
+        tuple: (datetime, latitude, longitude), the datetime in UT (timezone-aware)
+        unless `ut` is False.
+
+    Raises:
+        ValueError: If `local_time` or `location` is invalid.
+    """
+    # Check that local_time is a valid ISO 8601 date and time
+    dt = parse_local_time(local_time)
+    # Check that location is a valid latitude and longitude string
+    try:
+        lat, lon = location.split(',')
+        lat = float(lat)
+        lon = float(lon)
+    except ValueError:
+        raise ValueError(
+            f"Invalid location: {location}."
+            " Must be in the format 'LAT,LON',"
+            " where LAT is the latitude and LON is the longitude."
+        )
+    if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(
+            f"Invalid location: {location}."
+            " The latitude must be between -90 and 90 and the longitude between -180 and 180."
+        )
+    if ut:
+        dt = timezones.to_ut(dt, lat, lon)
+    return dt, lat, lon
+
+def generate(
+        local_time: str,
+        location: str,
+        local: bool = False,
+        ephemeris_backend: str = 'swisseph',
+        house_system: str = 'whole_sign',
+        layout: str = 'spread',
+        bg_file: str = None,
+        resolution='full',
+        format: str = 'raster',
+    ):
     """
     Generate a natal chart based on birth information.
 
     Args:
         local_time (str):
-            Local date and time of birth in ISO 8601 format (YYYY-MM-DDTHH:MM:SS).
+            Local date and time of birth in ISO 8601 format (YYYY-MM-DDTHH:MM:SS), the civil time at
+            `location`. It is converted to UT with the timezone of the location, looked up offline
+            (see `timezones.py`). A UTC offset in the string (e.g. '1994-01-11T07:33:00+01:00') is used instead.
         location (str):
             Geographical coordinates of birth location in the format 'LAT,LON',
             where LAT is the latitude and LON is the longitude.
@@ -110,35 +212,106 @@ def generate(local_time: str, location: str, local: bool = False) -> Image:
             Generate natal chart locally. This is useful for visual testing.
             Note: When running locally, the program will read image files from the local file system
             instead of fetching them from S3. (default: False)
+        ephemeris_backend (str, optional):
+            Where planet positions come from, one of `ephemeris.EPHEMERIS_BACKENDS`.
+            'table' uses the precomputed ephemeris table (see `ephemeris_table.py`),
+            which has to be built beforehand. (default: 'swisseph')
+        house_system (str, optional):
+            House system of the chart's cusps, one of `houses.HOUSE_SYSTEMS`.
+            NOTE: The rendered wheel always shows whole sign houses, the
+            Ascendant and MC do not depend on the house system. (default: 'whole_sign')
+        layout (str, optional):
+            How overlapping planets are moved apart, one of `LAYOUTS`. (default: 'spread')
+        bg_file (str, optional):
+            The background image, one of IMG_FILES['BACKGROUNDS']. Chosen at random if not given.
+        resolution (int or str, optional):
+            Size of the chart in pixels, one of `image_params.RESOLUTIONS`. Smaller tiers are rendered
+            natively from pre-scaled assets, not downscaled afterwards. 'full' is the size of the
+            original backgrounds. (default: 'full')
+        format (str, optional):
+            One of `RENDER_FORMATS`: 'raster' renders the chart as an image, 'svg' returns an SVG document
+            with the same layout that references the assets (see `svg_chart.py`), for the client to draw.
+            (default: 'raster')
 
     Returns:
-        Image: A PIL Image object representing the generated natal chart.
+        Image: A PIL Image object representing the generated natal chart,
+        or str: its SVG document if `format` is 'svg'.
 
     Raises:
         ValueError: If the input arguments are invalid.
 
     Example usage:
         generate('2022-01-01T12:00:00', '40.7128,-74.0060')
+        generate('2022-01-01T12:00:00', '40.7128,-74.0060', format='svg')
     """
 
-    # Check that local_time is a valid ISO 8601 date and time
-    try:
-        dt = datetime.fromisoformat(local_time)
-    except ValueError:
+    check_render_options(local, layout, bg_file, resolution, ephemeris_backend, house_system, format)
+    dt, lat, lon = parse_birth_data(local_time, location)
+    image_loader, base_layers = _image_loader(local, resolution)
+
+    return render_chart(
+        dt, lat, lon, image_loader, base_layers,
+        ephemeris_backend=ephemeris_backend,
+        house_system=house_system,
+        layout=layout,
+        bg_file=bg_file,
+        format=format,
+        asset_url=_asset_url(local),
+    )
+
+# what `generate` returns: a rendered image, or an SVG document (see `svg_chart.py`)
+RENDER_FORMATS = ('raster', 'svg')
+
+def _asset_url(local):
+    """
+    Returns the URL prefix of the assets that SVG charts reference.
+    """
+    if local:
+        return IMG_DIR + '/'
+    distribution_url = os.environ['CLOUDFRONT_DISTRIBUTION_URL']
+    if '://' not in distribution_url:
+        distribution_url = f"https://{distribution_url}"
+    return distribution_url.rstrip('/') + '/'
+
+def check_render_options(
+        local, layout, bg_file, resolution, ephemeris_backend='swisseph', house_system='whole_sign', format='raster',
+    ):
+    """
+    Validates the rendering arguments of `generate` (and `generate_animation`), before any work is done.
+
+    Raises:
+        ValueError: If one of the arguments is invalid.
+    """
+    if bg_file is not None and bg_file not in IMG_FILES['BACKGROUNDS']:
         raise ValueError(
-            f"Invalid local_time: {local_time}."
-            " Must be in ISO 8601 format (YYYY-MM-DDTHH:MM:SS)."
+            f"Invalid bg_file: {bg_file}."
+            f" Must be one of {tuple(IMG_FILES['BACKGROUNDS'])}."
         )
-    # Check that location is a valid latitude and longitude string
-    try:
-        lat, lon = location.split(',')
-        lat = float(lat)
-        lon = float(lon)
-    except ValueError:
+    if resolution not in image_params.RESOLUTIONS:
         raise ValueError(
-            f"Invalid location: {location}."
-            " Must be in the format 'LAT,LON',"
-            " where LAT is the latitude and LON is the longitude."
+            f"Invalid resolution: {resolution}."
+            f" Must be one of {image_params.RESOLUTIONS}."
+        )
+    if layout not in LAYOUTS:
+        raise ValueError(
+            f"Invalid layout: {layout}."
+            f" Must be one of {tuple(LAYOUTS)}."
+        )
+    # checked by the ephemeris otherwise, i.e. only once the positions are computed
+    if ephemeris_backend not in ephemeris.EPHEMERIS_BACKENDS:
+        raise ValueError(
+            f"Invalid ephemeris_backend: {ephemeris_backend}."
+            f" Must be one of {tuple(ephemeris.EPHEMERIS_BACKENDS)}."
+        )
+    if house_system not in houses.HOUSE_SYSTEMS:
+        raise ValueError(
+            f"Invalid house_system: {house_system}."
+            f" Must be one of {tuple(houses.HOUSE_SYSTEMS)}."
+        )
+    if format not in RENDER_FORMATS:
+        raise ValueError(
+            f"Invalid format: {format}."
+            f" Must be one of {RENDER_FORMATS}."
         )
     # Check that local is a boolean
     if not isinstance(local, bool):
@@ -147,132 +320,416 @@ def generate(local_time: str, location: str, local: bool = False) -> Image:
             " Must be a boolean value."
         )
 
+def _image_loader(local, resolution):
+    """
+    Returns the process-wide image loader and BaseLayerCache `generate` renders with.
+    """
     if local:
-        # for local generation/testing
-        image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES)
-        image_loader.load_all_images()
-        image_loader.resize_all_images()
+        # for local generation/testing (loaded once per process)
+        return get_local_image_loader(resolution), get_local_base_layers(resolution)
+    # NOTE: It is assumed that images are already resized at deployment !!!
+    image_loader = get_remote_image_loader(resolution)
+    return image_loader, _remote[resolution][1]
+
+def frame_times(start, end, step, lat=None, lon=None):
+    """
+    Returns the times of the frames of an animation (see `generate_animation`).
+
+    Args:
+        start (str): Local date and time of the first frame, in ISO 8601 format.
+        end (str): Local date and time of the last frame, included if it falls on a step.
+        step (timedelta): Time between two frames.
+        lat, lon (float, optional): The location, whose timezone `start` and `end` are in (like `local_time`,
+            see `generate`). Without a location, times without a UTC offset are taken as UT.
+
+    Returns:
+        list: The datetimes of all frames, in UT (timezone-aware). Frames are `step` apart in UT,
+        so the local time of the frames shifts at DST changes.
+
+    Raises:
+        ValueError: If the arguments are invalid.
+    """
+    start_dt = parse_local_time(start, 'start')
+    end_dt = parse_local_time(end, 'end')
+    if lat is not None:
+        start_dt, end_dt = timezones.to_ut_batch([start_dt, end_dt], [lat, lat], [lon, lon])
     else:
-        # read from environment vars passed during deployment
-        image_loader = utils.RemoteImageLoader(
-            os.environ['CLOUDFRONT_DISTRIBUTION_URL'],
-            os.environ['IMG_LAYER_BUCKET_NAME'],
+        start_dt, end_dt = [
+            dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+            for dt in (start_dt, end_dt)
+        ]
+    if not isinstance(step, timedelta) or step <= timedelta(0):
+        raise ValueError(f"Invalid step: {step}. Must be a positive timedelta.")
+    if end_dt < start_dt:
+        raise ValueError(f"Invalid end: {end}. Must not be before start ({start}).")
+    n = (end_dt - start_dt) // step + 1
+    return [start_dt + i * step for i in range(n)]
+
+def generate_animation(
+        start: str,
+        end: str,
+        step: timedelta,
+        location: str,
+        local: bool = False,
+        ephemeris_backend: str = 'swisseph',
+        house_system: str = 'whole_sign',
+        layout: str = 'spread',
+        bg_file: str = None,
+        resolution='full',
+    ):
+    """
+    Generate the frames of a transit animation: the chart of `location` at every `step` from `start`
+    to `end`.
+
+    Frames are rendered one at a time, as they are consumed, so they can be streamed to an encoder
+    (see `animation.write_animation`) without keeping the animation in memory. All frames share one
+    background and the cached base layers, and positions are computed for ANIMATION_BATCH_SIZE
+    timesteps at once.
+
+    Args:
+        start (str): Local date and time of the first frame, in ISO 8601 format (YYYY-MM-DDTHH:MM:SS).
+        end (str): Local date and time of the last frame, included if it falls on a step.
+        step (timedelta): Time between two frames.
+        location (str): Geographical coordinates in the format 'LAT,LON'.
+        The other arguments are the same as for `generate` (a random `bg_file` is chosen once).
+
+    Returns:
+        generator: PIL Images, one per frame (see `frame_times`).
+
+    Raises:
+        ValueError: If the arguments are invalid (raised by the call, not while iterating).
+
+    Example usage:
+        frames = generate_animation('2024-01-01T12:00:00', '2024-12-31T12:00:00', timedelta(days=1), '40.7128,-74.0060')
+    """
+    check_render_options(local, layout, bg_file, resolution, ephemeris_backend, house_system)
+    _, lat, lon = parse_birth_data(start, location, ut=False)
+    times = frame_times(start, end, step, lat, lon)
+    image_loader, base_layers = _image_loader(local, resolution)
+    if not bg_file:
+        bg_file = random_asset(IMG_FILES['BACKGROUNDS'])
+    return _animation_frames(
+        times, lat, lon, image_loader, base_layers, ephemeris_backend, house_system, layout, bg_file,
+    )
+
+# timesteps whose positions are computed in one batch (see `generate_animation`)
+ANIMATION_BATCH_SIZE = 1024
+
+def _animation_frames(times, lat, lon, image_loader, base_layers, ephemeris_backend, house_system, layout, bg_file):
+    for i in range(0, len(times), ANIMATION_BATCH_SIZE):
+        batch = times[i:i + ANIMATION_BATCH_SIZE]
+        with metrics.span('ephemeris'):
+            positions = ephemeris.compute_positions_batch(
+                batch, [lat] * len(batch), [lon] * len(batch), ephemeris_backend, house_system
+            )
+            charts = charts_from_positions(positions, house_system)
+        for chart in charts:
+            yield _generate(chart, image_loader, bg_file, base_layers=base_layers, layout=layout)
+
+def render_chart(
+        dt, lat, lon, image_loader, base_layers=None,
+        ephemeris_backend='swisseph', house_system='whole_sign', layout='spread', bg_file=None,
+        format='raster', asset_url=IMG_DIR + '/',
+    ):
+    """
+    Renders the chart of already validated birth data (see `parse_birth_data`) with the given
+    image loader and, optionally, a BaseLayerCache. The other arguments are the same as for `generate`,
+    `asset_url` is the URL prefix of the assets referenced by an SVG chart (see `svg_chart.chart_svg`).
+
+    This is what `generate` does after choosing an image loader; long-running callers
+    (e.g. batch mode, see `batch.py`) keep one loader and base layer cache for all charts.
+    """
+    # `dt` is in UT (converted from the local time by `parse_birth_data`), naive datetimes are taken as UT
+    with metrics.span('ephemeris'):
+        positions = ephemeris.compute_positions_batch(
+            [dt], [lat], [lon], ephemeris_backend, house_system
         )
-        # NOTE: It is assumed that images are already resized at deployment !!!
-
-    # calculate Julian day
-    # requires hour input as decimal with fraction
-    hour = dt.hour + (dt.minute + dt.second / 60) / 60
-    jd = swe.julday(dt.year, dt.month, dt.day, hour)
-    _, ascmc = swe.houses(jd, lat, lon, bytes('W', 'utf-8'))
-
-    # create planet object/layer list
-    planets = []
-    for name, no_body in PLANET_NAMES.items():
-        abs_pos = swe.calc_ut(jd, no_body)[0][0]
-        pos = abs_pos % 30
-        sign = SIGNS[int(abs_pos // 30)]
-        p = Planet(name, pos, abs_pos, sign)
-        planets.append(p)
-
-    # add angles
-    for abs_pos, name in [(ascmc[0], 'Asc'), (ascmc[1], 'Mc')]:
-        pos = abs_pos % 30
-        sign = SIGNS[int(abs_pos // 30)]
-        p = Planet(name, pos, abs_pos, sign)
-        planets.append(p)
-
-    chart = NatalChart(planets, jd)
-    return _generate(chart, image_loader)
-
-def _generate(chart, image_loader, bg_file=None):
+        chart = charts_from_positions(positions, house_system)[0]
+    if format == 'svg':
+        return _generate_svg(chart, image_loader, bg_file, layout=layout, asset_url=asset_url)
+    return _generate(chart, image_loader, bg_file, base_layers=base_layers, layout=layout)
+
+# layout functions, see `generate`:
+# - 'spread': centers each clump of planets within its sign (`utils.spread_planets`).
+# - 'solve': least squares layout that guarantees no overlaps (`utils.solve_layout`).
+LAYOUTS = {
+    'spread': utils.spread_planets,
+    'solve': utils.solve_layout,
+}
+
+# process-wide state, reused across warm invocations (see `get_remote_image_loader`):
+# resolution -> (image loader, BaseLayerCache)
+_remote = {}
+# same for local generation (see `get_local_image_loader`)
+_local = {}
+
+def image_cache_budget():
+    """
+    Returns the memory budget (bytes) of the decoded images of each process-wide image loader,
+    from the IMAGE_CACHE_MB environment variable, or None (no limit) if it isn't set.
+    The images drawn on every chart are always kept (see `utils.hot_filenames`), so only the
+    backgrounds are evicted and loaded again.
+    """
+    budget = os.environ.get('IMAGE_CACHE_MB')
+    if not budget:
+        return None
+    try:
+        return int(float(budget) * 2**20)
+    except ValueError:
+        raise ValueError(f"Invalid IMAGE_CACHE_MB: {budget}. Must be a number of megabytes.")
+
+def get_local_image_loader(resolution='full'):
+    """
+    Returns the process-wide local image loader of a resolution tier, creating it on first use.
+
+    Images are read from IMG_DIR and resized once, or memory-mapped from the tier's asset bundle
+    if it exists (see `asset_bundle.py`). A matching BaseLayerCache is kept as well (see
+    `get_local_base_layers`), so generating many charts in one process (e.g. `natal_chart_cli.py batch`)
+    only pays for loading the assets once. The decoded images are kept within `image_cache_budget()`.
+    """
+    if resolution not in _local:
+        bg_size = None if resolution == 'full' else resolution
+        budget = image_cache_budget()
+        path = asset_bundle.bundle_file(resolution)
+        if os.path.exists(path):
+            # pre-resized assets (backgrounds may come from the image directory)
+            fallback = utils.LocalImageLoader(IMG_DIR, IMG_FILES, cache_budget=budget)
+            if bg_size is not None:
+                fallback = utils.ScaledImageLoader(
+                    fallback, bg_size, cache_budget=budget, pinned=utils.hot_filenames(IMG_FILES),
+                )
+            image_loader = asset_bundle.BundleImageLoader(asset_bundle.get_asset_bundle(path), fallback)
+        else:
+            image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES, bg_size, cache_budget=budget)
+            image_loader.load_all_images()
+            image_loader.resize_all_images()
+        _local[resolution] = (image_loader, BaseLayerCache(image_loader))
+    return _local[resolution][0]
+
+def get_local_base_layers(resolution='full'):
+    """
+    Returns the BaseLayerCache of the process-wide local image loader of a resolution tier.
+    """
+    get_local_image_loader(resolution)
+    return _local[resolution][1]
+
+def get_remote_image_loader(resolution='full'):
+    """
+    Returns the process-wide remote image loader of a resolution tier, creating it on first use.
+
+    The loader (and its decoded images) and a matching BaseLayerCache are kept for the
+    lifetime of the process, so only the first chart rendered in a container pays the
+    network cost. If an asset bundle is deployed with the function (see `asset_bundle.py`),
+    its images are memory-mapped and only the remaining ones (backgrounds) are fetched.
+    Otherwise, planet and sign glyphs are fetched as one sprite atlas (see `sprite_atlas.py`).
+
+    Smaller resolution tiers use their own asset bundle if one is deployed, and otherwise
+    scale the full resolution images once (`utils.ScaledImageLoader`).
+
+    The decoded images are kept within `image_cache_budget()`.
+    """
+    if resolution not in _remote:
+        budget = image_cache_budget()
+        hot = utils.hot_filenames(IMG_FILES)
+        path = asset_bundle.bundle_file(resolution)
+        if resolution != 'full':
+            fallback = utils.ScaledImageLoader(get_remote_image_loader(), resolution, cache_budget=budget, pinned=hot)
+            if os.path.exists(path):
+                image_loader = asset_bundle.BundleImageLoader(asset_bundle.get_asset_bundle(path), fallback)
+            else:
+                image_loader = fallback
+        else:
+            filenames = utils.get_all_filenames(IMG_FILES)
+            # read from environment vars passed during deployment
+            distribution_url = os.environ['CLOUDFRONT_DISTRIBUTION_URL']
+            if os.path.exists(path):
+                bundle = asset_bundle.get_asset_bundle(path)
+                image_loader = asset_bundle.BundleImageLoader(bundle, utils.RemoteImageLoader(
+                    distribution_url,
+                    manifest=[f for f in filenames if f not in bundle],
+                    cache_budget=budget, pinned=hot,
+                ))
+            else:
+                glyphs = set(sprite_atlas.glyph_filenames())
+                image_loader = sprite_atlas.AtlasImageLoader(utils.RemoteImageLoader(
+                    distribution_url,
+                    manifest=[f for f in filenames if f not in glyphs] + [SPRITE_ATLAS_FILE],
+                    cache_budget=budget, pinned=hot + [SPRITE_ATLAS_FILE],
+                ))
+        _remote[resolution] = (image_loader, BaseLayerCache(image_loader))
+    return _remote[resolution][0]
+
+def _generate(chart, image_loader, bg_file=None, base_layers=None, layout='spread'):
     """
      This is a hidden/helper function for the main generate() function.
 
      The actual building of the image (piecing together background placement, rotation, and object-sign pairs...)
-     is done here. The clumps algorithm is also run from here.
+     is done here, in two stages: the layout stage computes where everything goes (`layout_chart`, which also
+     runs the clumps algorithm), and `rasterize` draws it.
+
+     If a BaseLayerCache is passed as `base_layers`, the background layers are copied from it
+     instead of being composited from scratch.
+
+     `layout` selects how overlapping planets are moved apart (see `LAYOUTS`).
+
+     The chart is rendered at the resolution of `image_loader` (its `bg_im_size`), the sizes
+     of all layers and of the degree labels follow the background.
 
      Returns a constructed image, built with the PIL library.
     
     """
+    display = layout_chart(chart, image_loader, bg_file, layout)
+    return rasterize(display, image_loader, base_layers)
+
+def layout_chart(chart, image_loader, bg_file=None, layout='spread', size=None):
+    """
+    Layout stage of a chart: moves overlapping planets apart (see `LAYOUTS`) and computes the placements
+    of all glyphs and labels (see `display_list.place_objects`).
+
+    Args:
+        chart (NatalChart): The chart.
+        image_loader (ImageLoader): The image loader the chart will be drawn with (for the sizes of the glyphs).
+        bg_file (str, optional): The background. Chosen at random if not given.
+        layout (str, optional): One of `LAYOUTS`. (default: 'spread')
+        size (tuple, optional): The (width, height) of the chart. (default: the size of the background)
+
+    Returns:
+        DisplayList: The layout of the chart, to draw with `rasterize` (or another backend).
+    """
     if not bg_file:
         bg_file = random_asset(IMG_FILES['BACKGROUNDS'])
+    if size is None:
+        size = image_loader.load(bg_file).size
 
     asc = chart.objects['Asc'].sign
-    # set background image
-    bg_im = set_background_layers(asc, bg_file, image_loader)
-    
-    # allows for writing text on image
-    draw = ImageDraw.Draw(bg_im)
+    # NOTE: the layout function might change the `dpos` attribute (side effect)
+    with metrics.span('layout'):
+        LAYOUTS[layout](list(chart.objects.values()))
+        placements = display_list.place_objects(chart.objects.values(), asc, size, image_loader)
+    return display_list.DisplayList(size, asc, bg_file, placements)
 
-    # Get the current script's directory
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    # Construct an absolute path to the font file
-    font_path = os.path.join(script_dir, FONT_FILE)
-    # Use the absolute path when creating the font
-    font = ImageFont.truetype(font_path, image_params.TEXT_SIZE)
+def rasterize(display, image_loader, base_layers=None):
+    """
+    Draws a DisplayList (see `layout_chart`): the base layer of its ascendant sign and background,
+    copied from `base_layers` if given, and all placements on top of it.
 
-    # NOTE: `spread_planets` might change the `dpos` attribute (side effect)
-    utils.spread_planets(list(chart.objects.values()))
+    Returns:
+        Image: The chart.
 
-    for p in chart.objects.values():
-        """
-        Each planet-text-sign image grouping is constructed here.
-        """
-        im = image_loader.load(p.images['planet'])
-        # add planet
-        add_object(
-            im,
-            bg_im,
-            p.dpos,
-            asc,
-            image_params.PLANET_SIZE,
-            image_params.PLANET_RADIUS,
-            lambda bg_im, obj, x, y: bg_im.paste(obj, (x,y), obj)
-        )
-        im = image_loader.load(p.images['sign'])
-        # add sign
-        add_object(
-            im,
-            bg_im,
-            p.dpos,
-            asc,
-            image_params.SIGN_SIZE,
-            image_params.SIGN_RADIUS,
-            lambda bg_im, obj, x, y: bg_im.paste(obj, (x,y), obj)
-        )
-        # add text
-        # see: https://stackoverflow.com/questions/1528932/how-to-create-inline-objects-with-properties
-        add_object(
-            type('obj', (object,), {'size' : (image_params.TEXT_SIZE, image_params.TEXT_SIZE)}), # update sizing
-            bg_im,
-            p.dpos,
-            asc,
-            None,
-            image_params.TEXT_RADIUS,
-            lambda bg_im, obj, x, y: draw.text((x,y), "{}°".format(math.floor(p.position)), font=font),
-        )
+    Raises:
+        ValueError: If the display list doesn't have the size of the image loader's charts.
+    """
+    # set background image
+    with metrics.span('base_layers'):
+        if base_layers is not None:
+            bg_im = base_layers.get(display.asc, display.bg_file)
+        else:
+            bg_im = set_background_layers(display.asc, display.bg_file, image_loader)
+    if bg_im.size != tuple(display.size):
+        raise ValueError(f"Invalid display list: a {display.size} chart cannot be drawn at {bg_im.size}.")
+
+    with metrics.span('objects'):
+        display_list.draw(bg_im, display.placements, image_loader)
     return bg_im
 
+def _generate_svg(chart, image_loader, bg_file=None, layout='spread', asset_url=IMG_DIR + '/'):
+    """
+    Like `_generate`, but returns the chart as an SVG document (see `svg_chart.chart_svg`): the same
+    layout, with references to the assets instead of composited pixels.
+    """
+    # only needed for SVG output
+    import svg_chart
+
+    display = layout_chart(chart, image_loader, bg_file, layout)
+    with metrics.span('objects'):
+        return svg_chart.chart_svg(display, image_loader, asset_url)
+
+def draw_objects(bg_im, objects, asc, image_loader):
+    """
+    Draws the planet glyph, sign glyph and degree label of each object onto `bg_im`,
+    at the objects' display positions (`dpos`), for a chart with ascendant sign `asc`.
+    """
+    display_list.draw(bg_im, display_list.place_objects(objects, asc, bg_im.size, image_loader), image_loader)
+
+# a chart rendered by `render_incremental`:
+# - image: the chart
+# - display: its DisplayList
+# - dirty: the (left, top, right, bottom) regions repainted from the previous chart,
+#   or None if the chart was rendered from scratch
+RenderedChart = namedtuple('RenderedChart', ['image', 'display', 'dirty'])
+
+def render_incremental(chart, image_loader, base_layers, previous=None, bg_file=None, layout='spread', in_place=False):
+    """
+    Renders `chart` like `_generate`, but only repaints the items that differ from a previously
+    rendered chart, e.g. the next frame of an animation or a chart at a nearby time.
+
+    The new display list is diffed against the previous one (see `display_list.dirty_rects`); each
+    region covered by an item that moved or changed (at its old or its new position) is restored from
+    the cached base layer and all items that overlap it are drawn again, in drawing order. The result is
+    pixel-identical to a full render. If there is no previous chart, or the base layer (ascendant sign,
+    background) or the objects differ, the chart is rendered from scratch.
+
+    Copying the previous chart costs about as much as a full render (with a cached base layer), so the
+    savings come from `in_place=True`, for callers that no longer need the previous chart.
+
+    Args:
+        chart (NatalChart): The chart to render.
+        image_loader (ImageLoader): The image loader `previous` was rendered with.
+        base_layers (BaseLayerCache): The base layers of `image_loader`.
+        previous (RenderedChart, optional): The result of the previous call, or None.
+        bg_file (str, optional): The background. (default: the background of `previous`, or a random one)
+        layout (str, optional): One of `LAYOUTS`. (default: 'spread')
+        in_place (bool, optional): Repaint `previous.image` instead of a copy of it. (default: False)
+
+    Returns:
+        RenderedChart: The chart and its display list, to pass as `previous` to the next call.
+    """
+    if not bg_file:
+        bg_file = previous.display.bg_file if previous is not None else random_asset(IMG_FILES['BACKGROUNDS'])
 
-def random_asset(asset_dict):
+    asc = chart.objects['Asc'].sign
+    with metrics.span('base_layers'):
+        base = base_layers.get(asc, bg_file, copy=False)
+
+    display = layout_chart(chart, image_loader, bg_file, layout, size=base.size)
+
+    with metrics.span('objects'):
+        dirty = None
+        if previous is not None and previous.display[:3] == display[:3]:
+            dirty = display_list.dirty_rects(previous.display.placements, display.placements, base.size)
+        if dirty is None:
+            im = base.copy()
+            display_list.draw(im, display.placements, image_loader)
+        else:
+            im = previous.image if in_place else previous.image.copy()
+            for rect in dirty:
+                region = base.crop(rect)
+                display_list.draw_region(region, rect, display.placements, image_loader, base.size[1])
+                im.paste(region, rect[:2])
+    return RenderedChart(im, display, dirty)
+
+def random_asset(asset_dict, rng=random):
     """
-        A helper function that selects a random asset filename, given a probability dictionary. Just wraps numpy.random.choice()
+        A helper function that selects a random asset filename, given a probability dictionary. Just wraps random.choices()
 
         Args:
             - asset_dict: A dictionary that has asset filenames for keys, mapping to probability values
+            - rng: The random number generator, e.g. a seeded `random.Random` (default: the `random` module)
 
         Returns:
             - asset_name: A string name that was chosen from the dictionary.
 
         Exceptions:
-            - ValueError: thrown by numpy if probabilities of dictionary are not normalized.
+            - ValueError: if probabilities of dictionary are not normalized.
             
         Notes:
             - This wrapper is pretty shallow - it just hides the more long-winded code seen in the return statement below.
             - If the randomness functionality does not expand in the future, this function wrapper should be removed.
+            - Uses the standard library `random`, so a seeded `random.Random` can be passed (see `render_cache.seeded_background`).
     """
-    return choice(list(asset_dict.keys()), p=list(asset_dict.values()))
+    if not math.isclose(sum(asset_dict.values()), 1):
+        raise ValueError("probabilities do not sum to 1")
+    return rng.choices(list(asset_dict.keys()), weights=list(asset_dict.values()))[0]
 
 
 def set_background_layers(asc, bg_file, image_loader):
@@ -310,6 +767,74 @@ def set_background_layers(asc, bg_file, image_loader):
     bg_im.paste(logo, (a,b), logo)
     return bg_im
 
+class BaseLayerCache:
+    """
+    A cache of composited base layers (see `set_background_layers`).
+
+    The base layer only depends on the background image and the ascendant sign,
+    so there are at most len(IMG_FILES['BACKGROUNDS']) x 12 = 144 different ones.
+    Layers are built lazily (or eagerly with `warm()`) and evicted in least recently
+    used order once `maxsize` layers are cached.
+
+    Attributes:
+        - image_loader: The ImageLoader used to build the layers.
+        - maxsize: Maximum number of cached layers, or None for no limit.
+          NOTE: A full resolution layer takes ~15 MB of memory.
+        - hits: Number of `get()` calls served from the cache.
+        - misses: Number of `get()` calls that had to build a layer.
+    """
+
+    def __init__(self, image_loader, maxsize=24):
+        self.image_loader = image_loader
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._layers = OrderedDict()
+
+    def __len__(self):
+        return len(self._layers)
+
+    def get(self, asc, bg_file, copy=True):
+        """
+        Returns a copy of the base layer for ascendant sign `asc` and background `bg_file`,
+        which is safe to draw on.
+
+        With `copy=False`, the cached layer itself is returned (e.g. to restore regions of a
+        chart from it, see `render_incremental`), which must not be modified.
+        """
+        key = (bg_file, asc)
+        layer = self._layers.get(key)
+        if layer is None:
+            self.misses += 1
+            metrics.increment('base_layer_cache_misses')
+            layer = self._build(key)
+        else:
+            self.hits += 1
+            metrics.increment('base_layer_cache_hits')
+            self._layers.move_to_end(key)
+        return layer.copy() if copy else layer
+
+    def warm(self, bg_files=None, signs=SIGNS):
+        """
+        Eagerly builds the base layers for all combinations of `bg_files` (default: all backgrounds)
+        and `signs`, e.g. at startup. Only the last `maxsize` layers are kept.
+        """
+        if bg_files is None:
+            bg_files = IMG_FILES['BACKGROUNDS'].keys()
+        for bg_file in bg_files:
+            for asc in signs:
+                if (bg_file, asc) not in self._layers:
+                    self._build((bg_file, asc))
+
+    def _build(self, key):
+        bg_file, asc = key
+        layer = set_background_layers(asc, bg_file, self.image_loader)
+        self._layers[key] = layer
+        if self.maxsize is not None and len(self._layers) > self.maxsize:
+            # evict least recently used
+            self._layers.popitem(last=False)
+        return layer
+
 def get_center(bg_size, fg_size):
     """
     Returns the offset necessary to center an image with size `fg_size` on a background image with size `bg_size`.
@@ -402,24 +927,10 @@ def add_object(
 
 
 if __name__ == "__main__":
-    tz = pytz.timezone('Europe/London')
-    #tz = pytz.timezone('America/New_York')
-    
-    
-    #dt = tz.localize(datetime(1991, 4, 1, hour=17, minute=55))
-    # stellium
-    #dt = tz.localize(datetime(1962, 2, 4, hour=17, minute=55))
-    #dt = tz.localize(datetime(1994, 1, 11, hour=3, minute=33))
-    geo = (44.20169, 17.90397)
-    #geo = (45.4215, 75.6972)
     """
     Tuesday, January 11 1994, 07:33 AM
     Sarajevo, Bosnia & Herzegovina
     """
-    dt = tz.localize(datetime(1994, 1, 11, hour=7, minute=33))
-    #dt = tz.localize(datetime(1987,11,8,hour=0,minute=5))
-    
-    # To generate a natal chart, we need a date of birth + time of day (with time-zone), and location on Earth.
-    im = generate(dt, geo, local=True)
+    # the local time is converted to UT with the timezone of the location (Europe/Sarajevo)
+    im = generate('1994-01-11T07:33:00', '44.20169,17.90397', local=True)
     im.show()
-
@@ -1,20 +1,168 @@
 #!/usr/bin/env python3
 
 import argparse
-from natal_chart import generate
+from datetime import timedelta
+import os
+import sys
+
+from ephemeris import EPHEMERIS_BACKENDS
+from image_encoding import OUTPUT_FORMATS
+from image_params import RESOLUTIONS
+from natal_chart import LAYOUTS, RENDER_FORMATS, generate
+
+def resolution(value):
+    return value if value == 'full' else int(value)
+
+def add_resolution_argument(parser):
+    parser.add_argument(
+        "--resolution", type=resolution, choices=RESOLUTIONS, default="full",
+        help=(
+            "Size of the chart in pixels, rendered natively with pre-scaled assets"
+            " ('full': size of the original backgrounds, default)."
+        )
+    )
+
+def batch_main(argv):
+    """
+    `natal_chart_cli.py batch INPUT --out DIR`: renders all records of a JSONL/CSV file (see `batch.py`).
+    """
+    # only needed in batch mode
+    import batch
+
+    parser = argparse.ArgumentParser(
+        prog="natal_chart_cli batch",
+        description=(
+            "Render the natal charts of all records in a JSONL or CSV file"
+            " (fields: local_time, location or lat/lon, optional id)."
+        ),
+        epilog="Example usage: natal_chart_cli.py batch records.jsonl --out charts/",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("input", help="Input file (.jsonl or .csv).")
+    parser.add_argument(
+        "--out", required=True,
+        help=f"Output directory for the images and the results manifest ({batch.MANIFEST_FILE})."
+    )
+    parser.add_argument("--format", choices=tuple(OUTPUT_FORMATS), default="png", help="Output format (default: png).")
+    parser.add_argument("--compress-level", type=int, default=6, help="PNG zlib level 0-9 (default: 6).")
+    parser.add_argument("--quality", type=int, default=80, help="WebP quality/effort 0-100 (default: 80).")
+    parser.add_argument(
+        "--layout", choices=tuple(LAYOUTS), default="spread",
+        help="How overlapping planets are moved apart (default: spread)."
+    )
+    parser.add_argument(
+        "--ephemeris-backend", choices=EPHEMERIS_BACKENDS, default="swisseph",
+        help="Where planet positions come from (default: swisseph)."
+    )
+    add_resolution_argument(parser)
+    args = parser.parse_args(argv)
+
+    summary = batch.run_batch(
+        batch.read_records(args.input), args.out,
+        output_params={'fmt': args.format, 'compress_level': args.compress_level, 'quality': args.quality},
+        ephemeris_backend=args.ephemeris_backend,
+        layout=args.layout,
+        resolution=args.resolution,
+        log=lambda msg: print(msg, file=sys.stderr),
+    )
+    total = summary['ok'] + summary['failed']
+    print(
+        f"{summary['ok']}/{total} charts in {summary['seconds']:.1f} s"
+        f" ({summary['ok'] / max(summary['seconds'], 1e-9):.2f} charts/s), {summary['failed']} failed"
+    )
+    return 1 if summary['failed'] else 0
+
+def step(value):
+    """
+    Parses a step like '1d', '6h', '30m' or '90s'.
+    """
+    units = {'d': 'days', 'h': 'hours', 'm': 'minutes', 's': 'seconds'}
+    try:
+        return timedelta(**{units[value[-1]]: float(value[:-1])})
+    except (KeyError, ValueError):
+        raise argparse.ArgumentTypeError(f"invalid step: {value} (e.g. 1d, 6h, 30m, 90s)")
+
+def animate_main(argv):
+    """
+    `natal_chart_cli.py animate START END LOCATION --out FILE`: renders a transit animation
+    (see `natal_chart.generate_animation`).
+    """
+    # only needed in animate mode
+    import time
+    import animation
+    from natal_chart import frame_times, generate_animation
+
+    parser = argparse.ArgumentParser(
+        prog="natal_chart_cli animate",
+        description="Render the sky over a location from START to END as an animation, one frame per STEP.",
+        epilog="Example usage: natal_chart_cli.py animate 2024-01-01T12:00:00 2024-12-31T12:00:00 40.7128,-74.0060 --out sky.webp",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("start", help="Local date and time of the first frame (YYYY-MM-DDTHH:MM:SS).")
+    parser.add_argument("end", help="Local date and time of the last frame (YYYY-MM-DDTHH:MM:SS).")
+    parser.add_argument("location", help="Geographical coordinates in the format 'LAT,LON'.")
+    parser.add_argument("--step", type=step, default="1d", help="Time between frames, e.g. 1d, 6h, 30m (default: 1d).")
+    parser.add_argument("--out", required=True, help="Output file (webp, gif), or output directory (png).")
+    parser.add_argument(
+        "--format", choices=tuple(animation.ANIMATION_FORMATS),
+        help="Animation format (default: from the --out extension, png for a directory)."
+    )
+    parser.add_argument("--duration", type=int, default=100, help="Milliseconds per frame (default: 100).")
+    parser.add_argument("--quality", type=int, default=80, help="WebP quality 0-100 (default: 80).")
+    parser.add_argument(
+        "--layout", choices=tuple(LAYOUTS), default="spread",
+        help="How overlapping planets are moved apart (default: spread)."
+    )
+    parser.add_argument(
+        "--ephemeris-backend", choices=EPHEMERIS_BACKENDS, default="swisseph",
+        help="Where planet positions come from (default: swisseph)."
+    )
+    add_resolution_argument(parser)
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        ext = os.path.splitext(args.out)[1].lstrip('.').lower()
+        fmt = ext if ext in animation.ANIMATION_FORMATS else 'png'
+    try:
+        n_frames = len(frame_times(args.start, args.end, args.step))
+        frames = generate_animation(
+            args.start, args.end, args.step, args.location, local=True,
+            ephemeris_backend=args.ephemeris_backend, layout=args.layout, resolution=args.resolution,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    t0 = time.perf_counter()
+    n = animation.write_animation(
+        frames, args.out, fmt, n_frames=n_frames, duration=args.duration, quality=args.quality,
+    )
+    seconds = time.perf_counter() - t0
+    print(f"{n} frames in {seconds:.1f} s ({n / max(seconds, 1e-9):.2f} frames/s) -> {args.out}")
+    return 0
 
 def main():
+    if sys.argv[1:2] == ["batch"]:
+        sys.exit(batch_main(sys.argv[2:]))
+    if sys.argv[1:2] == ["animate"]:
+        sys.exit(animate_main(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(
         prog="natal_chart_cli",
         description="Generate a natal chart based on birth information",
-        epilog="Example usage: natal_chart_cli.py '2022-01-01T12:00:00' '40.7128,-74.0060'",
+        epilog=(
+            "Example usage: natal_chart_cli.py '2022-01-01T12:00:00' '40.7128,-74.0060'\n"
+            "SVG output: natal_chart_cli.py '2022-01-01T12:00:00' '40.7128,-74.0060' --local --format svg --out chart.svg\n"
+            "Batch mode: natal_chart_cli.py batch -h\n"
+            "Animations: natal_chart_cli.py animate -h"
+        ),
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     parser.add_argument(
         "local_time",
         help=(
             "Local date and time of birth in ISO 8601 format (YYYY-MM-DDTHH:MM:SS)."
-            " This represents the local time at the provided birth location."
+            " This represents the local time at the provided birth location, and is converted to UT"
+            " with the location's timezone (a UTC offset, e.g. +01:00, is used instead)."
         )
     )
     parser.add_argument(
@@ -33,9 +181,41 @@ def main():
         )
     )
 
+    parser.add_argument(
+        "--layout", choices=tuple(LAYOUTS), default="spread",
+        help="How overlapping planets are moved apart (default: spread)."
+    )
+
+    add_resolution_argument(parser)
+
+    parser.add_argument(
+        "--format", choices=RENDER_FORMATS, default="raster",
+        help=(
+            "'raster' renders the chart as an image (default), 'svg' writes an SVG document"
+            " that references the assets (see svg_chart.py)."
+        )
+    )
+    parser.add_argument(
+        "--out",
+        help="Output file. By default, an image is shown and an SVG document is written to stdout."
+    )
+
     args = parser.parse_args()
     
-    im = generate(args.local_time, args.location, args.local)
-    im.show()
+    chart = generate(
+        args.local_time, args.location, args.local, layout=args.layout, resolution=args.resolution,
+        format=args.format,
+    )
+    if args.format == 'svg':
+        if args.out:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                f.write(chart)
+        else:
+            sys.stdout.write(chart + '\n')
+    elif args.out:
+        chart.save(args.out)
+    else:
+        chart.show()
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Content-addressed render cache: the same birth data is rendered and uploaded only once.
+
+A render is identified by a canonical hash (`render_key`) of everything that affects its pixels:
+the Julian day (rounded to the minute), the location (rounded to `LOCATION_DIGITS` decimals),
+the background, the render/output parameters and `RENDERER_VERSION`. The background is normally
+chosen at random, so it is instead drawn with a generator seeded from the rest of the key
+(`seeded_background`), which makes retries and refreshes return the same chart.
+
+The cache maps keys to the URL of the uploaded image and is backed by a pluggable store:
+    - MemoryStore: in-process LRU (e.g. a long-running server)
+    - DiskStore: one small file per key in a local directory
+    - S3Store: the uploaded objects themselves, looked up with `head_object`
+    - LocalStore: the chart files themselves, in a local directory
+
+S3Store and LocalStore also store the charts (`upload(key, data, content_type)`), so they can
+be used as the storage backend of a server (see `render_server.py`).
+
+Usage (see `cdk/lambda/lambda.py`):
+    cache = RenderCache(S3Store(bucket_name))
+    filename = f"{render_key(jd, lat, lon, bg_file, params)}.png"
+    url = cache.get(filename)
+    if url is None:
+        ... render and upload `filename` ...
+        cache.put(filename, url)
+"""
+from collections import OrderedDict
+import hashlib
+from io import BytesIO
+import json
+import os
+from pathlib import Path
+import random
+import threading
+
+from constants import IMG_FILES
+import natal_chart
+
+# NOTE: Bump whenever a change to the renderer or the assets changes the output,
+# otherwise cached charts rendered by the previous version keep being served !!!
+RENDERER_VERSION = 1
+
+# 4 decimals are ~11 m, far below anything visible in a chart
+LOCATION_DIGITS = 4
+
+def render_key(jd, lat, lon, bg_file, params=None):
+    """
+    Returns the cache key (a sha256 hex digest) of a render.
+
+    Args:
+        jd (float): Julian day (UT) of the chart, rounded to the minute.
+        lat (float): Latitude, rounded to `LOCATION_DIGITS` decimals.
+        lon (float): Longitude, rounded to `LOCATION_DIGITS` decimals.
+        bg_file (str): The background image, or None (see `seeded_background`).
+        params (dict, optional): Any other parameter that affects the output
+            (output format, ephemeris backend, layout, ...). Values must be JSON serializable.
+    """
+    canonical = json.dumps(
+        {
+            'version': RENDERER_VERSION,
+            'minute': int(round(jd * 1440)),
+            'lat': round(lat, LOCATION_DIGITS) + 0.0,  # + 0.0: -0.0 -> 0.0
+            'lon': round(lon, LOCATION_DIGITS) + 0.0,
+            'bg': bg_file,
+            'params': params or {},
+        },
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def seeded_background(jd, lat, lon, params=None):
+    """
+    Chooses the background of a render with the same probabilities as `natal_chart.random_asset`,
+    but deterministically, from a generator seeded with the key of the render.
+    """
+    rng = random.Random(render_key(jd, lat, lon, None, params))
+    return natal_chart.random_asset(IMG_FILES['BACKGROUNDS'], rng)
+
+class MemoryStore:
+    """
+    Keeps the URLs of the last `maxsize` keys in memory, evicted in least recently used order.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._urls = OrderedDict()
+
+    def __len__(self):
+        return len(self._urls)
+
+    def get(self, key):
+        url = self._urls.get(key)
+        if url is not None:
+            self._urls.move_to_end(key)
+        return url
+
+    def put(self, key, url):
+        self._urls[key] = url
+        self._urls.move_to_end(key)
+        if self.maxsize is not None and len(self._urls) > self.maxsize:
+            self._urls.popitem(last=False)
+
+class DiskStore:
+    """
+    Stores the URL of each key in a file `directory/<key>`.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        # keys are hex digests (optionally with a file extension), never paths
+        if os.sep in key or key.startswith('.'):
+            raise ValueError(f"Invalid key: {key}.")
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, url):
+        # write + rename, so concurrent readers never see a partial file
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(url)
+        os.replace(tmp_path, path)
+
+class S3Store:
+    """
+    Uses the uploaded charts themselves as the store: the key is the object key in `bucket_name`,
+    and a key is cached if `head_object` finds it.
+
+    `put()` does nothing, the object exists once it has been uploaded.
+
+    NOTE: The caller needs `s3:ListBucket` permission on the bucket, otherwise S3 answers
+    403 instead of 404 for missing objects.
+    """
+
+    def __init__(self, bucket_name, client=None, endpoint_url=None):
+        """
+        Parameters:
+        - bucket_name: The bucket of the charts.
+        - client: optional A boto3 S3 client. Created if not given.
+        - endpoint_url: optional An S3 compatible endpoint (e.g. a local stand-in like MinIO)
+          instead of AWS. URLs are then path-style URLs of the endpoint.
+        """
+        if client is None:
+            # slow to import, see `benchmarks/bench_startup.py`
+            import boto3
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.bucket_name = bucket_name
+        self.client = client
+        self.endpoint_url = endpoint_url
+
+    def url(self, key):
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket_name}/{key}"
+        return f"https://{self.bucket_name}.s3.amazonaws.com/{key}"
+
+    def get(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket_name, Key=key)
+        except self.client.exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return self.url(key)
+
+    def put(self, key, url):
+        pass
+
+    def upload(self, key, data, content_type):
+        """
+        Uploads a (publicly readable) chart. Returns its URL.
+        """
+        self.client.upload_fileobj(
+            BytesIO(data), self.bucket_name, key,
+            ExtraArgs={'ContentType': content_type, 'ACL': 'public-read'}
+        )
+        return self.url(key)
+
+class LocalStore:
+    """
+    Like S3Store, but the charts are files in a local `directory`: a key is cached if its file exists.
+
+    URLs are `base_url/<key>` (e.g. a web server serving `directory`), or file URIs without a `base_url`.
+    """
+
+    def __init__(self, directory, base_url=None):
+        self.directory = directory
+        self.base_url = base_url
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        if os.sep in key or key.startswith('.'):
+            raise ValueError(f"Invalid key: {key}.")
+        return os.path.join(self.directory, key)
+
+    def url(self, key):
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{key}"
+        return Path(os.path.abspath(self._path(key))).as_uri()
+
+    def get(self, key):
+        if os.path.exists(self._path(key)):
+            return self.url(key)
+        return None
+
+    def put(self, key, url):
+        pass
+
+    def upload(self, key, data, content_type):
+        # write + rename, so a chart is never served half written
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return self.url(key)
+
+class RenderCache:
+    """
+    Maps render keys to the URLs of uploaded charts, backed by one of the stores above.
+
+    Attributes:
+        - store: A MemoryStore, DiskStore, S3Store or LocalStore (or anything with `get(key)` and `put(key, url)`).
+        - hits: Number of `get()` calls that found a URL.
+        - misses: Number of `get()` calls that did not.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the URL cached for `key`, or None.
+        """
+        url = self.store.get(key)
+        if url is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return url
+
+    def put(self, key, url):
+        self.store.put(key, url)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,144 @@
+"""
+Render farm: renders many charts on all cores with a pool of forked worker processes.
+
+The parent process loads (and fully decodes) all assets before the workers are started with the
+'fork' start method, so the workers share the decoded pixel buffers copy-on-write instead of
+each loading their own copy. Only the records (in chunks) and the encoded images are sent
+between processes.
+
+If a worker dies (e.g. killed by the OOM killer), the pool breaks and every unfinished chunk
+is retried in a new pool, one record per task. The last retry runs each record in a worker of its
+own, so that only a record that keeps crashing its worker gets an error result.
+
+Example usage:
+    results = render_many(records, workers=8)
+    for record, result in zip(records, results):
+        if result.error is None:
+            ... result.encoded.data ...
+
+NOTE: Requires the 'fork' start method (Linux, or macOS with care), since the workers rely
+on the assets loaded by the parent.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+
+from constants import IMG_FILES
+import batch
+import natal_chart
+import utils
+
+DEFAULT_CHUNKSIZE = 4
+
+# - encoded: The image_encoding.EncodedImage of the record, or None if it failed.
+# - error: None, or a message "ExceptionType: message" if the record failed.
+RenderResult = namedtuple('RenderResult', ['encoded', 'error'])
+
+# set by the parent right before forking the workers (see `render_many`)
+_worker_state = None
+
+def _render_chunk(records):
+    image_loader, base_layers, options = _worker_state
+    results = []
+    # the local times of the whole chunk are converted to UT at once
+    for record, birth_data in zip(records, batch.parse_records(records)):
+        try:
+            if isinstance(birth_data, Exception):
+                raise birth_data
+            encoded = batch.render_record(record, image_loader, base_layers, birth_data=birth_data, **options)
+            results.append(RenderResult(encoded, None))
+        except Exception as e:
+            # invalid record, the other records of the chunk are not affected
+            results.append(RenderResult(None, f"{type(e).__name__}: {e}"))
+    return results
+
+def preload(image_loader):
+    """
+    Loads and decodes all images of `image_loader`, so that forked workers can share them.
+    """
+    for filename in utils.get_all_filenames(IMG_FILES):
+        image_loader.load(filename).load()
+
+def render_many(
+        records, workers=None, image_loader=None, base_layers=None, chunksize=DEFAULT_CHUNKSIZE,
+        retries=2, output_params=None, ephemeris_backend='swisseph', layout='spread', resolution='full',
+    ):
+    """
+    Renders and encodes the charts of many records on `workers` processes.
+
+    Args:
+        records (list): Records as in `batch.py` (dicts with `local_time` and `location` or `lat`/`lon`).
+        workers (int, optional): Number of worker processes. (default: the number of CPUs)
+        image_loader (ImageLoader, optional): Default: the process-wide local image loader of
+            `resolution` (see `natal_chart.get_local_image_loader`), with its BaseLayerCache.
+        base_layers (BaseLayerCache, optional): Only used with `image_loader`. Copied into every
+            worker, which then builds its missing layers itself.
+        chunksize (int, optional): Number of records per task. (default: DEFAULT_CHUNKSIZE)
+        retries (int, optional): How often a record whose worker crashed is retried. With 0, all records
+            of a chunk whose worker crashed fail. (default: 2)
+        output_params (dict, optional): Arguments of `image_encoding.encode_image`.
+        ephemeris_backend (str, optional): See `natal_chart.generate`.
+        layout (str, optional): See `natal_chart.generate`.
+        resolution (int or str, optional): See `natal_chart.generate`. Only used without `image_loader`.
+
+    Returns:
+        list: One RenderResult per record, in the same order as `records`.
+    """
+    global _worker_state
+    records = list(records)
+    workers = workers or os.cpu_count()
+    if image_loader is None:
+        image_loader = natal_chart.get_local_image_loader(resolution)
+        base_layers = natal_chart.get_local_base_layers(resolution)
+    preload(image_loader)
+    options = {
+        'output_params': output_params,
+        'ephemeris_backend': ephemeris_backend,
+        'layout': layout,
+    }
+
+    results = [None] * len(records)
+    # chunks of (start index, number of records)
+    pending = [(i, min(chunksize, len(records) - i)) for i in range(0, len(records), chunksize)]
+    attempts = 0
+    _worker_state = (image_loader, base_layers, options)
+    try:
+        while pending:
+            if attempts and attempts == retries:
+                # last attempt: each record alone, so only records that crash their own worker fail
+                crashed = [c for chunk in pending for c in _run_chunks(records, [chunk], results, 1)]
+            else:
+                crashed = _run_chunks(records, pending, results, workers)
+            if crashed and attempts == retries:
+                for start, n in crashed:
+                    for i in range(start, start + n):
+                        results[i] = RenderResult(None, "BrokenProcessPool: worker process crashed")
+                break
+            # retry one record per task, so a crashing record doesn't take others down with it
+            pending = [(i, 1) for start, n in crashed for i in range(start, start + n)]
+            attempts += 1
+    finally:
+        _worker_state = None
+    return results
+
+def _run_chunks(records, chunks, results, workers):
+    """
+    Runs `chunks` in a new pool and stores their results. Returns the chunks that didn't
+    finish because a worker crashed.
+    """
+    context = multiprocessing.get_context('fork')
+    crashed = []
+    with ProcessPoolExecutor(min(workers, len(chunks)), mp_context=context) as executor:
+        futures = {
+            executor.submit(_render_chunk, records[start:start + n]): (start, n)
+            for start, n in chunks
+        }
+        for future in as_completed(futures):
+            start, n = futures[future]
+            try:
+                results[start:start + n] = future.result()
+            except BrokenProcessPool:
+                crashed.append((start, n))
+    return sorted(crashed)
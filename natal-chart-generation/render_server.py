@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Standalone render server: serves charts over HTTP with the same query parameters and responses
+as the Lambda handler (see `chart_request.py`), e.g. for self-hosting or load testing.
+
+    GET /?local_time=1994-01-11T07:33:00&location=44.20169,17.90397[&format=webp&resolution=512]
+        200 {"url": ...}, 400 {"error": ...} (invalid request), 503 {"error": ...} (queue full)
+    GET /health
+        200 {"status": "ok", "queue": ..., "counters": ..., "timings": ...}
+
+Like behind API Gateway, every path other than /health is a chart request. Requests are
+converted to the Lambda event shape ({'queryStringParameters': ...}) and answered from a Lambda
+proxy response, see `RenderServer.handle_event`.
+
+The server runs on asyncio (standard library only):
+    - Cache lookups and uploads run on the default thread pool.
+    - Rendering and encoding run on a pool of worker processes, forked after the assets of the
+      `preload` resolution tiers were loaded and decoded (shared copy-on-write, see `render_pool.py`).
+      Each worker keeps its image loaders and base layers warm for the life of the process.
+    - Backpressure: renders wait in a bounded queue (`queue_size`), fed to the pool by one
+      dispatcher per worker. A request that finds the queue full is answered with 503 and
+      `Retry-After` right away, instead of piling up.
+    - Concurrent requests for the same chart share one render.
+
+Charts are stored with a storage backend of `render_cache.py`: a LocalStore (a directory) or an
+S3Store (AWS, or an S3 compatible stand-in like MinIO with `--s3-endpoint-url`).
+
+Run from the `natal-chart-generation` directory:
+    python render_server.py --port 8080 --workers 4 --storage charts/
+    python render_server.py --s3-bucket charts --s3-endpoint-url http://localhost:9000
+See `benchmarks/bench_render_server.py` for a load test.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, wait
+from http import HTTPStatus
+import multiprocessing
+import os
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import chart_request
+from ephemeris import EPHEMERIS_BACKENDS
+import image_encoding
+import metrics
+import natal_chart
+import render_cache
+import render_pool
+
+DEFAULT_QUEUE_SIZE = 64
+# longest accepted request head (request line and headers)
+MAX_HEAD_SIZE = 16 * 1024
+
+def render_request(request):
+    """
+    Renders and encodes the chart of a ChartRequest (in a worker process).
+
+    Returns:
+        image_encoding.EncodedImage
+    """
+    im = natal_chart.generate(
+        request.local_time, request.location,
+        local=True,
+        ephemeris_backend=request.ephemeris_backend,
+        bg_file=request.bg_file,
+        resolution=request.resolution,
+    )
+    return image_encoding.encode_image(im, **request.output_params)
+
+def _worker_pid():
+    return os.getpid()
+
+class RenderServer:
+    """
+    Attributes:
+        - cache: The RenderCache over the storage backend.
+        - workers: Number of worker processes (and dispatchers).
+        - queue_size: Maximum number of renders waiting for a worker.
+        - metrics: Counters and timings (milliseconds, summed) since the start, see `health()`.
+        - port: The port the server listens on, once started.
+    """
+
+    def __init__(
+            self, store, workers=None, queue_size=DEFAULT_QUEUE_SIZE, ephemeris_backend='swisseph',
+            preload=('full',), executor=None,
+        ):
+        """
+        Parameters:
+        - store: The storage backend, a LocalStore or S3Store (anything with `get(key)`, `put(key, url)`
+          and `upload(key, data, content_type)`).
+        - workers: optional (default=number of CPUs) Number of worker processes.
+        - queue_size: optional (default=DEFAULT_QUEUE_SIZE) Maximum number of renders waiting for a worker.
+        - ephemeris_backend: optional (default='swisseph') See `natal_chart.generate`.
+        - preload: optional (default=('full',)) Resolution tiers whose assets are loaded before the workers
+          are forked. Other tiers are loaded by each worker on first use.
+        - executor: optional An executor to render on instead of the worker processes (e.g. a
+          ThreadPoolExecutor in tests). It is not shut down by `close()`.
+        """
+        self.cache = render_cache.RenderCache(store)
+        self.workers = workers or os.cpu_count()
+        self.queue_size = queue_size
+        self.ephemeris_backend = ephemeris_backend
+        self.preload = preload
+        self.metrics = metrics.Metrics()
+        self.port = None
+        self._executor = executor
+        self._own_executor = executor is None
+        self._queue = None
+        self._dispatchers = []
+        # filename -> task rendering and uploading it
+        self._in_flight = {}
+        self._server = None
+        self._start_time = None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """
+        Starts the worker processes and listens on `host`:`port` (0 for any free port).
+        """
+        loop = asyncio.get_event_loop()
+        if self._executor is None:
+            for resolution in self.preload:
+                render_pool.preload(natal_chart.get_local_image_loader(resolution))
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+            # fork all workers now, before the first request starts any thread
+            wait([self._executor.submit(_worker_pid) for _ in range(self.workers)])
+        self._queue = asyncio.Queue(self.queue_size)
+        self._dispatchers = [loop.create_task(self._dispatch()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._serve_connection, host, port, limit=MAX_HEAD_SIZE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._start_time = time.time()
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        if self._own_executor:
+            self._executor.shutdown()
+
+    def health(self):
+        """
+        Returns the status of the server: queue, renders in flight, counters and timings.
+        """
+        return {
+            'status': 'ok',
+            'uptime': round(time.time() - self._start_time, 3),
+            'workers': self.workers,
+            'queue': self._queue.qsize(),
+            'queue_size': self.queue_size,
+            'in_flight': len(self._in_flight),
+            'counters': dict(self.metrics.counters),
+            'timings': {name: round(ms, 3) for name, ms in self.metrics.timings.items()},
+        }
+
+    async def handle_event(self, event):
+        """
+        Handles a chart request in the Lambda event shape. Returns a Lambda proxy response.
+        """
+        loop = asyncio.get_event_loop()
+        try:
+            request = chart_request.parse_request(event.get('queryStringParameters'), self.ephemeris_backend)
+        except ValueError as e:
+            return chart_request.response(400, {'error': str(e)})
+
+        task = self._in_flight.get(request.filename)
+        if task is None:
+            with self.metrics.span('cache_lookup'):
+                url = await loop.run_in_executor(None, self.cache.get, request.filename)
+            if url is not None:
+                self.metrics.increment('render_cache_hits')
+                return chart_request.response(200, {'url': url})
+            self.metrics.increment('render_cache_misses')
+            # the same chart may have been requested during the lookup
+            task = self._in_flight.get(request.filename)
+        if task is None:
+            rendered = loop.create_future()
+            try:
+                self._queue.put_nowait((request, rendered))
+            except asyncio.QueueFull:
+                self.metrics.increment('rejected')
+                return chart_request.response(
+                    503, {'error': "Too many requests, try again later."}, {'Retry-After': '1'}
+                )
+            task = loop.create_task(self._upload(request, rendered))
+            self._in_flight[request.filename] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(request.filename, None))
+        else:
+            self.metrics.increment('coalesced')
+
+        try:
+            # shielded: other requests may be waiting for the same task
+            url = await asyncio.shield(task)
+        except Exception as e:
+            self.metrics.increment('render_errors')
+            return chart_request.response(500, {'error': f"{type(e).__name__}: {e}"})
+        return chart_request.response(200, {'url': url})
+
+    async def _dispatch(self):
+        # feeds queued renders to the pool, one at a time (so the queue bounds the backlog)
+        loop = asyncio.get_event_loop()
+        while True:
+            request, rendered = await self._queue.get()
+            try:
+                with self.metrics.span('render'):
+                    encoded = await loop.run_in_executor(self._executor, render_request, request)
+            except Exception as e:
+                rendered.set_exception(e)
+            else:
+                rendered.set_result(encoded)
+
+    async def _upload(self, request, rendered):
+        loop = asyncio.get_event_loop()
+        encoded = await rendered
+        self.metrics.increment('renders')
+        with self.metrics.span('upload'):
+            url = await loop.run_in_executor(
+                None, self.cache.store.upload, request.filename, encoded.data, encoded.content_type
+            )
+        self.cache.put(request.filename, url)
+        return url
+
+    async def handle_http(self, method, target):
+        """
+        Routes an HTTP request (method and request target). Returns a Lambda proxy response.
+        """
+        url = urlsplit(target)
+        if method not in ('GET', 'HEAD'):
+            return chart_request.response(405, {'error': f"Method not allowed: {method}."}, {'Allow': 'GET, HEAD'})
+        if url.path == '/health':
+            return chart_request.response(200, self.health())
+        return await self.handle_event({'queryStringParameters': dict(parse_qsl(url.query)) or None})
+
+    async def _serve_connection(self, reader, writer):
+        # minimal HTTP/1.1: GET requests, keep-alive, request bodies are ignored
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    # connection closed by the client
+                    break
+                except asyncio.LimitOverrunError:
+                    self._write_response(writer, 'GET', chart_request.response(
+                        431, {'error': "Request header too large."}), keep_alive=False)
+                    break
+                try:
+                    request_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+                    method, target, version = request_line.split(' ')
+                    headers = dict(
+                        (name.strip().lower(), value.strip())
+                        for name, value in (line.split(':', 1) for line in header_lines)
+                    )
+                    content_length = int(headers.get('content-length', 0))
+                except ValueError:
+                    self._write_response(writer, 'GET', chart_request.response(
+                        400, {'error': "Malformed request."}), keep_alive=False)
+                    break
+                if content_length:
+                    await reader.readexactly(content_length)
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                self.metrics.increment('requests')
+                response = await self.handle_http(method, target)
+                self.metrics.increment(f"status_{response['statusCode'] // 100}xx")
+                self._write_response(writer, method, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(writer, method, response, keep_alive):
+        status = HTTPStatus(response['statusCode'])
+        body = response['body'].encode()
+        headers = dict(response['headers'], **{
+            'Content-Length': str(len(body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        })
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n" + ''.join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        ) + "\r\n"
+        writer.write(head.encode('latin-1') + (b'' if method == 'HEAD' else body))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080).")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs).")
+    parser.add_argument(
+        "--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+        help=f"Maximum number of renders waiting for a worker, more are answered with 503 (default: {DEFAULT_QUEUE_SIZE})."
+    )
+    parser.add_argument(
+        "--preload", type=chart_request.parse_resolution, nargs="+", default=['full'],
+        help="Resolution tiers loaded before forking the workers (default: full)."
+    )
+    parser.add_argument(
+        "--ephemeris-backend", choices=EPHEMERIS_BACKENDS, default="swisseph",
+        help="Where planet positions come from (default: swisseph)."
+    )
+    storage = parser.add_mutually_exclusive_group(required=True)
+    storage.add_argument("--storage", help="Store the charts in this directory.")
+    storage.add_argument("--s3-bucket", help="Store the charts in this S3 bucket.")
+    parser.add_argument("--base-url", help="URL the --storage directory is served at (default: file URIs).")
+    parser.add_argument("--s3-endpoint-url", help="S3 compatible endpoint to use instead of AWS, e.g. a local stand-in.")
+    args = parser.parse_args(argv)
+
+    if args.storage:
+        store = render_cache.LocalStore(args.storage, args.base_url)
+    else:
+        store = render_cache.S3Store(args.s3_bucket, endpoint_url=args.s3_endpoint_url)
+    server = RenderServer(
+        store, args.workers, args.queue_size, args.ephemeris_backend, preload=tuple(args.preload),
+    )
+
+    async def serve():
+        await server.start(args.host, args.port)
+        print(f"Serving on http://{args.host}:{server.port} with {server.workers} workers")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Sprite atlas of the planet and sign glyphs.
+
+The ~30 (resized) glyphs of `IMG_FILES['PLANETS']` and `IMG_FILES['SIGNS']` are
+packed into a single PNG, so a process opens (or downloads) one file instead of
+one per glyph. The index of sprite rectangles is stored as JSON in a tEXt chunk
+of the same PNG, so the atlas and its index can never get out of sync:
+
+    {"bg_size": 4000, "sprites": {"planets/Sun.png": [x, y, width, height], ...}}
+
+`AtlasImageLoader` wraps any other ImageLoader (local or remote): it loads the
+atlas through it once and hands out the glyphs as crops, while all other images
+(backgrounds, zodiac wheel, ...) are still loaded by the wrapped loader.
+
+Usage:
+    python sprite_atlas.py [--out images/sprite_atlas.png]
+"""
+import argparse
+import json
+import math
+import os
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from constants import IMG_DIR, IMG_FILES, SPRITE_ATLAS_FILE
+import utils
+
+# name of the PNG text chunk holding the index
+INDEX_KEY = 'sprites'
+
+
+def glyph_filenames(image_files=IMG_FILES):
+    """
+    Returns the (unique) filenames of all planet and sign glyphs.
+    """
+    return utils.get_all_filenames({
+        'PLANETS': image_files['PLANETS'],
+        'SIGNS': image_files['SIGNS'],
+    })
+
+
+def pack(sizes):
+    """
+    Packs rectangles into rows ("shelves"), tallest first.
+
+    Args:
+        sizes (dict): A dictionary mapping names to (width, height) tuples.
+
+    Returns:
+        tuple: ((width, height) of the atlas, a dictionary mapping names to (x, y) positions).
+    """
+    area = sum(w * h for w, h in sizes.values())
+    max_width = max(math.ceil(math.sqrt(area)), *(w for w, _ in sizes.values()))
+    positions = {}
+    x = y = row_height = width = 0
+    for name in sorted(sizes, key=lambda name: sizes[name][1], reverse=True):
+        w, h = sizes[name]
+        if x + w > max_width:
+            # start a new row
+            x, y = 0, y + row_height
+            row_height = 0
+        positions[name] = (x, y)
+        x += w
+        width = max(width, x)
+        row_height = max(row_height, h)
+    return (width, y + row_height), positions
+
+
+def build_atlas(image_loader, filenames=None):
+    """
+    Packs images into one RGBA atlas.
+
+    Args:
+        image_loader (ImageLoader): Loads the (already resized) images, and has a `bg_im_size` attribute.
+        filenames (list, optional): The images to pack. Defaults to `glyph_filenames()`.
+
+    Returns:
+        tuple: (atlas image, index dictionary), see the module docstring.
+    """
+    if filenames is None:
+        filenames = glyph_filenames()
+    images = {fname: image_loader.load(fname) for fname in filenames}
+    size, positions = pack({fname: im.size for fname, im in images.items()})
+    atlas = Image.new('RGBA', size)
+    sprites = {}
+    for fname, im in images.items():
+        x, y = positions[fname]
+        # plain copy of all channels (including alpha), no compositing
+        atlas.paste(im.convert('RGBA'), (x, y))
+        sprites[fname] = [x, y, im.size[0], im.size[1]]
+    return atlas, {'bg_size': image_loader.bg_im_size, 'sprites': sprites}
+
+
+def save_atlas(atlas, index, path):
+    """
+    Saves the atlas as a PNG, with `index` embedded as JSON.
+    """
+    info = PngInfo()
+    info.add_text(INDEX_KEY, json.dumps(index, sort_keys=True))
+    atlas.save(path, 'PNG', pnginfo=info)
+
+
+def read_index(atlas):
+    """
+    Returns the index embedded in an atlas image written by `save_atlas`.
+
+    Raises:
+        ValueError: If the image has no index.
+    """
+    try:
+        return json.loads(atlas.info[INDEX_KEY])
+    except KeyError:
+        raise ValueError("Image is not a sprite atlas (missing index).")
+
+
+class AtlasImageLoader(utils.ImageLoader):
+    """
+    Serves the images packed in a sprite atlas as crops of the atlas, and everything else
+    from the wrapped loader.
+
+    The atlas is loaded through the wrapped loader (on first use), so it is read or downloaded
+    once per process. If the wrapped loader returns a new atlas image (e.g. after a
+    `RemoteImageLoader` revalidation found a changed file), the sprites are cropped again.
+
+    Attributes:
+        - image_loader: The wrapped ImageLoader.
+        - atlas_file: Filename (key) of the atlas for the wrapped loader.
+        - bg_im_size: The background size the sprites were resized for (from the atlas index).
+    """
+
+    def __init__(self, image_loader, atlas_file=SPRITE_ATLAS_FILE):
+        self.image_loader = image_loader
+        self.atlas_file = atlas_file
+        self._atlas = None
+        self._index = None
+        self._sprites = {}
+
+    @property
+    def bg_im_size(self):
+        return self._load_atlas()['bg_size']
+
+    def _load_atlas(self):
+        atlas = self.image_loader.load(self.atlas_file)
+        if atlas is not self._atlas:
+            self._index = read_index(atlas)
+            self._atlas = atlas
+            self._sprites = {}
+        return self._index
+
+    def load(self, filename):
+        rect = self._load_atlas()['sprites'].get(filename)
+        if rect is None:
+            return self.image_loader.load(filename)
+        sprite = self._sprites.get(filename)
+        if sprite is None:
+            x, y, w, h = rect
+            sprite = self._sprites[filename] = self._atlas.crop((x, y, x + w, y + h))
+        return sprite
+
+
+def main():
+    out = os.path.join(IMG_DIR, SPRITE_ATLAS_FILE)
+    parser = argparse.ArgumentParser(
+        description="Pack the resized planet and sign glyphs into one sprite atlas."
+    )
+    parser.add_argument("--out", default=out, help=f"output file (default: {out})")
+    args = parser.parse_args()
+
+    image_loader = utils.LocalImageLoader(IMG_DIR, IMG_FILES)
+    image_loader.resize_all_images()
+    atlas, index = build_atlas(image_loader)
+    save_atlas(atlas, index, args.out)
+    print(f"Packed {len(index['sprites'])} sprites into a {atlas.size[0]}x{atlas.size[1]} atlas: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+SVG backend: the chart as a small SVG document that references the assets instead of compositing them,
+so the client (e.g. the web frontend) draws it.
+
+The document is drawn from the chart's display list (see `display_list.py`), so it has the same layout as a
+raster chart, in pixels of the chart's resolution:
+    - the background and the zodiac wheel as images, the wheel rotated with a transform,
+    - the house numbers and the logo, centered,
+    - the planet and sign glyphs as `<use>` references to a shared sprite sheet (`sprite_sheet`),
+    - the degree labels as text.
+
+Asset URLs are `asset_url` + the asset's filename (as in IMG_DIR, which is also how the assets are
+deployed to the CloudFront distribution), and the sprite sheet is expected at
+`asset_url` + SVG_SPRITE_SHEET_FILE. NOTE: An SVG loaded with `<img>` doesn't load external resources,
+the document has to be inlined (or loaded with `<object>`).
+
+Usage:
+    python svg_chart.py [--out images/glyphs.svg]
+"""
+import argparse
+from html import escape
+import os
+from urllib.parse import quote
+
+from constants import IMG_DIR, IMG_FILES, SIGNS, SVG_SPRITE_SHEET_FILE
+import image_params
+import labels
+import sprite_atlas
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+
+
+def glyph_id(filename):
+    """
+    Returns the id of a glyph in the sprite sheet, e.g. 'planets-North-Node' for 'planets/North Node.png'.
+    """
+    return os.path.splitext(filename)[0].replace('/', '-').replace(' ', '-')
+
+
+def _href(asset_url, filename):
+    return escape(asset_url + quote(filename))
+
+
+def sprite_sheet(image_files=IMG_FILES):
+    """
+    Returns the sprite sheet of all planet and sign glyphs: an SVG document with one `<symbol>` per
+    glyph (see `glyph_id`), which references the glyph image relative to the sheet. Each symbol is a
+    unit square that is stretched to the width and height of the `<use>` element.
+    """
+    symbols = ''.join(
+        f'<symbol id="{glyph_id(filename)}" viewBox="0 0 1 1" preserveAspectRatio="none">'
+        f'<image href="{_href("", filename)}" width="1" height="1" preserveAspectRatio="none"/></symbol>'
+        for filename in sprite_atlas.glyph_filenames(image_files)
+    )
+    return f'<svg xmlns="{SVG_NS}">{symbols}</svg>'
+
+
+def chart_svg(display, image_loader, asset_url=IMG_DIR + '/', sprite_sheet_url=None):
+    """
+    Returns the SVG document of a chart.
+
+    Args:
+        display (DisplayList): The layout of the chart (see `natal_chart.layout_chart`).
+        image_loader (ImageLoader): The image loader `display` was laid out with, for the size of the
+            centered layers.
+        asset_url (str, optional): URL prefix of the assets. (default: IMG_DIR, relative)
+        sprite_sheet_url (str, optional): URL of the sprite sheet. (default: `asset_url` + SVG_SPRITE_SHEET_FILE)
+
+    Returns:
+        str: The SVG document.
+    """
+    if sprite_sheet_url is None:
+        sprite_sheet_url = asset_url + SVG_SPRITE_SHEET_FILE
+    sprite_sheet_url = escape(sprite_sheet_url)
+    width, height = display.size
+    parts = [
+        f'<svg xmlns="{SVG_NS}" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        f'<image href="{_href(asset_url, display.bg_file)}" width="{width}" height="{height}"/>',
+    ]
+    # the wheel is rotated clockwise about its center so the ascendant is in the first house
+    # (see `natal_chart.set_background_layers`)
+    rotation = 30 * SIGNS.index(display.asc)
+    transform = f' transform="rotate({rotation} {width / 2:g} {height / 2:g})"' if rotation else ''
+    parts.append(
+        f'<image href="{_href(asset_url, IMG_FILES["ZODIAC_WHEEL"])}" width="{width}" height="{height}"{transform}/>'
+    )
+    for filename in (IMG_FILES['HOUSE_NUMBERS'], IMG_FILES['LOGO']):
+        w, h = image_loader.load(filename).size
+        parts.append(
+            f'<image href="{_href(asset_url, filename)}" x="{(width - w) // 2}" y="{(height - h) // 2}"'
+            f' width="{w}" height="{h}"/>'
+        )
+
+    # the labels' text origin is the top of the ascender (Pillow's default anchor), SVG text is placed at the baseline
+    text_size = image_params.text_size(height)
+    ascent, _ = labels.get_label_atlas(text_size).font.getmetrics()
+    parts.append(f'<g font-family="Inter,sans-serif" font-weight="500" font-size="{text_size}" fill="#fff">')
+    for p in display.placements:
+        if p.layer == 'label':
+            parts.append(f'<text x="{p.x}" y="{p.y + ascent}">{labels.label_text(p.asset)}</text>')
+        else:
+            left, top, right, bottom = p.box
+            parts.append(
+                f'<use href="{sprite_sheet_url}#{glyph_id(p.asset)}" x="{left}" y="{top}"'
+                f' width="{right - left}" height="{bottom - top}"/>'
+            )
+    parts.append('</g></svg>')
+    return ''.join(parts)
+
+
+def main():
+    out = os.path.join(IMG_DIR, SVG_SPRITE_SHEET_FILE)
+    parser = argparse.ArgumentParser(
+        description="Write the SVG sprite sheet of the planet and sign glyphs (used by SVG charts)."
+    )
+    parser.add_argument("--out", default=out, help=f"output file (default: {out})")
+    args = parser.parse_args()
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        f.write(sprite_sheet())
+    print(f"Wrote {len(sprite_atlas.glyph_filenames())} glyphs: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,23 @@
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import hashlib
 import random
 import sys
+import threading
+import time
+import zlib
+from urllib.parse import unquote
+import numpy as np
 import pytz
 import swisseph as swe
+from PIL import Image
 
-from constants import EPHE_DIR, PLANET_NAMES, SIGNS
-from natal_chart import NatalChart, Planet
+from constants import EPHE_DIR, IMG_FILES, PLANET_NAMES, SIGNS
+import image_params
+import utils
+from ephemeris import compute_positions_batch
+from natal_chart import NatalChart, Planet, charts_from_positions
 
 swe.set_ephe_path('../' + EPHE_DIR)
 
@@ -16,7 +28,7 @@ def generate_stellium(n):
         Returns: NatalChart: A mock Natal Chart object with a stellium of `n` randomly positioned planets.
     """
     theta = random.uniform(0, 360)
-    positions = [random.uniform(theta - 4, theta + 4) for _ in range(n)]
+    positions = [random.uniform(theta - 4, theta + 4) % 360 for _ in range(n)]
     m = len(NatalChart.required_objects) - n
     positions += [random.uniform(0, 360) for _ in range(m)]
     return create_mock_natal_chart(positions)
@@ -79,32 +91,9 @@ def random_chart():
 
     tz = pytz.timezone('UTC')
     dt = dt.astimezone(tz)
-    # calculate Julian day
-    # requires hour input as decimal with fraction
-    hour = dt.hour + (dt.minute + dt.second / 60) / 60
-    jd = swe.julday(dt.year, dt.month, dt.day, hour)
-
     # NOTE: ascendant is very important for orienting entire chart
-    _, ascmc = swe.houses(jd, geo[0], geo[1], bytes('W', 'utf-8'))
-    asc = SIGNS[int(ascmc[0] // 30)]
-
-    # create planet object/layer list
-    planets = []
-    for name, no_body in PLANET_NAMES.items():
-        abs_pos = swe.calc_ut(jd, no_body)[0][0]
-        pos = abs_pos % 30
-        sign = SIGNS[int(abs_pos // 30)]
-        p = Planet(name, pos, abs_pos, sign)
-        planets.append(p)
-
-    # add angles
-    for abs_pos, name in [(ascmc[0], 'Asc'), (ascmc[1], 'Mc')]:
-        pos = abs_pos % 30
-        sign = SIGNS[int(abs_pos // 30)]
-        p = Planet(name, pos, abs_pos, sign)
-        planets.append(p)
-
-    return NatalChart(planets, jd)
+    positions = compute_positions_batch([dt], [geo[0]], [geo[1]])
+    return charts_from_positions(positions)[0]
 
 def random_datetime():
     """
@@ -128,3 +117,165 @@ def random_location():
     longitude = random.uniform(-180, 180)
     latitude = random.uniform(-90, 90)
     return longitude, latitude
+
+def reference_clump_indices(dpos, theta, signs):
+    """
+    The original `find_clumps` algorithm (two sorts, forward & backward pass merged with a
+    disjoint-set), on indices. Used to validate `utils.find_clump_indices`.
+
+    Returns:
+        set: The clumps, as a set of frozensets of indices.
+    """
+    parent = list(range(len(dpos)))
+
+    def _find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    def _pass(indices):
+        curr_first = indices[0]
+        curr_size = 1
+        for i in indices[1:]:
+            if signs[curr_first] == signs[i] and abs(dpos[curr_first] - dpos[i]) < theta * curr_size:
+                parent[_find(i)] = _find(curr_first)
+                curr_size += 1
+            else:
+                curr_first = i
+                curr_size = 1
+
+    _pass(sorted(range(len(dpos)), key=lambda i: dpos[i]))
+    _pass(sorted(range(len(dpos)), key=lambda i: dpos[i], reverse=True))
+    clumps = {}
+    for i in range(len(dpos)):
+        clumps.setdefault(_find(i), set()).add(i)
+    return set(frozenset(c) for c in clumps.values())
+
+def random_clump_positions(rng, n=13):
+    """
+    Returns `n` random positions with a random number of stelliums (incl. around 0 degrees and sign boundaries).
+    """
+    centers = rng.uniform(0, 360, rng.integers(1, 4))
+    spread = rng.uniform(0, 15)
+    pos = np.where(
+        rng.random(n) < 0.6,
+        rng.choice(centers, n) + rng.uniform(-spread, spread, n),
+        rng.uniform(0, 360, n),
+    ) % 360
+    # exact duplicates (e.g. conjunctions in a mock chart)
+    dup = rng.random(n) < 0.1
+    pos[dup] = pos[0]
+    return pos.tolist()
+
+class SyntheticImageLoader(utils.ImageLoader):
+    """
+    An image loader that generates small, deterministic RGBA noise images instead of reading files,
+    sized like the (already resized) real assets. Useful for fast pixel-exact rendering tests.
+    """
+    def __init__(self, bg_size=256):
+        self.bg_im_size = bg_size
+        self.sizes = {IMG_FILES['LOGO']: image_params.LOGO_RADIUS}
+        self.sizes.update((f, image_params.PLANET_SIZE) for f in IMG_FILES['PLANETS'].values())
+        self.sizes.update((f, image_params.SIGN_SIZE) for f in IMG_FILES['SIGNS'].values())
+        self.image_cache = {}
+
+    def load(self, filename):
+        if filename not in self.image_cache:
+            size = max(1, int(self.sizes.get(filename, 1) * self.bg_im_size))
+            rng = np.random.default_rng(zlib.crc32(filename.encode()))
+            pixels = rng.integers(0, 256, (size, size, 4), dtype=np.uint8)
+            if filename in IMG_FILES['BACKGROUNDS']:
+                pixels[..., 3] = 255
+            self.image_cache[filename] = Image.fromarray(pixels)
+        return self.image_cache[filename]
+
+class LocalHTTPServer:
+    """
+    A local stand-in for the CloudFront distribution. Serves the files in `directory` over HTTP
+    from a background thread, supports ETag/If-None-Match and can add artificial latency.
+
+    Attributes:
+        - url: Base URL of the server.
+        - latency: Seconds to wait before answering each request.
+        - requests: A list of (path, status code) tuples, one per request served.
+
+    Example usage:
+        with LocalHTTPServer(directory) as server:
+            loader = utils.RemoteImageLoader(server.url)
+    """
+    def __init__(self, directory, latency=0.0):
+        self.directory = Path(directory)
+        self.latency = latency
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.latency)
+                path = server.directory / unquote(self.path).lstrip('/')
+                if not path.is_file():
+                    self._respond(404)
+                    return
+                body = path.read_bytes()
+                etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+                if self.headers.get('If-None-Match') == etag:
+                    self._respond(304, etag=etag)
+                else:
+                    self._respond(200, body, etag)
+
+            def _respond(self, status, body=b'', etag=None):
+                server.requests.append((self.path, status))
+                self.send_response(status)
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # the default backlog (5) drops connections of concurrent clients
+            request_queue_size = 128
+
+        self.httpd = Server(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self.httpd.server_address[1])
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class FakeS3Client:
+    """
+    A local, in-memory stand-in for a boto3 S3 client, implementing the calls used by
+    `render_cache.S3Store` and the Lambda handler.
+
+    Attributes:
+        - objects: A dict {(bucket, key): (body, extra_args)}.
+        - calls: A list of (operation name, key) tuples, one per call.
+    """
+    class exceptions:
+        from botocore.exceptions import ClientError
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+
+    def head_object(self, Bucket, Key):
+        self.calls.append(('HeadObject', Key))
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.ClientError(
+                {'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject'
+            )
+        body, _ = self.objects[(Bucket, Key)]
+        return {'ContentLength': len(body)}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None):
+        self.calls.append(('PutObject', Key))
+        self.objects[(Bucket, Key)] = (Fileobj.read(), ExtraArgs or {})
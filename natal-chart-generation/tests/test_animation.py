@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta, timezone
+import gc
+import os
+import sys
+import tempfile
+import unittest
+import weakref
+from os.path import dirname, abspath
+from unittest import mock
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image
+
+import _utils
+import animation
+from constants import IMG_FILES
+import ephemeris
+import natal_chart
+import timezones
+
+BG_FILE = list(IMG_FILES['BACKGROUNDS'])[0]
+# rendering options `check_render_options` rejects
+INVALID_OPTIONS = [
+    {'layout': 'x'}, {'resolution': 300}, {'ephemeris_backend': 'x'}, {'house_system': 'x'}, {'bg_file': 'x.png'},
+]
+
+
+class TestGenerateAnimation(unittest.TestCase):
+
+    def setUp(self):
+        image_loader = _utils.SyntheticImageLoader()
+        patcher = mock.patch.object(
+            natal_chart, '_image_loader',
+            return_value=(image_loader, natal_chart.BaseLayerCache(image_loader)),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.image_loader = image_loader
+
+    def test_frame_times(self):
+        times = natal_chart.frame_times('2024-01-01T12:00:00', '2024-12-31T12:00:00', timedelta(days=1))
+        self.assertEqual(len(times), 366)
+        self.assertEqual(times[-1], datetime(2024, 12, 31, 12, tzinfo=timezone.utc))
+        # local times of a location, stepped in UT across the DST change (New York, UTC-5 / UTC-4)
+        times = natal_chart.frame_times(
+            '2024-03-09T12:00:00', '2024-03-11T12:00:00', timedelta(days=1), 40.7128, -74.0060
+        )
+        self.assertEqual([t.hour for t in times], [17, 17])
+        self.assertEqual(times[0], datetime(2024, 3, 9, 17, tzinfo=timezone.utc))
+        # the end is only included if it falls on a step
+        times = natal_chart.frame_times('2024-01-01T00:00:00', '2024-01-01T05:00:00', timedelta(hours=2))
+        self.assertEqual([t.hour for t in times], [0, 2, 4])
+        for start, end, step in [
+            ('2024-01-02T00:00:00', '2024-01-01T00:00:00', timedelta(days=1)),
+            ('2024-01-01T00:00:00', '2024-01-02T00:00:00', timedelta(0)),
+            ('2024-01-01T00:00:00', '2024-01-02T00:00:00', 1),
+            ('2024-01-01', 'tomorrow', timedelta(days=1)),
+        ]:
+            with self.assertRaises(ValueError):
+                natal_chart.frame_times(start, end, step)
+
+    def test_invalid_arguments(self):
+        # raised by the call, before any frame is rendered
+        for kwargs in INVALID_OPTIONS:
+            with self.assertRaises(ValueError):
+                natal_chart.generate_animation(
+                    '2024-01-01T12:00:00', '2024-01-05T12:00:00', timedelta(days=1), '0,0', local=True, **kwargs
+                )
+        with self.assertRaises(ValueError):
+            natal_chart.generate_animation('2024-01-01T12:00:00', '2024-01-05T12:00:00', timedelta(days=1), 'x')
+
+    def test_same_checks_as_generate(self):
+        # both entry points reject invalid options before parsing the time (and the timezone lookup)
+        to_ut = mock.Mock(side_effect=timezones.to_ut_batch)
+        with mock.patch.object(timezones, 'to_ut_batch', to_ut):
+            for kwargs in INVALID_OPTIONS:
+                with self.assertRaises(ValueError):
+                    natal_chart.generate('2024-01-01T12:00:00', '0,0', local=True, **kwargs)
+                with self.assertRaises(ValueError):
+                    natal_chart.generate_animation(
+                        '2024-01-01T12:00:00', '2024-01-05T12:00:00', timedelta(days=1), '0,0', local=True, **kwargs
+                    )
+            # `generate` only
+            with self.assertRaises(ValueError):
+                natal_chart.generate('2024-01-01T12:00:00', '0,0', local=True, format='pdf')
+        to_ut.assert_not_called()
+
+    def test_frames(self):
+        frames = natal_chart.generate_animation(
+            '2024-01-01T12:00:00', '2024-01-10T12:00:00', timedelta(days=3), '40.7128,-74.0060',
+            local=True, bg_file=BG_FILE,
+        )
+        frames = list(frames)
+        self.assertEqual(len(frames), 4)
+        # same as rendering each still
+        for frame, dt in zip(frames, natal_chart.frame_times(
+                '2024-01-01T12:00:00', '2024-01-10T12:00:00', timedelta(days=3), 40.7128, -74.0060)):
+            still = natal_chart.render_chart(dt, 40.7128, -74.0060, self.image_loader, bg_file=BG_FILE)
+            self.assertEqual(frame.tobytes(), still.tobytes())
+
+    def test_batches(self):
+        compute = mock.Mock(side_effect=ephemeris.compute_positions_batch)
+        with mock.patch.object(natal_chart, 'ANIMATION_BATCH_SIZE', 4), \
+                mock.patch.object(ephemeris, 'compute_positions_batch', compute):
+            frames = natal_chart.generate_animation(
+                '2024-01-01T12:00:00', '2024-01-10T12:00:00', timedelta(days=1), '0,0', local=True,
+            )
+            # lazy
+            compute.assert_not_called()
+            n = sum(1 for _ in frames)
+        self.assertEqual(n, 10)
+        self.assertEqual([len(call[0][0]) for call in compute.call_args_list], [4, 4, 2])
+
+
+class TestWriteAnimation(unittest.TestCase):
+
+    def frames(self, n, alive=None):
+        # `alive` gets the number of frames still referenced when each frame is made
+        refs = []
+        for i in range(n):
+            if alive is not None:
+                gc.collect()
+                alive.append(sum(ref() is not None for ref in refs))
+            # the same colors in every frame (like the background and glyphs of a chart), swapped in odd frames
+            im = Image.new('RGBA', (64, 48), (200, 100, 0, 255) if i % 2 else (0, 100, 200, 255))
+            im.paste((0, 100, 200, 255) if i % 2 else (200, 100, 0, 255), (32, 0, 64, 48))
+            refs.append(weakref.ref(im))
+            yield im
+            del im
+
+    def test_formats(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for fmt in ['webp', 'gif']:
+                path = os.path.join(tmp_dir, f'anim.{fmt}')
+                alive = []
+                n = animation.write_animation(self.frames(12, alive), path, fmt, n_frames=12, duration=50)
+                self.assertEqual(n, 12)
+                # one frame (and the first one, for WebP) at a time
+                self.assertLessEqual(max(alive), 2, fmt)
+                with Image.open(path) as im:
+                    self.assertEqual(im.size, (64, 48))
+                    self.assertEqual(im.n_frames, 12)
+                    for i, color in [(10, (0, 100, 200)), (11, (200, 100, 0))]:
+                        im.seek(i)
+                        for value, expected in zip(im.convert('RGB').getpixel((5, 5)), color):
+                            self.assertAlmostEqual(value, expected, delta=8)
+            directory = os.path.join(tmp_dir, 'frames')
+            self.assertEqual(animation.write_animation(self.frames(3), directory, 'png'), 3)
+            self.assertEqual(sorted(os.listdir(directory)), ['000000.png', '000001.png', '000002.png'])
+
+    def test_invalid(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'anim.webp')
+            with self.assertRaises(ValueError):
+                animation.write_animation(self.frames(2), path, 'mp4')
+            # the WebP encoder needs the number of frames
+            with self.assertRaises(ValueError):
+                animation.write_animation(self.frames(2), path, 'webp')
+            with self.assertRaises(ValueError):
+                animation.write_animation(self.frames(2), path, 'webp', n_frames=3)
+            with self.assertRaises(ValueError):
+                animation.write_animation(iter([]), os.path.join(tmp_dir, 'anim.gif'), 'gif')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import sys
+import tempfile
+import unittest
+from os.path import dirname, abspath
+from pathlib import Path
+from unittest import mock
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import ImageChops
+
+import _utils
+import asset_bundle
+from constants import IMG_FILES
+import image_params
+from natal_chart import _generate
+import utils
+
+
+class TestAssetBundle(unittest.TestCase):
+
+    def setUp(self):
+        self.image_loader = _utils.SyntheticImageLoader(bg_size=300)
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = Path(temp_dir.name) / 'assets.bundle'
+        self.filenames = utils.get_all_filenames(IMG_FILES)
+
+    def assertSameImage(self, a, b):
+        self.assertEqual(a.mode, b.mode)
+        self.assertEqual(a.size, b.size)
+        self.assertIsNone(ImageChops.difference(a, b).getbbox())
+
+    def test_round_trip(self):
+        asset_bundle.bake(self.image_loader, self.path, self.filenames)
+        bundle = asset_bundle.AssetBundle(self.path)
+        self.assertEqual(bundle.bg_im_size, 300)
+        for fname in self.filenames:
+            self.assertIn(fname, bundle)
+            self.assertSameImage(bundle.load(fname), self.image_loader.load(fname))
+        self.assertIs(bundle.load(self.filenames[0]), bundle.load(self.filenames[0]))
+
+    def test_images_are_read_only_views(self):
+        asset_bundle.bake(self.image_loader, self.path, self.filenames)
+        im = asset_bundle.AssetBundle(self.path).load(IMG_FILES['LOGO'])
+        self.assertTrue(im.readonly)
+        # drawing on it works on a private copy
+        im.paste((0, 0, 0, 0), (0, 0, 1, 1))
+        self.assertSameImage(asset_bundle.AssetBundle(self.path).load(IMG_FILES['LOGO']),
+                             self.image_loader.load(IMG_FILES['LOGO']))
+
+    def test_stale_params(self):
+        asset_bundle.bake(self.image_loader, self.path, self.filenames)
+        with mock.patch.object(image_params, 'PLANET_SIZE', image_params.PLANET_SIZE * 2):
+            with self.assertRaises(ValueError):
+                asset_bundle.AssetBundle(self.path)
+
+    def test_not_a_bundle(self):
+        self.path.write_bytes(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            asset_bundle.AssetBundle(self.path)
+
+    def test_loader_fallback(self):
+        backgrounds = list(IMG_FILES['BACKGROUNDS'])
+        asset_bundle.bake(self.image_loader, self.path, [f for f in self.filenames if f not in backgrounds])
+        bundle = asset_bundle.AssetBundle(self.path)
+        self.assertNotIn(backgrounds[0], bundle)
+        loader = asset_bundle.BundleImageLoader(bundle, self.image_loader)
+        self.assertIs(loader.load(backgrounds[0]), self.image_loader.load(backgrounds[0]))
+        with self.assertRaises(KeyError):
+            asset_bundle.BundleImageLoader(bundle).load(backgrounds[0])
+
+        chart = _utils.create_mock_natal_chart(list(range(7, 360, 27))[:13])
+        actual = _generate(chart, loader, backgrounds[0])
+        chart = _utils.create_mock_natal_chart(list(range(7, 360, 27))[:13])
+        self.assertSameImage(actual, _generate(chart, self.image_loader, backgrounds[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import sys
+import unittest
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import ImageChops
+
+import _utils
+from constants import IMG_FILES, SIGNS
+from natal_chart import BaseLayerCache, _generate, set_background_layers
+
+
+class TestBaseLayerCache(unittest.TestCase):
+    image_loader = _utils.SyntheticImageLoader()
+    bg_files = list(IMG_FILES['BACKGROUNDS'])
+
+    def assertSameImage(self, a, b):
+        self.assertEqual(a.mode, b.mode)
+        self.assertIsNone(ImageChops.difference(a, b).getbbox())
+
+    def test_matches_set_background_layers(self):
+        cache = BaseLayerCache(self.image_loader)
+        for asc in ['Ari', 'Leo', 'Pis']:
+            expected = set_background_layers(asc, self.bg_files[0], self.image_loader)
+            self.assertSameImage(cache.get(asc, self.bg_files[0]), expected)
+            self.assertSameImage(cache.get(asc, self.bg_files[0]), expected)
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+    def test_returns_copies(self):
+        cache = BaseLayerCache(self.image_loader)
+        layer = cache.get('Ari', self.bg_files[0])
+        layer.paste((255, 0, 0), (0, 0, 50, 50))
+        self.assertNotEqual(cache.get('Ari', self.bg_files[0]).getpixel((0, 0)), (255, 0, 0))
+
+    def test_lru_eviction(self):
+        cache = BaseLayerCache(self.image_loader, maxsize=2)
+        cache.get('Ari', self.bg_files[0])
+        cache.get('Tau', self.bg_files[0])
+        cache.get('Ari', self.bg_files[0])  # 'Tau' is now least recently used
+        cache.get('Gem', self.bg_files[0])
+        self.assertEqual(len(cache), 2)
+        cache.get('Ari', self.bg_files[0])
+        self.assertEqual(cache.misses, 3)
+        cache.get('Tau', self.bg_files[0])
+        self.assertEqual(cache.misses, 4)
+
+    def test_warm(self):
+        cache = BaseLayerCache(self.image_loader, maxsize=None)
+        cache.warm(self.bg_files[:2])
+        self.assertEqual(len(cache), 2 * len(SIGNS))
+        cache.get('Sco', self.bg_files[1])
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_generate_with_cache(self):
+        cache = BaseLayerCache(self.image_loader)
+        chart = _utils.create_mock_natal_chart(list(range(0, 360, 28))[:13])
+        expected = _generate(chart, self.image_loader, self.bg_files[0])
+        for _ in range(2):
+            chart = _utils.create_mock_natal_chart(list(range(0, 360, 28))[:13])
+            self.assertSameImage(_generate(chart, self.image_loader, self.bg_files[0], cache), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
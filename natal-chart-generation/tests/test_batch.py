@@ -0,0 +1,106 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from os.path import dirname, abspath, join
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image
+
+import _utils
+import batch
+import natal_chart
+
+
+def write_lines(path, lines):
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.out = join(self.dir, 'out')
+        self.image_loader = _utils.SyntheticImageLoader()
+        self.base_layers = natal_chart.BaseLayerCache(self.image_loader)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_batch(self, path, **kwargs):
+        self.messages = []
+        return batch.run_batch(
+            batch.read_records(path), self.out, self.image_loader, self.base_layers,
+            log=self.messages.append, **kwargs
+        )
+
+    def read_manifest(self):
+        with open(join(self.out, batch.MANIFEST_FILE)) as f:
+            return [json.loads(line) for line in f]
+
+    def test_jsonl(self):
+        path = join(self.dir, 'records.jsonl')
+        write_lines(path, [
+            json.dumps({'id': 'a', 'local_time': '1994-01-11T07:33:00', 'location': '44.20169,17.90397'}),
+            '',
+            json.dumps({'id': 'b', 'local_time': '1962-02-04T17:55:00', 'location': '51.5074,-0.1278'}),
+        ])
+        summary = self.run_batch(path)
+        self.assertEqual((summary['ok'], summary['failed']), (2, 0))
+        results = self.read_manifest()
+        self.assertEqual([r['id'] for r in results], ['a', 'b'])
+        self.assertEqual([r['line'] for r in results], [1, 3])
+        for r in results:
+            with Image.open(join(self.out, r['file'])) as im:
+                self.assertEqual(im.size, (self.image_loader.bg_im_size,) * 2)
+        # all charts share one base layer cache
+        self.assertEqual(self.base_layers.hits + self.base_layers.misses, 2)
+
+    def test_csv(self):
+        path = join(self.dir, 'records.csv')
+        write_lines(path, [
+            'id,local_time,lat,lon',
+            'a,1994-01-11T07:33:00,44.20169,17.90397',
+            'b,1962-02-04T17:55:00,51.5074,-0.1278',
+        ])
+        summary = self.run_batch(path, output_params={'fmt': 'webp'})
+        self.assertEqual((summary['ok'], summary['failed']), (2, 0))
+        self.assertEqual([r['file'] for r in self.read_manifest()], ['000000.webp', '000001.webp'])
+
+    def test_errors_do_not_stop_the_stream(self):
+        path = join(self.dir, 'records.jsonl')
+        write_lines(path, [
+            json.dumps({'id': 'bad date', 'local_time': 'yesterday', 'location': '0,0'}),
+            '{not json',
+            json.dumps({'id': 'no location', 'local_time': '1994-01-11T07:33:00'}),
+            json.dumps({'id': 'ok', 'local_time': '1994-01-11T07:33:00', 'location': '0,0'}),
+        ])
+        summary = self.run_batch(path)
+        self.assertEqual((summary['ok'], summary['failed']), (1, 3))
+        self.assertEqual(len(self.messages), 3)
+        results = self.read_manifest()
+        self.assertIn('Invalid local_time', results[0]['error'])
+        self.assertIn('line 2', results[1]['error'])
+        self.assertIn('location', results[2]['error'])
+        self.assertNotIn('error', results[3])
+        self.assertTrue(os.path.exists(join(self.out, results[3]['file'])))
+
+    def test_invalid_input_file(self):
+        with self.assertRaises(ValueError):
+            list(batch.read_records(join(self.dir, 'records.txt')))
+
+    def test_cli_import_has_no_side_effects(self):
+        # `natal_chart_cli` used to call main() on import
+        script = "import sys; sys.argv = ['natal_chart_cli']; import natal_chart_cli"
+        subprocess.run([sys.executable, '-c', script], cwd=grandparent_dir, check=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
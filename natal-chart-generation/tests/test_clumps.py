@@ -0,0 +1,74 @@
+import math
+import sys
+import unittest
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+import numpy as np
+
+import _utils
+from constants import SIGNS
+from image_params import PLANET_SIZE, PLANET_RADIUS
+import utils
+
+
+class TestFindClumpIndices(unittest.TestCase):
+    theta = math.degrees(2 * math.asin(0.5 * (PLANET_SIZE / 2) / PLANET_RADIUS))
+
+    def as_sets(self, clumps):
+        return set(frozenset(c) for c in clumps)
+
+    def test_matches_reference(self):
+        rng = np.random.default_rng(0)
+        for _ in range(20000):
+            dpos = _utils.random_clump_positions(rng)
+            signs = [SIGNS[int(p // 30)] for p in dpos]
+            clumps = utils.find_clump_indices(dpos, self.theta, signs)
+            self.assertEqual(self.as_sets(clumps), _utils.reference_clump_indices(dpos, self.theta, signs), dpos)
+
+    def test_partition_sorted(self):
+        rng = np.random.default_rng(1)
+        for use_signs in [False, True]:
+            for _ in range(200):
+                dpos = _utils.random_clump_positions(rng)
+                signs = [SIGNS[int(p // 30)] for p in dpos] if use_signs else None
+                clumps = utils.find_clump_indices(dpos, self.theta, signs)
+                self.assertEqual(sorted(i for c in clumps for i in c), list(range(len(dpos))))
+
+    def test_wraparound(self):
+        dpos = [359.0, 0.5, 180.0, 1.0]
+        clumps = utils.find_clump_indices(dpos, 5)
+        self.assertEqual(self.as_sets(clumps), {frozenset([0, 1, 3]), frozenset([2])})
+        # clumps are sorted along the circle
+        self.assertIn([0, 1, 3], clumps)
+        # with signs, 0 degrees is a boundary
+        signs = [SIGNS[int(p // 30)] for p in dpos]
+        clumps = utils.find_clump_indices(dpos, 5, signs)
+        self.assertEqual(self.as_sets(clumps), {frozenset([0]), frozenset([1, 3]), frozenset([2])})
+
+    def test_sign_boundary(self):
+        self.assertEqual(len(utils.find_clump_indices([29.0, 31.0], 5)), 1)
+        self.assertEqual(len(utils.find_clump_indices([29.0, 31.0], 5, ['Ari', 'Tau'])), 2)
+
+    def test_edge_cases(self):
+        self.assertEqual(utils.find_clump_indices([], 5), [])
+        self.assertEqual(utils.find_clump_indices([10.0], 5), [[0]])
+        self.assertEqual(len(utils.find_clump_indices([0.0] * 13, 5)), 1)
+
+    def test_find_clumps_objects(self):
+        m = 13
+        # NOTE: Example why 2 passes are necessary !!!
+        chart = _utils.create_mock_natal_chart([45] * (m - 2) + [59] + [30])
+        clumps = utils.find_clumps(list(chart.objects.values()), self.theta)
+        self.assertEqual(len(clumps), 1)
+        self.assertEqual([p.dpos for p in clumps[0]], sorted(p.dpos for p in chart.objects.values()))
+
+        chart = _utils.create_mock_natal_chart([0] * (m // 2) + [358] * (m // 2) + [30] * (m % 2))
+        self.assertEqual(len(utils.find_clumps(list(chart.objects.values()), self.theta)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
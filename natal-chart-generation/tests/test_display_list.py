@@ -0,0 +1,106 @@
+import json
+import math
+import random
+import sys
+import unittest
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import ImageChops
+
+import _utils
+from constants import IMG_FILES
+import display_list
+import image_params
+import natal_chart
+
+BG_FILE = list(IMG_FILES['BACKGROUNDS'])[0]
+
+
+class TestDisplayList(unittest.TestCase):
+    image_loader = _utils.SyntheticImageLoader()
+
+    def assertSameImage(self, a, b):
+        self.assertEqual(a.size, b.size)
+        self.assertIsNone(ImageChops.difference(a, b).getbbox())
+
+    def test_matches_add_object(self):
+        # the vectorized positions are the ones of the scalar `add_object` path
+        size = self.image_loader.load(BG_FILE).size
+        text_size = image_params.text_size(size[1])
+        random.seed(0)
+        for _ in range(20):
+            chart = _utils.random_chart()
+            asc = chart.objects['Asc'].sign
+            placements = display_list.place_objects(chart.objects.values(), asc, size, self.image_loader)
+            expected = []
+            for p in chart.objects.values():
+                for layer, radius in zip(display_list.LAYERS, display_list.LAYER_RADII):
+                    obj_size = self.image_loader.load(p.images[layer]).size if layer != 'label' else (text_size, text_size)
+                    (a, b) = natal_chart.get_center(size, obj_size)
+                    (x, y) = natal_chart.get_coordinates(asc, a, b, radius * size[1], p.dpos)
+                    expected.append((p.name, layer, round(x), round(y)))
+            self.assertEqual([(q.name, q.layer, q.x, q.y) for q in placements], expected)
+            for q in placements:
+                self.assertIsInstance(q.x, int)
+                self.assertTrue(all(isinstance(v, int) for v in q.box))
+
+    def test_placements(self):
+        chart = _utils.create_mock_natal_chart(list(range(0, 360, 28))[:13])
+        display = natal_chart.layout_chart(chart, self.image_loader, BG_FILE)
+        self.assertEqual(display.size, (256, 256))
+        self.assertEqual(display.asc, chart.objects['Asc'].sign)
+        self.assertEqual(display.bg_file, BG_FILE)
+        self.assertEqual(len(display.placements), 39)
+        self.assertEqual([p.layer for p in display.placements], list(display_list.LAYERS) * 13)
+        for p in display.placements:
+            if p.layer == 'label':
+                self.assertEqual(p.asset, math.floor(chart.objects[p.name].position))
+            else:
+                self.assertEqual(p.asset, chart.objects[p.name].images[p.layer])
+                left, top, right, bottom = p.box
+                self.assertEqual((left, top), (p.x, p.y))
+                self.assertEqual((right - left, bottom - top), self.image_loader.load(p.asset).size)
+
+    def test_rasterize_matches_generate(self):
+        for positions in [list(range(0, 360, 28))[:13], [100 + i for i in range(13)]]:
+            for layout in natal_chart.LAYOUTS:
+                display = natal_chart.layout_chart(_utils.create_mock_natal_chart(positions), self.image_loader, BG_FILE, layout)
+                expected = natal_chart._generate(_utils.create_mock_natal_chart(positions), self.image_loader, BG_FILE, layout=layout)
+                self.assertSameImage(natal_chart.rasterize(display, self.image_loader), expected)
+                # replayed from JSON, with cached base layers
+                base_layers = natal_chart.BaseLayerCache(self.image_loader)
+                replayed = display_list.from_json(display_list.to_json(display))
+                self.assertSameImage(natal_chart.rasterize(replayed, self.image_loader, base_layers), expected)
+
+    def test_json_round_trip(self):
+        chart = _utils.create_mock_natal_chart([5 + 27 * i for i in range(13)])
+        display = natal_chart.layout_chart(chart, self.image_loader, BG_FILE)
+        data = display_list.to_json(display)
+        self.assertEqual(display_list.from_json(data), display)
+        # plain data, a few KB
+        self.assertEqual(len(json.loads(data)['placements']), 39)
+        self.assertLess(len(data.encode()), 5000)
+
+    def test_size_mismatch(self):
+        chart = _utils.create_mock_natal_chart(list(range(0, 360, 28))[:13])
+        display = natal_chart.layout_chart(chart, self.image_loader, BG_FILE, size=(512, 512))
+        with self.assertRaises(ValueError):
+            natal_chart.rasterize(display, self.image_loader)
+
+    def test_draw_region(self):
+        chart = _utils.create_mock_natal_chart([100 + i for i in range(13)])
+        display = natal_chart.layout_chart(chart, self.image_loader, BG_FILE)
+        full = natal_chart.rasterize(display, self.image_loader)
+        base = natal_chart.set_background_layers(display.asc, BG_FILE, self.image_loader)
+        for rect in [(0, 0, 256, 256), (40, 30, 120, 90), (200, 180, 256, 256)]:
+            region = base.crop(rect)
+            display_list.draw_region(region, rect, display.placements, self.image_loader, 256)
+            self.assertSameImage(region, full.crop(rect))
+
+
+if __name__ == "__main__":
+    unittest.main()
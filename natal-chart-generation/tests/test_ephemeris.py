@@ -0,0 +1,62 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+import numpy as np
+import swisseph as swe
+
+from constants import EPHE_DIR, PLANET_NAMES, SIGNS
+import ephemeris
+from natal_chart import NatalChart, charts_from_positions
+
+swe.set_ephe_path(os.path.join(grandparent_dir, EPHE_DIR))
+
+
+class TestEphemerisBatch(unittest.TestCase):
+    datetimes = [datetime(1900, 1, 1) + timedelta(days=3652.4 * i, minutes=97 * i) for i in range(20)]
+    lats = np.linspace(-60, 60, 20)
+    lons = np.linspace(-170, 170, 20)
+
+    def test_julian_days_match_swisseph(self):
+        jds = ephemeris.julian_days(self.datetimes)
+        for dt, jd in zip(self.datetimes, jds):
+            hour = dt.hour + (dt.minute + dt.second / 60) / 60
+            self.assertAlmostEqual(jd, swe.julday(dt.year, dt.month, dt.day, hour), places=8)
+
+    def test_julian_days_timezone_aware(self):
+        dt = datetime(2000, 1, 1, 14, tzinfo=timezone(timedelta(hours=2)))
+        self.assertAlmostEqual(ephemeris.julian_days([dt])[0], 2451545.0, places=8)
+
+    def test_positions_match_per_body_calls(self):
+        batch = ephemeris.compute_positions_batch(self.datetimes, self.lats, self.lons)
+        self.assertEqual(batch.abs_pos.shape, (20, len(ephemeris.OBJECT_NAMES)))
+        for i, jd in enumerate(batch.jd):
+            _, ascmc = swe.houses(jd, self.lats[i], self.lons[i], b'W')
+            expected = [swe.calc_ut(jd, b)[0][0] for b in PLANET_NAMES.values()] + list(ascmc[:2])
+            np.testing.assert_allclose(batch.abs_pos[i], expected, atol=1e-9)
+        np.testing.assert_array_equal(batch.signs, batch.abs_pos // 30)
+        np.testing.assert_allclose(batch.degrees, batch.abs_pos % 30)
+
+    def test_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            ephemeris.compute_positions_batch(self.datetimes, self.lats[:3], self.lons)
+
+    def test_charts_from_positions(self):
+        batch = ephemeris.compute_positions_batch(self.datetimes, self.lats, self.lons)
+        charts = charts_from_positions(batch)
+        self.assertEqual(len(charts), 20)
+        for chart, row in zip(charts, batch.abs_pos):
+            self.assertEqual(set(chart.objects), NatalChart.required_objects)
+            sun = chart.objects['Sun']
+            self.assertEqual(sun.abs_pos, row[0])
+            self.assertEqual(sun.sign, SIGNS[int(row[0] // 30)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+import unittest
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+import numpy as np
+import swisseph as swe
+
+from constants import EPHE_DIR, PLANET_NAMES
+import ephemeris
+import ephemeris_table
+
+swe.set_ephe_path(os.path.join(grandparent_dir, EPHE_DIR))
+
+
+class TestEphemerisTable(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # one year is enough to cover a full cycle of the fast bodies
+        cls.table = ephemeris_table.build_table(1990, 1990)
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp_dir.name, 'table.bin')
+        cls.table.save(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_load_is_memory_mapped(self):
+        table = ephemeris_table.EphemerisTable.load(self.path)
+        self.assertIsInstance(table.data, np.memmap)
+        self.assertEqual(table.data.dtype, np.float32)
+        self.assertEqual(table.body_numbers, list(PLANET_NAMES.values()))
+        self.assertEqual(table.jd_range, self.table.jd_range)
+        np.testing.assert_array_equal(table.data, self.table.data)
+
+    def test_load_invalid_file(self):
+        path = os.path.join(self.tmp_dir.name, 'invalid.bin')
+        with open(path, 'wb') as f:
+            f.write(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            ephemeris_table.EphemerisTable.load(path)
+
+    def test_max_error(self):
+        errors = ephemeris_table.max_error(self.table, n=2000)
+        self.assertEqual(set(errors), set(PLANET_NAMES.values()))
+        # see the accuracy notes in `ephemeris_table.py`
+        self.assertLess(max(errors.values()), 5e-3)
+
+    def test_out_of_range(self):
+        first, last = self.table.jd_range
+        with self.assertRaises(ValueError):
+            self.table.longitudes([last + 1])
+
+    def test_backend_matches_swisseph(self):
+        first, last = self.table.jd_range
+        # last record is out of range and falls back to the Swiss Ephemeris
+        jd = np.array([first, (first + last) / 2, last, last + 10])
+        lats, lons = np.full(4, 51.5), np.full(4, -0.1)
+        exact = ephemeris.positions_from_julian_days(jd, lats, lons, 'swisseph')
+        approx = ephemeris.positions_from_julian_days(jd, lats, lons, self.table)
+        diff = np.abs((approx.abs_pos - exact.abs_pos + 180) % 360 - 180)
+        self.assertLess(diff.max(), 5e-3)
+        np.testing.assert_array_equal(approx.abs_pos[3], exact.abs_pos[3])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            ephemeris.compute_positions_batch([], [], [], backend='jpl')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+import numpy as np
+import swisseph as swe
+
+from constants import EPHE_DIR
+import ephemeris
+import houses
+from natal_chart import charts_from_positions
+
+swe.set_ephe_path(os.path.join(grandparent_dir, EPHE_DIR))
+
+
+def angle_diff(a, b):
+    return np.abs((np.asarray(a) - np.asarray(b) + 180) % 360 - 180)
+
+
+class TestHousesBatch(unittest.TestCase):
+    rng = np.random.default_rng(0)
+    n = 300
+    jd = rng.uniform(2415020.5, 2488069.5, n)
+    # includes latitudes inside the polar circles
+    lats = rng.uniform(-89, 89, n)
+    lons = rng.uniform(-180, 180, n)
+
+    def test_matches_swisseph(self):
+        for name, hsys in houses.HOUSE_SYSTEMS.items():
+            batch = houses.compute_houses_batch(self.jd, self.lats, self.lons, name)
+            self.assertEqual(batch.cusps.shape, (self.n, 12))
+            for i in range(self.n):
+                try:
+                    cusps, ascmc = swe.houses(self.jd[i], self.lats[i], self.lons[i], hsys)
+                except swe.Error:
+                    # Placidus/Koch inside the polar circles
+                    cusps, ascmc = swe.houses(self.jd[i], self.lats[i], self.lons[i], b'O')
+                self.assertLess(angle_diff(batch.asc[i], ascmc[0]), 1e-9)
+                self.assertLess(angle_diff(batch.mc[i], ascmc[1]), 1e-9)
+                self.assertLess(angle_diff(batch.armc[i], ascmc[2]), 1e-9)
+                self.assertLess(angle_diff(batch.cusps[i], cusps[:12]).max(), 1e-9, name)
+
+    def test_whole_sign_cusps(self):
+        batch = houses.compute_houses_batch(self.jd, self.lats, self.lons, 'whole_sign')
+        np.testing.assert_array_equal(batch.cusps[:, 0], batch.asc // 30 * 30)
+        np.testing.assert_array_equal(batch.cusps % 30, 0)
+
+    def test_shared_instants_are_cached(self):
+        houses.sidereal_terms.cache_clear()
+        jd = np.repeat(self.jd[:3], 50)
+        houses.compute_houses_batch(jd, self.lats[:150], self.lons[:150])
+        self.assertEqual(houses.sidereal_terms.cache_info().misses, 3)
+
+    def test_invalid_house_system(self):
+        with self.assertRaises(ValueError):
+            houses.compute_houses_batch(self.jd, self.lats, self.lons, 'regiomontanus')
+
+    def test_chart_cusps(self):
+        positions = ephemeris.compute_positions_batch(
+            [datetime(1994, 1, 11, 6, 33)], [44.20169], [17.90397], house_system='placidus'
+        )
+        chart = charts_from_positions(positions, 'placidus')[0]
+        self.assertEqual(chart.house_system, 'placidus')
+        self.assertEqual(len(chart.cusps), 12)
+        self.assertAlmostEqual(chart.cusps[0], chart.objects['Asc'].abs_pos)
+
+
+if __name__ == "__main__":
+    unittest.main()
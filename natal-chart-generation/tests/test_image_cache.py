@@ -0,0 +1,188 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from os.path import dirname, abspath
+from unittest import mock
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image
+
+import _utils
+from image_cache import ImageCache, image_bytes
+import utils
+
+# a small image file dictionary like `constants.IMG_FILES`
+IMAGE_FILES = {
+    'ZODIAC_WHEEL': 'wheel.png',
+    'HOUSE_NUMBERS': 'house_numbers.png',
+    'LOGO': 'logo.png',
+    'BACKGROUNDS': {'backgrounds/1.png': 1, 'backgrounds/2.png': 1, 'backgrounds/3.png': 1},
+    'PLANETS': {'Sun': 'planets/Sun.png'},
+    'SIGNS': {'Ari': 'signs/Ari.png'},
+}
+BACKGROUNDS = list(IMAGE_FILES['BACKGROUNDS'])
+
+
+def rgba(size):
+    return Image.new('RGBA', (size, size))
+
+
+class TestImageCache(unittest.TestCase):
+
+    def test_image_bytes(self):
+        self.assertEqual(image_bytes(Image.new('RGBA', (10, 20))), 800)
+        # 3 bands are padded to 4 bytes per pixel
+        self.assertEqual(image_bytes(Image.new('RGB', (10, 20))), 800)
+        self.assertEqual(image_bytes(Image.new('L', (10, 20))), 200)
+        self.assertEqual(image_bytes(Image.new('P', (10, 20))), 200)
+        self.assertEqual(image_bytes(Image.new('I;16', (10, 20))), 400)
+
+    def test_lru(self):
+        cache = ImageCache(budget=3 * 400)
+        for key in 'abc':
+            cache.put(key, rgba(10))
+        self.assertEqual(cache.resident_bytes, 1200)
+        # 'a' is used, so 'b' is the least recently used
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('d', rgba(10))
+        self.assertEqual(list(cache), ['c', 'a', 'd'])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.resident_bytes, 1200)
+        # a larger image evicts as many as needed
+        cache.put('e', rgba(20))
+        self.assertEqual(list(cache), ['e'])
+        self.assertEqual(cache.stats(), {
+            'hits': 1, 'misses': 1, 'evictions': 4, 'entries': 1,
+            'resident_bytes': 1600, 'pinned_bytes': 0, 'budget': 1200,
+        })
+
+    def test_replace(self):
+        cache = ImageCache(budget=1000)
+        cache['a'] = rgba(10)
+        cache['a'] = rgba(5)
+        self.assertEqual((len(cache), cache.resident_bytes), (1, 100))
+        self.assertEqual(cache['a'].size, (5, 5))
+        self.assertEqual(cache.pop('a').size, (5, 5))
+        self.assertIsNone(cache.pop('a'))
+        self.assertEqual(cache.resident_bytes, 0)
+        with self.assertRaises(KeyError):
+            cache['a']
+
+    def test_pinned(self):
+        cache = ImageCache(budget=2 * 400, pinned=['a'])
+        cache.put('a', rgba(10))
+        for key in 'bcd':
+            cache.put(key, rgba(10))
+        self.assertIn('a', cache)
+        self.assertEqual(list(cache), ['a', 'd'])
+        # pinned images stay, even over the budget
+        cache.pin('d')
+        cache.put('e', rgba(10))
+        self.assertEqual(list(cache), ['a', 'd', 'e'])
+        self.assertEqual(cache.stats()['pinned_bytes'], 800)
+        cache.unpin('d')
+        self.assertEqual(list(cache), ['a', 'e'])
+
+    def test_no_budget(self):
+        cache = ImageCache()
+        for i in range(100):
+            cache.put(i, rgba(10))
+        self.assertEqual((len(cache), cache.evictions, cache.resident_bytes), (100, 0, 40000))
+
+    def test_peek(self):
+        cache = ImageCache(budget=800)
+        cache.put('a', rgba(10))
+        cache.put('b', rgba(10))
+        self.assertIsNotNone(cache.peek('a'))
+        self.assertIsNone(cache.peek('c'))
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+        # not marked as used: 'a' is evicted first
+        cache.put('c', rgba(10))
+        self.assertEqual(list(cache), ['b', 'c'])
+
+
+class TestLoaderBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        for f in utils.get_all_filenames(IMAGE_FILES):
+            path = os.path.join(self.tmp_dir.name, f)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            size = 64 if f in BACKGROUNDS or f == IMAGE_FILES['ZODIAC_WHEEL'] else 32
+            Image.new('RGBA', (size, size), (len(f), 0, 0, 255)).save(path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hot_filenames(self):
+        self.assertEqual(
+            sorted(utils.hot_filenames(IMAGE_FILES)),
+            sorted(['wheel.png', 'house_numbers.png', 'logo.png', 'planets/Sun.png', 'signs/Ari.png']),
+        )
+
+    def test_local(self):
+        # room for the hot images and a background
+        loader = utils.LocalImageLoader(self.tmp_dir.name, IMAGE_FILES, bg_size=32, cache_budget=16 * 1024)
+        loader.load_all_images()
+        loader.resize_all_images()
+        stats = loader.image_cache.stats()
+        self.assertLessEqual(stats['resident_bytes'], 16 * 1024)
+        self.assertGreater(stats['evictions'], 0)
+        for _ in range(2):
+            for f in BACKGROUNDS:
+                # evicted backgrounds are resized again
+                self.assertEqual(loader.load(f).size, (32, 32))
+            self.assertEqual(loader.load(IMAGE_FILES['ZODIAC_WHEEL']).size, (32, 32))
+        for f in utils.hot_filenames(IMAGE_FILES):
+            self.assertIn(f, loader.image_cache)
+        self.assertLessEqual(loader.image_cache.resident_bytes, 16 * 1024)
+        # only the first load of an image is reported
+        with mock.patch('builtins.print') as print_:
+            for f in BACKGROUNDS:
+                loader.load(f)
+        print_.assert_not_called()
+
+    def test_local_no_budget(self):
+        loader = utils.LocalImageLoader(self.tmp_dir.name, IMAGE_FILES)
+        loader.load_all_images()
+        self.assertEqual(len(loader.image_cache), 8)
+        self.assertEqual(loader.image_cache.evictions, 0)
+
+    def test_scaled(self):
+        full = utils.LocalImageLoader(self.tmp_dir.name, IMAGE_FILES)
+        loader = utils.ScaledImageLoader(full, 32, cache_budget=4096, pinned=['wheel.png'])
+        for f in ['wheel.png'] + BACKGROUNDS:
+            self.assertEqual(loader.load(f).size, (32, 32))
+        self.assertEqual(list(loader.image_cache), ['wheel.png', BACKGROUNDS[-1]])
+
+    def test_remote(self):
+        pinned = utils.hot_filenames(IMAGE_FILES)
+        manifest = utils.get_all_filenames(IMAGE_FILES)
+        with _utils.LocalHTTPServer(self.tmp_dir.name) as server:
+            loader = utils.RemoteImageLoader(
+                server.url, manifest, cache_budget=3 * 16 * 1024, pinned=pinned,
+            )
+            loader.load(pinned[0])
+            # only the pinned images are prefetched
+            self.assertEqual(sorted(p for p, _ in server.requests), sorted('/' + f for f in pinned))
+            for f in BACKGROUNDS:
+                self.assertEqual(loader.load(f).size, (64, 64))
+            loader.revalidate_after = 0
+            time.sleep(0.01)
+            del server.requests[:]
+            # evicted: downloaded again (not a conditional request), cached: revalidated
+            loader.load(BACKGROUNDS[0])
+            loader.load(pinned[0])
+            self.assertEqual(server.requests, [('/' + BACKGROUNDS[0], 200), ('/' + pinned[0], 304)])
+            self.assertIn(pinned[0], loader.image_cache)
+            self.assertEqual(loader.image_cache.evictions, 3)
+            self.assertLessEqual(loader.image_cache.resident_bytes, loader.image_cache.budget)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import sys
+import unittest
+from io import BytesIO
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image, ImageChops
+
+import _utils
+from constants import IMG_FILES
+from image_encoding import OUTPUT_FORMATS, check_output_params, encode_image
+from natal_chart import _generate
+
+
+class TestImageEncoding(unittest.TestCase):
+    chart = _utils.create_mock_natal_chart(list(range(0, 360, 28))[:13])
+    im = _generate(chart, _utils.SyntheticImageLoader(), list(IMG_FILES['BACKGROUNDS'])[0])
+
+    def test_all_formats(self):
+        for fmt in OUTPUT_FORMATS:
+            encoded = encode_image(self.im, fmt)
+            self.assertEqual(encoded.format, fmt)
+            self.assertEqual(encoded.size, len(encoded.data))
+            self.assertGreaterEqual(encoded.encode_seconds, 0)
+            decoded = Image.open(BytesIO(encoded.data))
+            self.assertEqual(decoded.size, self.im.size)
+            self.assertEqual(Image.MIME[decoded.format], encoded.content_type)
+
+    def test_lossless(self):
+        for fmt in ['png', 'webp-lossless']:
+            decoded = Image.open(BytesIO(encode_image(self.im, fmt).data)).convert('RGB')
+            self.assertIsNone(ImageChops.difference(decoded, self.im).getbbox(), fmt)
+
+    def test_compress_level(self):
+        # the synthetic chart is mostly noise, reduce it to 16 colors so that it compresses at all
+        im = self.im.quantize(16).convert('RGB')
+        fast = encode_image(im, 'png', compress_level=0)
+        small = encode_image(im, 'png', compress_level=9)
+        self.assertLess(small.size, fast.size)
+
+    def test_invalid_params(self):
+        for kwargs in [{'fmt': 'jpeg'}, {'compress_level': 10}, {'quality': -1}]:
+            with self.assertRaises(ValueError):
+                check_output_params(**kwargs)
+            with self.assertRaises(ValueError):
+                encode_image(self.im, **kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
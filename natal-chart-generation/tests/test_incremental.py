@@ -0,0 +1,116 @@
+import random
+import sys
+import unittest
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import ImageChops
+
+import _utils
+from constants import IMG_FILES, SIGNS
+import natal_chart
+from display_list import Placement, dirty_rects
+from natal_chart import BaseLayerCache, NatalChart, Planet, _generate, render_incremental
+
+BG_FILE = list(IMG_FILES['BACKGROUNDS'])[0]
+NAMES = sorted(NatalChart.required_objects)
+
+
+def chart_at(positions):
+    """
+    Returns a chart with the objects at `positions` (name -> absolute position), in the order of NAMES.
+    """
+    return NatalChart([
+        Planet(name, positions[name] % 30, positions[name], SIGNS[int(positions[name]) // 30]) for name in NAMES
+    ])
+
+
+class TestRenderIncremental(unittest.TestCase):
+    image_loader = _utils.SyntheticImageLoader()
+
+    def setUp(self):
+        self.base_layers = BaseLayerCache(self.image_loader)
+
+    def assertSameImage(self, a, b):
+        self.assertEqual(a.size, b.size)
+        self.assertIsNone(ImageChops.difference(a, b).getbbox())
+
+    def full_render(self, positions, layout='spread'):
+        return _generate(chart_at(positions), self.image_loader, BG_FILE, layout=layout)
+
+    def test_matches_full_render(self):
+        rng = random.Random(0)
+        for layout in natal_chart.LAYOUTS:
+            positions = {name: rng.uniform(0, 360) for name in NAMES}
+            previous = render_incremental(chart_at(positions), self.image_loader, self.base_layers, bg_file=BG_FILE, layout=layout)
+            self.assertIsNone(previous.dirty)
+            self.assertSameImage(previous.image, self.full_render(positions, layout))
+            for _ in range(20):
+                # move a few objects (not the ascendant, which rotates the base layer)
+                for name in rng.sample([name for name in NAMES if name != 'Asc'], rng.randint(1, 4)):
+                    positions[name] = (positions[name] + rng.uniform(-5, 5)) % 360
+                rendered = render_incremental(chart_at(positions), self.image_loader, self.base_layers, previous, layout=layout)
+                self.assertIsNotNone(rendered.dirty)
+                self.assertSameImage(rendered.image, self.full_render(positions, layout))
+                previous = rendered
+
+    def test_overlapping_objects(self):
+        # a stellium: glyphs and labels overlap, and moving one object moves its neighbours
+        positions = {name: 100 + i for i, name in enumerate(NAMES)}
+        previous = render_incremental(chart_at(positions), self.image_loader, self.base_layers, bg_file=BG_FILE)
+        for shift in [0.5, 1, 3, -2]:
+            positions['Sun'] += shift
+            previous = render_incremental(chart_at(positions), self.image_loader, self.base_layers, previous)
+            self.assertSameImage(previous.image, self.full_render(positions))
+
+    def test_unchanged(self):
+        positions = {name: 25 * i for i, name in enumerate(NAMES)}
+        previous = render_incremental(chart_at(positions), self.image_loader, self.base_layers, bg_file=BG_FILE)
+        rendered = render_incremental(chart_at(positions), self.image_loader, self.base_layers, previous)
+        self.assertEqual(rendered.dirty, [])
+        self.assertSameImage(rendered.image, previous.image)
+        self.assertIsNot(rendered.image, previous.image)
+
+    def test_in_place(self):
+        positions = {name: 25 * i for i, name in enumerate(NAMES)}
+        previous = render_incremental(chart_at(positions), self.image_loader, self.base_layers, bg_file=BG_FILE)
+        before = previous.image.copy()
+        positions['Moon'] += 10
+        rendered = render_incremental(chart_at(positions), self.image_loader, self.base_layers, previous)
+        # the previous chart is left alone by default
+        self.assertSameImage(previous.image, before)
+        rendered = render_incremental(chart_at(positions), self.image_loader, self.base_layers, previous, in_place=True)
+        self.assertIs(rendered.image, previous.image)
+        self.assertSameImage(rendered.image, self.full_render(positions))
+
+    def test_new_base_layer(self):
+        positions = {name: 25 * i for i, name in enumerate(NAMES)}
+        previous = render_incremental(chart_at(positions), self.image_loader, self.base_layers, bg_file=BG_FILE)
+        # the ascendant moves to another sign
+        positions['Asc'] += 30
+        rendered = render_incremental(chart_at(positions), self.image_loader, self.base_layers, previous)
+        self.assertIsNone(rendered.dirty)
+        self.assertSameImage(rendered.image, self.full_render(positions))
+
+    def test_dirty_rects(self):
+        old = [
+            Placement('Sun', 'planet', 'sun.png', 10, 10, (10, 10, 30, 30)),
+            Placement('Sun', 'label', 5, 0, 0, (-5, -5, 5, 5)),
+            Placement('Moon', 'planet', 'moon.png', 100, 100, (100, 100, 120, 120)),
+        ]
+        self.assertEqual(dirty_rects(old, old, (200, 200)), [])
+        # overlapping boxes are merged, boxes are clipped to the image
+        new = [old[0]._replace(x=20, box=(20, 10, 40, 30)), old[1]._replace(asset=6), old[2]]
+        self.assertEqual(dirty_rects(old, new, (200, 200)), [(10, 10, 40, 30), (0, 0, 5, 5)])
+        new = [old[0], old[1], old[2]._replace(x=190, box=(190, 100, 210, 120))]
+        self.assertEqual(dirty_rects(old, new, (200, 200)), [(100, 100, 120, 120), (190, 100, 200, 120)])
+        # different objects
+        self.assertIsNone(dirty_rects(old, old[:2], (200, 200)))
+        self.assertIsNone(dirty_rects(old, [old[0], old[1], old[2]._replace(name='Mars')], (200, 200)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import math
+import sys
+import unittest
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+import numpy as np
+from PIL import Image, ImageChops, ImageDraw
+
+import _utils
+from constants import IMG_FILES
+import image_params
+import labels
+import natal_chart
+import utils
+
+
+class TestLabelAtlas(unittest.TestCase):
+    atlas = labels.get_label_atlas()
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.bg = Image.fromarray(rng.integers(0, 256, (120, 160, 3), dtype=np.uint8))
+
+    def assertSameImage(self, a, b):
+        self.assertEqual(a.mode, b.mode)
+        self.assertIsNone(ImageChops.difference(a, b).getbbox())
+
+    def test_label_text(self):
+        self.assertEqual(labels.label_text(0.0), "0°")
+        self.assertEqual(labels.label_text(17.99), "17°")
+        self.assertEqual(labels.label_text(29.999), "29°")
+
+    def test_process_wide(self):
+        self.assertIs(labels.get_label_atlas(), self.atlas)
+        self.assertEqual(len(self.atlas.masks), labels.NUM_LABELS)
+        self.assertIs(labels.get_label_atlas(12), labels.get_label_atlas(12))
+        self.assertEqual(labels.get_label_atlas(12).font.size, 12)
+
+    def test_text_size(self):
+        # unchanged at the original resolution
+        self.assertEqual(image_params.text_size(image_params.TEXT_SIZE_BG), image_params.TEXT_SIZE)
+        self.assertEqual(image_params.text_size(image_params.TEXT_SIZE_BG // 2), image_params.TEXT_SIZE // 2)
+        self.assertEqual(image_params.text_size(1), 1)
+
+    def test_matches_draw_text(self):
+        # includes positions where the label is clipped by the image border
+        for xy in [(10, 10), (-7, -9), (140, 100), (60, 0)]:
+            for degree in range(labels.NUM_LABELS):
+                position = degree + 0.5
+                expected = self.bg.copy()
+                ImageDraw.Draw(expected).text(xy, labels.label_text(position), font=self.atlas.font)
+                actual = self.bg.copy()
+                self.atlas.paste(actual, xy, position)
+                self.assertSameImage(actual, expected)
+
+    def test_generate_matches_draw_text(self):
+        image_loader = _utils.SyntheticImageLoader(bg_size=512)
+        bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+        positions = list(range(3, 360, 27))[:13]
+        actual = natal_chart._generate(_utils.create_mock_natal_chart(positions), image_loader, bg_file)
+
+        # reference: the original rendering loop, with `ImageDraw.text`
+        chart = _utils.create_mock_natal_chart(positions)
+        asc = chart.objects['Asc'].sign
+        expected = natal_chart.set_background_layers(asc, bg_file, image_loader)
+        draw = ImageDraw.Draw(expected)
+        utils.spread_planets(list(chart.objects.values()))
+        # the text size scales with the background
+        text_size = image_params.text_size(image_loader.bg_im_size)
+        font = labels.get_label_atlas(text_size).font
+        text_obj = type('obj', (object,), {'size': (text_size, text_size)})
+        paste = lambda bg_im, obj, x, y: bg_im.paste(obj, (x, y), obj)
+        for p in chart.objects.values():
+            natal_chart.add_object(image_loader.load(p.images['planet']), expected, p.dpos, asc,
+                                   image_params.PLANET_SIZE, image_params.PLANET_RADIUS, paste)
+            natal_chart.add_object(image_loader.load(p.images['sign']), expected, p.dpos, asc,
+                                   image_params.SIGN_SIZE, image_params.SIGN_RADIUS, paste)
+            natal_chart.add_object(text_obj, expected, p.dpos, asc, None, image_params.TEXT_RADIUS,
+                                   lambda bg_im, obj, x, y: draw.text(
+                                       (x, y), "{}°".format(math.floor(p.position)), font=font))
+        self.assertSameImage(actual, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
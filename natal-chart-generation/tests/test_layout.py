@@ -0,0 +1,81 @@
+import random
+import sys
+import unittest
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+import numpy as np
+
+import _utils
+from constants import IMG_FILES
+import natal_chart
+import utils
+
+
+def circular_cost(x, p):
+    d = (np.asarray(x) - np.asarray(p) + 180) % 360 - 180
+    return float((d ** 2).sum())
+
+
+class TestSolveLayout(unittest.TestCase):
+    theta = utils.planet_theta()
+
+    def assertNoOverlaps(self, x, theta=None):
+        self.assertEqual(utils.find_overlaps(x, theta or self.theta), [])
+
+    def test_no_overlaps(self):
+        rng = np.random.default_rng(0)
+        for _ in range(2000):
+            dpos = _utils.random_clump_positions(rng)
+            self.assertNoOverlaps(utils.solve_layout_positions(dpos, self.theta))
+
+    def test_keeps_separated_positions(self):
+        dpos = np.arange(0, 360, 360 / 13) + 3
+        np.testing.assert_allclose(utils.solve_layout_positions(dpos, self.theta), dpos % 360)
+
+    def test_stellium_is_centered(self):
+        x = utils.solve_layout_positions([100.0] * 13, 5)
+        np.testing.assert_allclose(np.sort(x), 100 + 5 * (np.arange(13) - 6))
+
+    def test_wraparound(self):
+        np.testing.assert_allclose(utils.solve_layout_positions([359.0, 1.0], 5), [357.5, 2.5])
+        x = utils.solve_layout_positions([358.0, 359.0, 0.0, 1.0, 2.0], 5)
+        np.testing.assert_allclose(x, [350, 355, 0, 5, 10], atol=1e-9)
+
+    def test_full_circle(self):
+        x = utils.solve_layout_positions([0.0] * 80, 5)
+        gaps = np.diff(np.sort(x))
+        np.testing.assert_allclose(gaps, 4.5)
+
+    def test_locally_optimal(self):
+        # the problem is convex, so no feasible small perturbation may be cheaper
+        rng = np.random.default_rng(1)
+        for _ in range(100):
+            dpos = np.array(_utils.random_clump_positions(rng))
+            x = utils.solve_layout_positions(dpos, self.theta)
+            cost = circular_cost(x, dpos)
+            for _ in range(50):
+                y = x + rng.normal(0, 0.05, len(x))
+                if not utils.find_overlaps(y, self.theta, tol=0):
+                    self.assertGreaterEqual(circular_cost(y, dpos), cost - 1e-9)
+
+    def test_find_overlaps(self):
+        self.assertEqual(utils.find_overlaps([10.0, 12.0, 100.0], 5), [(0, 1)])
+        self.assertEqual(utils.find_overlaps([359.0, 1.0], 5), [(0, 1)])
+        self.assertEqual(utils.find_overlaps([10.0, 20.0], 5), [])
+        self.assertEqual(utils.find_overlaps([10.0], 5), [])
+
+    def test_generate_with_layout(self):
+        image_loader = _utils.SyntheticImageLoader()
+        random.seed(0)
+        chart = _utils.generate_stellium(8)
+        bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+        natal_chart._generate(chart, image_loader, bg_file, layout='solve')
+        self.assertNoOverlaps([p.dpos for p in chart.objects.values()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from os.path import dirname, abspath
+from unittest import mock
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image
+
+import _utils
+from constants import IMG_FILES
+import metrics
+import natal_chart
+import utils
+from test_render_cache import load_lambda_module
+import render_cache
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_disabled(self):
+        self.assertIsNone(metrics._current)
+        self.assertIs(metrics.span('a'), metrics.span('b'))
+        with metrics.span('a'):
+            metrics.increment('c')
+
+    def test_recording(self):
+        with metrics.recording() as m:
+            with metrics.span('a'):
+                time.sleep(0.01)
+            with metrics.span('a'):
+                pass
+            metrics.increment('c')
+            metrics.increment('c', 2)
+        self.assertIsNone(metrics._current)
+        self.assertGreaterEqual(m.timings['a'], 10)
+        self.assertEqual(m.counters, {'c': 3})
+        # not recorded anymore
+        metrics.increment('c')
+        self.assertEqual(m.counters, {'c': 3})
+
+    def test_threads(self):
+        with metrics.recording() as m:
+            with ThreadPoolExecutor(8) as executor:
+                list(executor.map(lambda _: metrics.increment('c'), range(1000)))
+        self.assertEqual(m.counters, {'c': 1000})
+
+    def test_emf(self):
+        m = metrics.Metrics(dimensions={'Format': 'png'})
+        m.add_time('render', 12.5)
+        m.increment('hits')
+        m.properties['statusCode'] = 200
+        out = io.StringIO()
+        with redirect_stdout(out):
+            m.emit()
+        document = json.loads(out.getvalue())
+        directive = document['_aws']['CloudWatchMetrics'][0]
+        self.assertEqual(directive['Namespace'], metrics.NAMESPACE)
+        self.assertEqual(directive['Dimensions'], [['Format']])
+        self.assertEqual(
+            directive['Metrics'],
+            [{'Name': 'render', 'Unit': 'Milliseconds'}, {'Name': 'hits', 'Unit': 'Count'}]
+        )
+        # every metric and dimension is a member of the document
+        self.assertEqual(
+            {k: document[k] for k in ('Format', 'render', 'hits', 'statusCode')},
+            {'Format': 'png', 'render': 12.5, 'hits': 1, 'statusCode': 200}
+        )
+        self.assertIsInstance(document['_aws']['Timestamp'], int)
+
+    def test_generate_spans(self):
+        image_loader = _utils.SyntheticImageLoader()
+        base_layers = natal_chart.BaseLayerCache(image_loader)
+        dt, lat, lon = natal_chart.parse_birth_data('1994-01-11T07:33:00', '44.20169,17.90397')
+        bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+        with metrics.recording() as m:
+            for _ in range(2):
+                natal_chart.render_chart(dt, lat, lon, image_loader, base_layers, bg_file=bg_file)
+        self.assertEqual(set(m.timings), {'ephemeris', 'base_layers', 'layout', 'objects'})
+        self.assertEqual(m.counters, {'base_layer_cache_misses': 1, 'base_layer_cache_hits': 1})
+
+    def test_remote_image_loader(self):
+        with tempfile.TemporaryDirectory() as directory:
+            Image.new('RGBA', (8, 8)).save(os.path.join(directory, 'a.png'))
+            Image.new('RGBA', (8, 8)).save(os.path.join(directory, 'b.png'))
+            with _utils.LocalHTTPServer(directory) as server:
+                loader = utils.RemoteImageLoader(server.url, ['a.png', 'b.png'])
+                with metrics.recording() as m:
+                    loader.load('a.png')
+                    loader.load('b.png')
+        self.assertEqual(m.counters, {'asset_cache_misses': 2, 'asset_cache_hits': 2})
+        self.assertEqual(set(m.timings), {'prefetch', 'fetch'})
+
+
+class TestHandlerMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.module = load_lambda_module()
+        self.client = _utils.FakeS3Client()
+        self.module._render_cache = render_cache.RenderCache(render_cache.S3Store('bucket', self.client))
+        self.module.generate = mock.Mock(return_value=Image.new('RGB', (8, 8)))
+        os.environ['NATAL_CHART_BUCKET_NAME'] = 'bucket'
+
+    def request(self, **params):
+        params.setdefault('local_time', '2000-01-01T12:00:00')
+        params.setdefault('location', '40.7128,-74.0060')
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.module.handler({'queryStringParameters': params}, None)
+        # the EMF document is the last line
+        return json.loads(out.getvalue().splitlines()[-1])
+
+    def test_emitted_metrics(self):
+        document = self.request()
+        names = [d['Name'] for d in document['_aws']['CloudWatchMetrics'][0]['Metrics']]
+        self.assertEqual(
+            set(names),
+            {'total', 'cache_lookup', 'render', 'encode', 'upload', 'render_cache_misses'}
+        )
+        self.assertEqual((document['statusCode'], document['format']), (200, 'png'))
+        self.assertGreaterEqual(document['total'], document['render'] + document['encode'])
+
+        document = self.request()
+        self.assertEqual(document['render_cache_hits'], 1)
+        self.assertNotIn('render', document)
+
+    def test_bad_request(self):
+        document = self.request(location='nowhere')
+        self.assertEqual(document['statusCode'], 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
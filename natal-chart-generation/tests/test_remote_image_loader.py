@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+import requests
+from PIL import Image
+
+import _utils
+import utils
+
+
+class TestRemoteImageLoader(unittest.TestCase):
+    manifest = ['bg.png', 'signs/Ari.png', 'signs/Tau.png', 'planets/Sun.png']
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        for i, key in enumerate(self.manifest):
+            self.write_image(key, (i, 0, 0, 255))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_image(self, key, color):
+        path = os.path.join(self.tmp_dir.name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new('RGBA', (8, 8), color).save(path)
+
+    def test_prefetch_and_memory_hits(self):
+        with _utils.LocalHTTPServer(self.tmp_dir.name) as server:
+            loader = utils.RemoteImageLoader(server.url, self.manifest)
+            im = loader.load('signs/Tau.png')
+            self.assertEqual(im.getpixel((0, 0)), (2, 0, 0, 255))
+            # whole manifest is fetched on first use
+            self.assertEqual(sorted(p for p, _ in server.requests), sorted('/' + k for k in self.manifest))
+            for key in self.manifest * 3:
+                loader.load(key)
+            self.assertEqual(len(server.requests), len(self.manifest))
+            self.assertEqual((loader.misses, loader.hits), (len(self.manifest), 1 + 3 * len(self.manifest)))
+
+    def test_revalidate_not_modified(self):
+        with _utils.LocalHTTPServer(self.tmp_dir.name) as server:
+            loader = utils.RemoteImageLoader(server.url, revalidate_after=0)
+            im = loader.load('bg.png')
+            time.sleep(0.01)
+            self.assertIs(loader.load('bg.png'), im)
+            self.assertEqual(server.requests, [('/bg.png', 200), ('/bg.png', 304)])
+            self.assertEqual((loader.misses, loader.not_modified), (1, 1))
+
+    def test_revalidate_modified(self):
+        with _utils.LocalHTTPServer(self.tmp_dir.name) as server:
+            loader = utils.RemoteImageLoader(server.url, revalidate_after=0)
+            loader.load('bg.png')
+            self.write_image('bg.png', (9, 9, 9, 255))
+            time.sleep(0.01)
+            self.assertEqual(loader.load('bg.png').getpixel((0, 0)), (9, 9, 9, 255))
+            self.assertEqual(loader.misses, 2)
+
+    def test_missing_image(self):
+        with _utils.LocalHTTPServer(self.tmp_dir.name) as server:
+            # a failed prefetch must not break the other images
+            loader = utils.RemoteImageLoader(server.url, self.manifest + ['missing.png'])
+            loader.load('bg.png')
+            self.assertEqual(len(loader.image_cache), len(self.manifest))
+            with self.assertRaises(requests.HTTPError):
+                loader.load('missing.png')
+
+    def test_latency(self):
+        latency = 0.05
+        with _utils.LocalHTTPServer(self.tmp_dir.name, latency=latency) as server:
+            loader = utils.RemoteImageLoader(server.url, self.manifest, max_workers=len(self.manifest))
+            t0 = time.perf_counter()
+            loader.load('bg.png')
+            cold = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            for key in self.manifest:
+                loader.load(key)
+            warm = time.perf_counter() - t0
+        # downloads run concurrently, and warm loads never touch the network
+        self.assertLess(cold, len(self.manifest) * latency)
+        self.assertLess(warm, latency)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+from os.path import dirname, abspath, join
+from unittest import mock
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image
+
+import _utils
+from constants import IMG_FILES
+import render_cache
+
+LAMBDA_FILE = join(dirname(grandparent_dir), 'cdk', 'lambda', 'lambda.py')
+
+def load_lambda_module():
+    # `lambda` is a keyword, the module can't be imported by name
+    spec = importlib.util.spec_from_file_location('lambda_function', LAMBDA_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestRenderKey(unittest.TestCase):
+    jd = 2451545.0
+
+    def test_rounding(self):
+        key = render_cache.render_key(self.jd, 40.7128, -74.006, 'bg.png')
+        # same minute, same location at LOCATION_DIGITS
+        self.assertEqual(render_cache.render_key(self.jd + 10 / 86400, 40.71281, -74.00601, 'bg.png'), key)
+        self.assertNotEqual(render_cache.render_key(self.jd + 1 / 1440, 40.7128, -74.006, 'bg.png'), key)
+        self.assertNotEqual(render_cache.render_key(self.jd, 40.7129, -74.006, 'bg.png'), key)
+
+    def test_params(self):
+        key = render_cache.render_key(self.jd, 0, 0, 'bg.png', {'fmt': 'png', 'quality': 80})
+        self.assertEqual(render_cache.render_key(self.jd, 0, 0, 'bg.png', {'quality': 80, 'fmt': 'png'}), key)
+        self.assertNotEqual(render_cache.render_key(self.jd, 0, 0, 'bg.png', {'fmt': 'webp', 'quality': 80}), key)
+        self.assertNotEqual(render_cache.render_key(self.jd, 0, 0, 'other.png', {'fmt': 'png', 'quality': 80}), key)
+        with mock.patch.object(render_cache, 'RENDERER_VERSION', render_cache.RENDERER_VERSION + 1):
+            self.assertNotEqual(render_cache.render_key(self.jd, 0, 0, 'bg.png', {'fmt': 'png', 'quality': 80}), key)
+
+    def test_seeded_background(self):
+        backgrounds = set()
+        for i in range(200):
+            bg_file = render_cache.seeded_background(self.jd + i, 0, 0)
+            self.assertIn(bg_file, IMG_FILES['BACKGROUNDS'])
+            self.assertEqual(render_cache.seeded_background(self.jd + i, 0, 0), bg_file)
+            backgrounds.add(bg_file)
+        self.assertGreater(len(backgrounds), 5)
+
+
+class TestStores(unittest.TestCase):
+
+    def check_store(self, store):
+        cache = render_cache.RenderCache(store)
+        self.assertIsNone(cache.get('abc.png'))
+        cache.put('abc.png', 'https://example.com/abc.png')
+        self.assertEqual(cache.get('abc.png'), 'https://example.com/abc.png')
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1})
+
+    def test_memory_store(self):
+        self.check_store(render_cache.MemoryStore())
+
+    def test_memory_store_lru(self):
+        store = render_cache.MemoryStore(maxsize=2)
+        store.put('a', 'url_a')
+        store.put('b', 'url_b')
+        store.get('a')
+        store.put('c', 'url_c')
+        self.assertEqual((store.get('a'), store.get('b'), store.get('c')), ('url_a', None, 'url_c'))
+
+    def test_disk_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.check_store(render_cache.DiskStore(directory))
+            # persistent
+            self.assertEqual(render_cache.DiskStore(directory).get('abc.png'), 'https://example.com/abc.png')
+            with self.assertRaises(ValueError):
+                render_cache.DiskStore(directory).get('../abc.png')
+
+    def test_s3_store(self):
+        client = _utils.FakeS3Client()
+        store = render_cache.S3Store('bucket', client)
+        cache = render_cache.RenderCache(store)
+        self.assertIsNone(cache.get('abc.png'))
+        client.upload_fileobj(open(os.devnull, 'rb'), 'bucket', 'abc.png')
+        self.assertEqual(cache.get('abc.png'), 'https://bucket.s3.amazonaws.com/abc.png')
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1})
+
+    def test_s3_store_upload(self):
+        client = _utils.FakeS3Client()
+        store = render_cache.S3Store('bucket', client, endpoint_url='http://localhost:9000/')
+        self.assertEqual(store.upload('abc.png', b'data', 'image/png'), 'http://localhost:9000/bucket/abc.png')
+        self.assertEqual(client.objects[('bucket', 'abc.png')], (b'data', {'ContentType': 'image/png', 'ACL': 'public-read'}))
+        self.assertEqual(store.get('abc.png'), 'http://localhost:9000/bucket/abc.png')
+
+    def test_local_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = render_cache.LocalStore(directory, 'http://localhost:8000/charts/')
+            self.assertIsNone(store.get('abc.png'))
+            self.assertEqual(store.upload('abc.png', b'data', 'image/png'), 'http://localhost:8000/charts/abc.png')
+            self.assertEqual(store.get('abc.png'), 'http://localhost:8000/charts/abc.png')
+            with open(join(directory, 'abc.png'), 'rb') as f:
+                self.assertEqual(f.read(), b'data')
+            self.assertEqual(os.listdir(directory), ['abc.png'])
+            self.assertTrue(render_cache.LocalStore(directory).get('abc.png').startswith('file://'))
+            with self.assertRaises(ValueError):
+                store.upload('../abc.png', b'data', 'image/png')
+
+    def test_s3_store_errors(self):
+        client = _utils.FakeS3Client()
+        client.head_object = mock.Mock(side_effect=client.exceptions.ClientError(
+            {'Error': {'Code': '403', 'Message': 'Forbidden'}}, 'HeadObject'
+        ))
+        with self.assertRaises(client.exceptions.ClientError):
+            render_cache.S3Store('bucket', client).get('abc.png')
+
+
+class TestHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.module = load_lambda_module()
+        self.client = _utils.FakeS3Client()
+        self.module._render_cache = render_cache.RenderCache(render_cache.S3Store('bucket', self.client))
+        self.generate = mock.Mock(return_value=Image.new('RGB', (8, 8)))
+        self.module.generate = self.generate
+        os.environ['NATAL_CHART_BUCKET_NAME'] = 'bucket'
+
+    def request(self, **params):
+        params.setdefault('local_time', '2000-01-01T12:00:00')
+        params.setdefault('location', '40.7128,-74.0060')
+        response = self.module.handler({'queryStringParameters': params}, None)
+        return response['statusCode'], json.loads(response['body'])
+
+    def test_hit_skips_render_and_upload(self):
+        status, body = self.request()
+        self.assertEqual(status, 200)
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(len(self.client.objects), 1)
+        # same birth data, a few seconds later
+        status, body2 = self.request(local_time='2000-01-01T12:00:05')
+        self.assertEqual(body2, body)
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual([op for op, _ in self.client.calls], ['HeadObject', 'PutObject', 'HeadObject'])
+        self.assertEqual(self.module._render_cache.stats(), {'hits': 1, 'misses': 1})
+
+    def test_miss_on_different_params(self):
+        self.request()
+        _, body = self.request(format='webp')
+        self.assertTrue(body['url'].endswith('.webp'))
+        self.request(location='40.7128,-74.0061')
+        self.assertEqual(self.generate.call_count, 3)
+        self.assertEqual(len(self.client.objects), 3)
+
+    def test_background_is_deterministic(self):
+        self.request()
+        bg_file = self.generate.call_args[1]['bg_file']
+        self.assertIn(bg_file, IMG_FILES['BACKGROUNDS'])
+        # empty bucket
+        self.module._render_cache = render_cache.RenderCache(render_cache.S3Store('bucket', _utils.FakeS3Client()))
+        self.request()
+        self.assertEqual(self.generate.call_args[1]['bg_file'], bg_file)
+
+    def test_invalid_request(self):
+        status, body = self.request(location='not a location')
+        self.assertEqual(status, 400)
+        self.assertIn('Invalid location', body['error'])
+        self.assertEqual(self.client.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
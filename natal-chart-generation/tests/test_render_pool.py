@@ -0,0 +1,84 @@
+import os
+import sys
+import unittest
+from os.path import dirname, abspath
+from unittest import mock
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+import _utils
+from constants import IMG_FILES
+import batch
+import natal_chart
+import render_pool
+
+render_record = batch.render_record
+
+def crashing_render_record(record, *args, **kwargs):
+    # runs in the (forked) worker
+    if record.get('crash'):
+        os._exit(1)
+    return render_record(record, *args, **kwargs)
+
+
+class TestRenderMany(unittest.TestCase):
+
+    def setUp(self):
+        self.image_loader = _utils.SyntheticImageLoader()
+        self.records = [
+            {'local_time': _utils.random_datetime().isoformat(), 'location': '{},{}'.format(*_utils.random_location()[::-1])}
+            for _ in range(10)
+        ]
+
+    def render_many(self, records, **kwargs):
+        base_layers = natal_chart.BaseLayerCache(self.image_loader)
+        return render_pool.render_many(
+            records, workers=3, image_loader=self.image_loader, base_layers=base_layers,
+            chunksize=2, **kwargs
+        )
+
+    def test_same_as_sequential(self):
+        # same background for all charts, so that the output is deterministic
+        bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+        with mock.patch.object(natal_chart, 'random_asset', return_value=bg_file):
+            results = self.render_many(self.records, output_params={'fmt': 'png', 'compress_level': 1})
+            expected = [render_record(r, self.image_loader, output_params={'compress_level': 1}) for r in self.records]
+        # in input order
+        self.assertEqual([r.error for r in results], [None] * len(self.records))
+        self.assertEqual([r.encoded.data for r in results], [e.data for e in expected])
+
+    def test_invalid_record(self):
+        records = list(self.records)
+        records[3] = {'local_time': 'yesterday', 'location': '0,0'}
+        results = self.render_many(records)
+        self.assertIn('Invalid local_time', results[3].error)
+        self.assertEqual(sum(r.error is None for r in results), len(records) - 1)
+
+    def test_worker_crash_is_retried(self):
+        records = list(self.records)
+        records[4] = dict(records[4], crash=True)
+        with mock.patch.object(batch, 'render_record', crashing_render_record):
+            results = self.render_many(records)
+        self.assertIn('BrokenProcessPool', results[4].error)
+        # all other records are rendered, including the ones in the crashed pool
+        for i, result in enumerate(results):
+            if i != 4:
+                self.assertIsNone(result.error, i)
+
+    def test_no_retries(self):
+        records = list(self.records)
+        records[4] = dict(records[4], crash=True)
+        with mock.patch.object(batch, 'render_record', crashing_render_record):
+            results = self.render_many(records, retries=0)
+        # at least the crashed chunk fails
+        self.assertIn('BrokenProcessPool', results[4].error)
+        self.assertIn('BrokenProcessPool', results[5].error)
+
+    def test_empty(self):
+        self.assertEqual(self.render_many([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from os.path import dirname, abspath
+from unittest import mock
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image
+
+import _utils
+import natal_chart
+import render_cache
+import render_server
+
+PARAMS = {'local_time': '2000-01-01T12:00:00', 'location': '40.7128,-74.0060'}
+
+def event(**params):
+    return {'queryStringParameters': dict(PARAMS, **params)}
+
+async def http_get(port, targets, method='GET'):
+    """
+    Sends GET requests for `targets` on one keep-alive connection. Returns a list of (status, headers, body).
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    for target in targets:
+        writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        head = (await reader.readuntil(b'\r\n\r\n')).decode().split('\r\n')
+        headers = dict(line.split(': ', 1) for line in head[1:] if line)
+        body = await reader.readexactly(int(headers['Content-Length']))
+        responses.append((int(head[0].split(' ')[1]), headers, json.loads(body)))
+    writer.close()
+    return responses
+
+
+class TestRenderServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = render_cache.LocalStore(self.tmp_dir.name)
+        self.executor = ThreadPoolExecutor(2)
+        # rendering is tested elsewhere
+        self.generate = mock.Mock(return_value=Image.new('RGB', (8, 8)))
+        patcher = mock.patch.object(natal_chart, 'generate', self.generate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        self.tmp_dir.cleanup()
+
+    def run_server(self, test, **kwargs):
+        async def run():
+            server = render_server.RenderServer(self.store, executor=self.executor, **dict({'workers': 2}, **kwargs))
+            await server.start(port=0)
+            try:
+                return await test(server)
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def test_render_and_cache(self):
+        async def test(server):
+            first = await server.handle_event(event())
+            second = await server.handle_event(event())
+            return server, first, second
+        server, first, second = self.run_server(test)
+        self.assertEqual(first['statusCode'], 200)
+        self.assertEqual(second, first)
+        url = json.loads(first['body'])['url']
+        self.assertTrue(url.startswith('file://'))
+        self.assertEqual(os.listdir(self.tmp_dir.name), [url.rsplit('/', 1)[1]])
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(server.metrics.counters['render_cache_hits'], 1)
+        self.assertEqual(server.metrics.counters['render_cache_misses'], 1)
+
+    def test_invalid_request(self):
+        async def test(server):
+            return [
+                await server.handle_event(event(location='north')),
+                await server.handle_event(event(resolution='300')),
+                await server.handle_event({'queryStringParameters': None}),
+            ]
+        for response in self.run_server(test):
+            self.assertEqual(response['statusCode'], 400)
+            self.assertIn('error', json.loads(response['body']))
+        self.generate.assert_not_called()
+
+    def test_coalesced(self):
+        async def test(server):
+            return server, await asyncio.gather(*[server.handle_event(event()) for _ in range(5)])
+        server, responses = self.run_server(test)
+        self.assertEqual(len({r['body'] for r in responses}), 1)
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(server.metrics.counters['coalesced'], 4)
+
+    def test_backpressure(self):
+        release = threading.Event()
+        def generate(*args, **kwargs):
+            release.wait(5)
+            return Image.new('RGB', (8, 8))
+        self.generate.side_effect = generate
+
+        async def test(server):
+            async def request(day):
+                return await server.handle_event(event(local_time=f'2000-01-0{day}T12:00:00'))
+            # one rendering, one waiting in the queue
+            tasks = [asyncio.ensure_future(request(1))]
+            while self.generate.call_count < 1:
+                await asyncio.sleep(0.01)
+            tasks.append(asyncio.ensure_future(request(2)))
+            while server._queue.qsize() < 1:
+                await asyncio.sleep(0.01)
+            rejected = await request(3)
+            release.set()
+            return rejected, await asyncio.gather(*tasks)
+        rejected, responses = self.run_server(test, workers=1, queue_size=1)
+        self.assertEqual(rejected['statusCode'], 503)
+        self.assertEqual(rejected['headers']['Retry-After'], '1')
+        self.assertEqual([r['statusCode'] for r in responses], [200, 200])
+
+    def test_render_error(self):
+        self.generate.side_effect = RuntimeError('boom')
+        response = self.run_server(lambda server: server.handle_event(event()))
+        self.assertEqual(response['statusCode'], 500)
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_http(self):
+        query = '&'.join(f"{k}={v}" for k, v in PARAMS.items())
+        async def test(server):
+            responses = await http_get(server.port, [f'/?{query}', '/health', '/?location=0,0'])
+            responses += await http_get(server.port, ['/'], method='POST')
+            return responses
+        (chart, health, invalid, post) = self.run_server(test)
+        self.assertEqual(chart[0], 200)
+        self.assertIn('url', chart[2])
+        self.assertEqual(health[0], 200)
+        self.assertEqual(health[2]['status'], 'ok')
+        self.assertEqual(health[2]['counters']['renders'], 1)
+        self.assertEqual(invalid[0], 400)
+        self.assertEqual(post[0], 405)
+
+    def test_worker_processes(self):
+        # the patched `generate` is inherited by the forked workers
+        async def run():
+            server = render_server.RenderServer(self.store, workers=1, preload=())
+            await server.start(port=0)
+            try:
+                return await server.handle_event(event(format='webp'))
+            finally:
+                await server.close()
+        response = asyncio.run(run())
+        self.assertEqual(response['statusCode'], 200)
+        self.assertTrue(json.loads(response['body'])['url'].endswith('.webp'))
+
+
+if __name__ == "__main__":
+    unittest.main()
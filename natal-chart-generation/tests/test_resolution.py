@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from os.path import dirname, abspath
+from unittest import mock
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image
+
+import _utils
+import asset_bundle
+from constants import IMG_FILES
+import image_params
+import natal_chart
+import render_cache
+import utils
+from test_render_cache import load_lambda_module
+
+
+class TestResolutionTiers(unittest.TestCase):
+
+    def test_scaled_image_loader(self):
+        full = _utils.SyntheticImageLoader(bg_size=1000)
+        scaled = utils.ScaledImageLoader(full, 250)
+        for fname in [list(IMG_FILES['BACKGROUNDS'])[0], IMG_FILES['PLANETS']['SUN']]:
+            im = scaled.load(fname)
+            self.assertEqual(im.size, tuple(round(s / 4) for s in full.load(fname).size))
+            self.assertIs(scaled.load(fname), im)
+        self.assertEqual(scaled.bg_im_size, 250)
+
+    def test_local_image_loader_tier(self):
+        with tempfile.TemporaryDirectory() as image_dir:
+            for fname in utils.get_all_filenames(IMG_FILES) + list(IMG_FILES['BACKGROUNDS']):
+                path = os.path.join(image_dir, fname)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                Image.new('RGBA', (400, 400)).save(path)
+            full = utils.LocalImageLoader(image_dir, IMG_FILES)
+            full.resize_all_images()
+            tier = utils.LocalImageLoader(image_dir, IMG_FILES, 100)
+            tier.resize_all_images()
+            bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+            self.assertEqual(full.bg_im_size, 400)
+            self.assertEqual(full.load(bg_file).size, (400, 400))
+            self.assertEqual(tier.bg_im_size, 100)
+            for fname in [bg_file, IMG_FILES['ZODIAC_WHEEL']]:
+                self.assertEqual(tier.load(fname).size, (100, 100))
+            sun = IMG_FILES['PLANETS']['SUN']
+            self.assertEqual(tier.load(sun).size[0], int(image_params.PLANET_SIZE * 100))
+
+    def test_render_size(self):
+        chart_positions = list(range(5, 360, 27))[:13]
+        bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+        for bg_size in [128, 256]:
+            im = natal_chart._generate(
+                _utils.create_mock_natal_chart(chart_positions), _utils.SyntheticImageLoader(bg_size), bg_file
+            )
+            self.assertEqual(im.size, (bg_size, bg_size))
+
+    def test_invalid_resolution(self):
+        with self.assertRaises(ValueError):
+            natal_chart.generate('2000-01-01T12:00:00', '0,0', local=True, resolution=300)
+
+    def test_bundle_file(self):
+        self.assertEqual(asset_bundle.bundle_file(), asset_bundle.ASSET_BUNDLE_FILE)
+        self.assertEqual(asset_bundle.bundle_file(512), 'assets_512.bundle')
+
+
+class TestHandlerResolution(unittest.TestCase):
+
+    def setUp(self):
+        self.module = load_lambda_module()
+        self.client = _utils.FakeS3Client()
+        self.module._render_cache = render_cache.RenderCache(render_cache.S3Store('bucket', self.client))
+        self.generate = mock.Mock(return_value=Image.new('RGB', (8, 8)))
+        self.module.generate = self.generate
+        os.environ['NATAL_CHART_BUCKET_NAME'] = 'bucket'
+
+    def request(self, **params):
+        params.setdefault('local_time', '2000-01-01T12:00:00')
+        params.setdefault('location', '40.7128,-74.0060')
+        response = self.module.handler({'queryStringParameters': params}, None)
+        return response['statusCode'], json.loads(response['body'])
+
+    def test_resolution(self):
+        _, full = self.request()
+        self.assertEqual(self.generate.call_args[1]['resolution'], 'full')
+        _, small = self.request(resolution='512')
+        self.assertEqual(self.generate.call_args[1]['resolution'], 512)
+        # different cache keys
+        self.assertNotEqual(full['url'], small['url'])
+
+    def test_invalid_resolution(self):
+        status, body = self.request(resolution='300')
+        self.assertEqual(status, 400)
+        self.assertIn('Invalid resolution', body['error'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import sys
+import tempfile
+import unittest
+from os.path import dirname, abspath
+from pathlib import Path
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image, ImageChops
+
+import _utils
+from constants import IMG_FILES, SPRITE_ATLAS_FILE
+from natal_chart import _generate
+import sprite_atlas
+import utils
+
+
+class TestSpriteAtlas(unittest.TestCase):
+
+    def setUp(self):
+        self.image_loader = _utils.SyntheticImageLoader(bg_size=512)
+        self.atlas, self.index = sprite_atlas.build_atlas(self.image_loader)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.image_dir = Path(self.temp_dir.name)
+
+    def assertSameImage(self, a, b):
+        self.assertEqual(a.mode, b.mode)
+        self.assertEqual(a.size, b.size)
+        self.assertIsNone(ImageChops.difference(a, b).getbbox())
+
+    def write_images(self):
+        """ Writes the atlas and all non-glyph images, like the deployment does. """
+        glyphs = set(sprite_atlas.glyph_filenames())
+        for fname in utils.get_all_filenames(IMG_FILES):
+            if fname not in glyphs:
+                path = self.image_dir / fname
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.image_loader.load(fname).save(path)
+        sprite_atlas.save_atlas(self.atlas, self.index, self.image_dir / SPRITE_ATLAS_FILE)
+        return [f for f in utils.get_all_filenames(IMG_FILES) if f not in glyphs]
+
+    def test_pack_no_overlap(self):
+        sizes = {i: (10 + 7 * i % 23, 5 + 11 * i % 17) for i in range(30)}
+        (width, height), positions = sprite_atlas.pack(sizes)
+        boxes = [(x, y, x + sizes[i][0], y + sizes[i][1]) for i, (x, y) in positions.items()]
+        for i, a in enumerate(boxes):
+            self.assertTrue(0 <= a[0] and 0 <= a[1] and a[2] <= width and a[3] <= height)
+            for b in boxes[i + 1:]:
+                overlap = a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+                self.assertFalse(overlap, (a, b))
+
+    def test_index(self):
+        self.assertEqual(set(self.index['sprites']), set(sprite_atlas.glyph_filenames()))
+        self.assertEqual(self.index['bg_size'], 512)
+
+    def test_save_and_read_index(self):
+        path = self.image_dir / SPRITE_ATLAS_FILE
+        sprite_atlas.save_atlas(self.atlas, self.index, path)
+        with Image.open(path) as im:
+            self.assertEqual(sprite_atlas.read_index(im), self.index)
+        with self.assertRaises(ValueError):
+            sprite_atlas.read_index(Image.new('RGBA', (1, 1)))
+
+    def test_sprites_match_images(self):
+        sprite_atlas.save_atlas(self.atlas, self.index, self.image_dir / SPRITE_ATLAS_FILE)
+        atlas = Image.open(self.image_dir / SPRITE_ATLAS_FILE)
+        loader = sprite_atlas.AtlasImageLoader(_DictImageLoader({SPRITE_ATLAS_FILE: atlas}))
+        for fname in sprite_atlas.glyph_filenames():
+            self.assertSameImage(loader.load(fname), self.image_loader.load(fname))
+        self.assertIs(loader.load('planets/Sun.png'), loader.load('planets/Sun.png'))
+        self.assertEqual(loader.bg_im_size, 512)
+
+    def test_changed_atlas_is_cropped_again(self):
+        sprite_atlas.save_atlas(self.atlas, self.index, self.image_dir / SPRITE_ATLAS_FILE)
+        atlas = Image.open(self.image_dir / SPRITE_ATLAS_FILE)
+        images = {SPRITE_ATLAS_FILE: atlas}
+        loader = sprite_atlas.AtlasImageLoader(_DictImageLoader(images))
+        before = loader.load('planets/Sun.png')
+        images[SPRITE_ATLAS_FILE] = new_atlas = atlas.copy()
+        new_atlas.paste((1, 2, 3, 4), (0, 0) + new_atlas.size)
+        after = loader.load('planets/Sun.png')
+        self.assertIsNot(before, after)
+        self.assertEqual(after.getpixel((0, 0)), (1, 2, 3, 4))
+
+    def test_remote_single_request(self):
+        manifest = self.write_images()
+        with _utils.LocalHTTPServer(self.image_dir) as server:
+            remote = utils.RemoteImageLoader(server.url, manifest=manifest + [SPRITE_ATLAS_FILE])
+            loader = sprite_atlas.AtlasImageLoader(remote)
+            chart = _utils.create_mock_natal_chart(list(range(5, 360, 27))[:13])
+            bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+            actual = _generate(chart, loader, bg_file)
+        # glyphs are never requested individually
+        paths = [path.lstrip('/') for path, _ in server.requests]
+        self.assertEqual(paths.count(SPRITE_ATLAS_FILE), 1)
+        self.assertFalse(set(paths) & set(sprite_atlas.glyph_filenames()))
+
+        chart = _utils.create_mock_natal_chart(list(range(5, 360, 27))[:13])
+        self.assertSameImage(actual, _generate(chart, self.image_loader, bg_file))
+
+
+class _DictImageLoader(utils.ImageLoader):
+    def __init__(self, images):
+        self.images = images
+
+    def load(self, filename):
+        return self.images[filename]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+from os.path import dirname, abspath
+from pathlib import Path
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image
+
+from constants import IMG_FILES
+import utils
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_lazy_imports(self):
+        # slow to import, only imported where they are needed
+        lazy = ['requests', 'boto3', 'pytz', 'multiprocessing']
+        script = "import sys, natal_chart; print(' '.join(m for m in %r if m in sys.modules))" % (lazy,)
+        out = subprocess.run(
+            [sys.executable, '-c', script], cwd=grandparent_dir,
+            stdout=subprocess.PIPE, universal_newlines=True, check=True,
+        ).stdout
+        self.assertEqual(out.strip(), '')
+
+    def test_local_image_loader_reads_header_only(self):
+        with tempfile.TemporaryDirectory() as image_dir:
+            bg_file = list(IMG_FILES['BACKGROUNDS'])[0]
+            path = Path(image_dir) / bg_file
+            path.parent.mkdir(parents=True)
+            Image.new('RGB', (64, 48)).save(path)
+            image_loader = utils.LocalImageLoader(image_dir, IMG_FILES)
+            self.assertEqual(image_loader.bg_im_size, 64)
+            self.assertEqual(len(image_loader.image_cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import re
+import sys
+import unittest
+import xml.etree.ElementTree as ET
+from os.path import dirname, abspath
+from unittest import mock
+from urllib.parse import unquote
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+from PIL import Image, ImageChops
+
+import _utils
+from constants import IMG_FILES
+import image_params
+import labels
+import natal_chart
+import sprite_atlas
+import svg_chart
+
+BG_FILE = list(IMG_FILES['BACKGROUNDS'])[0]
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+def rasterize(svg, image_loader, asset_url):
+    """
+    Draws an SVG chart with Pillow, the way a browser would: images, `<use>` glyphs and text.
+    """
+    root = ET.fromstring(svg)
+    im = None
+    atlas = labels.get_label_atlas(image_params.text_size(int(root.get('height'))))
+    ascent, _ = atlas.font.getmetrics()
+    for el in root.iter():
+        attrs = {k: int(v) for k, v in el.attrib.items() if k in ('x', 'y', 'width', 'height')}
+        xy = (attrs.get('x', 0), attrs.get('y', 0))
+        if el.tag == SVG + 'image':
+            layer = image_loader.load(unquote(el.get('href')[len(asset_url):]))
+            assert layer.size == (attrs['width'], attrs['height'])
+            rotation = re.match(r'rotate\((\d+) ', el.get('transform', 'rotate(0 '))
+            layer = layer.rotate(-int(rotation.group(1)))
+            if im is None:
+                im = layer
+            elif im.mode == 'RGBA':
+                # the zodiac wheel over the background
+                im = Image.alpha_composite(im, layer).convert('RGB')
+            else:
+                im.paste(layer, xy, layer)
+        elif el.tag == SVG + 'use':
+            glyph_id = el.get('href').split('#')[1]
+            filename = {svg_chart.glyph_id(f): f for f in sprite_atlas.glyph_filenames()}[glyph_id]
+            glyph = image_loader.load(filename)
+            assert glyph.size == (attrs['width'], attrs['height'])
+            im.paste(glyph, xy, glyph)
+        elif el.tag == SVG + 'text':
+            # the text origin is the top of the ascender, the SVG text is at the baseline
+            atlas.paste(im, (xy[0], xy[1] - ascent), int(el.text.rstrip('°')))
+    return im
+
+
+class TestSvgChart(unittest.TestCase):
+    image_loader = _utils.SyntheticImageLoader()
+
+    def test_same_layout_as_raster(self):
+        for positions in [list(range(0, 360, 28))[:13], [100 + i for i in range(13)], [5 + 27 * i for i in range(13)]]:
+            for layout in natal_chart.LAYOUTS:
+                svg = natal_chart._generate_svg(
+                    _utils.create_mock_natal_chart(positions), self.image_loader, BG_FILE, layout=layout, asset_url='/a/'
+                )
+                expected = natal_chart._generate(_utils.create_mock_natal_chart(positions), self.image_loader, BG_FILE, layout=layout)
+                actual = rasterize(svg, self.image_loader, '/a/')
+                self.assertEqual(actual.size, expected.size)
+                self.assertIsNone(ImageChops.difference(actual, expected).getbbox())
+
+    def test_document(self):
+        chart = _utils.create_mock_natal_chart(list(range(0, 360, 28))[:13])
+        svg = natal_chart._generate_svg(chart, self.image_loader, BG_FILE, asset_url='https://cdn.example.com/')
+        # a few KB
+        self.assertLess(len(svg.encode()), 5000)
+        root = ET.fromstring(svg)
+        self.assertEqual(root.get('viewBox'), '0 0 256 256')
+        self.assertEqual(len(root.findall(f'.//{SVG}use')), 26)
+        self.assertEqual(len(root.findall(f'.//{SVG}text')), 13)
+        hrefs = [el.get('href') for el in root.iter() if el.get('href')]
+        self.assertIn(f'https://cdn.example.com/{BG_FILE}', hrefs)
+        for href in hrefs:
+            self.assertTrue(href.startswith('https://cdn.example.com/'), href)
+            self.assertNotIn(' ', href)
+        # every glyph is in the sprite sheet
+        sheet = ET.fromstring(svg_chart.sprite_sheet())
+        ids = {symbol.get('id') for symbol in sheet.iter(f'{SVG}symbol')}
+        self.assertEqual(len(ids), len(sprite_atlas.glyph_filenames()))
+        for el in root.iter(f'{SVG}use'):
+            url, glyph_id = el.get('href').split('#')
+            self.assertEqual(url, 'https://cdn.example.com/glyphs.svg')
+            self.assertIn(glyph_id, ids)
+
+    def test_glyph_id(self):
+        self.assertEqual(svg_chart.glyph_id('planets/North Node.png'), 'planets-North-Node')
+        self.assertEqual(svg_chart.glyph_id('signs/Ari.png'), 'signs-Ari')
+
+    def test_generate(self):
+        with mock.patch.object(natal_chart, '_image_loader', return_value=(self.image_loader, None)):
+            svg = natal_chart.generate('2022-01-01T12:00:00', '40.7128,-74.0060', local=True, bg_file=BG_FILE, format='svg')
+            self.assertIsInstance(svg, str)
+            self.assertIn('href="images/glyphs.svg#', svg)
+            with self.assertRaises(ValueError):
+                natal_chart.generate('2022-01-01T12:00:00', '40.7128,-74.0060', local=True, format='pdf')
+
+
+if __name__ == "__main__":
+    unittest.main()
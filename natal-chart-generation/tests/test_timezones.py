@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from os.path import dirname, abspath
+
+# Add the grandparent directory to the sys.path
+grandparent_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, grandparent_dir)
+
+import numpy as np
+import pytz
+
+import _utils
+import batch
+import natal_chart
+import timezones
+
+# (lat, lon) -> timezone
+CITIES = [
+    ((44.20169, 17.90397), 'Europe/Sarajevo'),
+    ((40.7128, -74.0060), 'America/New_York'),
+    ((51.5074, -0.1278), 'Europe/London'),
+    ((-33.8688, 151.2093), 'Australia/Sydney'),
+    ((35.6762, 139.6503), 'Asia/Tokyo'),
+    ((22.5726, 88.3639), 'Asia/Kolkata'),
+    ((33.4484, -112.0740), 'America/Phoenix'),
+    # mid-ocean: nautical timezones
+    ((0.0, -140.0), 'Etc/GMT+9'),
+    ((-40.0, 0.0), 'Etc/GMT'),
+    ((-50.0, 90.0), 'Etc/GMT-6'),
+]
+
+
+def square(lon, lat, size):
+    return [[lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size], [lon, lat]]
+
+
+class TestTimezoneIndex(unittest.TestCase):
+
+    def test_cities(self):
+        for (lat, lon), zone in CITIES:
+            self.assertEqual(timezones.timezone_at(lat, lon), zone)
+
+    def test_zones_at(self):
+        index = timezones.get_index()
+        random.seed(0)
+        locations = [_utils.random_location()[::-1] for _ in range(1000)] + [location for location, _ in CITIES]
+        # the edges of the grid
+        locations += [(90, 0), (-90, 0), (0, 180), (0, -180), (90, 180), (-90, -180)]
+        lats, lons = zip(*locations)
+        self.assertEqual(index.zones_at(lats, lons), [index.zone_at(lat, lon) for lat, lon in locations])
+
+    def test_known_zones(self):
+        # every timezone of the index has tz database rules
+        zones = set(pytz.all_timezones)
+        for name in timezones.get_index().zone_names:
+            self.assertIn(name, zones)
+
+    def test_nautical_zone(self):
+        self.assertEqual(timezones.nautical_zone(0), 'Etc/GMT')
+        self.assertEqual(timezones.nautical_zone(-75), 'Etc/GMT+5')
+        self.assertEqual(timezones.nautical_zone(120), 'Etc/GMT-8')
+        self.assertEqual(timezones.nautical_zone(-180), 'Etc/GMT+12')
+
+    def test_save_load(self):
+        index = timezones.get_index()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'timezones.bin')
+            index.save(path)
+            loaded = timezones.TimezoneIndex.load(path)
+            self.assertEqual(loaded.resolution, index.resolution)
+            self.assertEqual(loaded.zone_names, index.zone_names)
+            for (lat, lon), zone in CITIES:
+                self.assertEqual(loaded.zone_at(lat, lon), zone)
+            del loaded
+
+            with open(path, 'r+b') as f:
+                f.write(b'NOTANIDX')
+            with self.assertRaises(ValueError):
+                timezones.TimezoneIndex.load(path)
+
+    def test_build_index(self):
+        # two timezones, one with a hole, on a 1 degree grid
+        features = [
+            {'type': 'Feature', 'properties': {'tzid': 'Europe/Paris'},
+             'geometry': {'type': 'Polygon', 'coordinates': [square(0, 40, 10), square(4, 44, 2)]}},
+            {'type': 'Feature', 'properties': {'tzid': 'Europe/Berlin'},
+             'geometry': {'type': 'MultiPolygon', 'coordinates': [[square(10, 40, 5)], [square(20, 40, 5)]]}},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tz.json')
+            with open(path, 'w') as f:
+                json.dump({'type': 'FeatureCollection', 'features': features}, f)
+            index = timezones.build_index(path, resolution=1)
+            polygons = timezones._read_polygons(path)
+        self.assertEqual((index.rows, index.columns), (180, 360))
+        self.assertEqual(index.zone_at(42.5, 2.5), 'Europe/Paris')
+        self.assertEqual(index.zone_at(42.5, 12.5), 'Europe/Berlin')
+        self.assertEqual(index.zone_at(42.5, 22.5), 'Europe/Berlin')
+        # the hole and the gap between the polygons are nautical
+        self.assertEqual(index.zone_at(45.5, 5.5), 'Etc/GMT')
+        self.assertEqual(index.zone_at(42.5, 17.5), 'Etc/GMT-1')
+        self.assertEqual(index.zone_at(0, -100), 'Etc/GMT+7')
+        self.assertEqual(timezones.exact_zones(polygons, 42.5, 2.5), {'Europe/Paris'})
+        self.assertEqual(timezones.exact_zones(polygons, 45.5, 5.5), set())
+        # cells resolve like the polygons, except next to a border (within a cell)
+        exact = {
+            (lat, lon): timezones.exact_zones(polygons, lat, lon)
+            for lat in np.arange(34.5, 52) for lon in np.arange(-4.5, 32)
+        }
+        for (lat, lon), zones in exact.items():
+            neighbours = [exact.get((lat + i, lon + j)) for i in (-1, 0, 1) for j in (-1, 0, 1)]
+            if zones and all(n == zones for n in neighbours):
+                self.assertIn(index.zone_at(lat, lon), zones)
+
+
+class TestToUT(unittest.TestCase):
+
+    def test_to_ut(self):
+        # CET in winter
+        self.assertEqual(
+            timezones.to_ut(datetime(1994, 1, 11, 7, 33), 44.20169, 17.90397),
+            datetime(1994, 1, 11, 6, 33, tzinfo=timezone.utc),
+        )
+        # EDT in summer
+        self.assertEqual(
+            timezones.to_ut(datetime(2022, 7, 1, 12), 40.7128, -74.0060),
+            datetime(2022, 7, 1, 16, tzinfo=timezone.utc),
+        )
+        # no DST in Arizona
+        self.assertEqual(
+            timezones.to_ut(datetime(2022, 7, 1, 12), 33.4484, -112.0740),
+            datetime(2022, 7, 1, 19, tzinfo=timezone.utc),
+        )
+
+    def test_aware(self):
+        # the UTC offset takes precedence over the location
+        dt = datetime(2022, 7, 1, 12, tzinfo=timezone(timedelta(hours=2)))
+        self.assertEqual(timezones.to_ut(dt, 40.7128, -74.0060), datetime(2022, 7, 1, 10, tzinfo=timezone.utc))
+
+    def test_dst_transitions(self):
+        # skipped (2:30 doesn't exist on 2022-03-13) and ambiguous (1:30 twice on 2022-11-06) times
+        # are taken as standard time (EST, UTC-5)
+        self.assertEqual(
+            timezones.to_ut(datetime(2022, 3, 13, 2, 30), 40.7128, -74.0060),
+            datetime(2022, 3, 13, 7, 30, tzinfo=timezone.utc),
+        )
+        self.assertEqual(
+            timezones.to_ut(datetime(2022, 11, 6, 1, 30), 40.7128, -74.0060),
+            datetime(2022, 11, 6, 6, 30, tzinfo=timezone.utc),
+        )
+
+    def test_batch(self):
+        random.seed(0)
+        dts = [_utils.random_datetime() for _ in range(200)]
+        dts[::7] = [dt.replace(tzinfo=timezone(timedelta(hours=-3))) for dt in dts[::7]]
+        lons, lats = zip(*[_utils.random_location() for _ in dts])
+        self.assertEqual(
+            timezones.to_ut_batch(dts, lats, lons),
+            [timezones.to_ut(dt, lat, lon) for dt, lat, lon in zip(dts, lats, lons)],
+        )
+        self.assertEqual(timezones.to_ut_batch([], [], []), [])
+
+    def test_parse_birth_data(self):
+        dt, lat, lon = natal_chart.parse_birth_data('1994-01-11T07:33:00', '44.20169,17.90397')
+        self.assertEqual(dt, datetime(1994, 1, 11, 6, 33, tzinfo=timezone.utc))
+        self.assertEqual((lat, lon), (44.20169, 17.90397))
+        dt, _, _ = natal_chart.parse_birth_data('1994-01-11T07:33:00', '44.20169,17.90397', ut=False)
+        self.assertEqual(dt, datetime(1994, 1, 11, 7, 33))
+        dt, _, _ = natal_chart.parse_birth_data('1994-01-11T07:33:00+00:00', '44.20169,17.90397')
+        self.assertEqual(dt, datetime(1994, 1, 11, 7, 33, tzinfo=timezone.utc))
+        # the poles and the antimeridian are valid
+        for location in ['90,180', '-90,-180']:
+            natal_chart.parse_birth_data('1994-01-11T07:33:00', location)
+
+    def test_invalid_location(self):
+        # rejected before the timezone lookup, which would clamp or wrap them
+        with mock.patch('timezones.to_ut') as to_ut:
+            for location in ['inf,0', '0,-inf', 'nan,0', '0,nan', '95,0', '-90.5,0', '0,400', '0,-180.5']:
+                for ut in (True, False):
+                    with self.assertRaises(ValueError):
+                        natal_chart.parse_birth_data('1994-01-11T07:33:00', location, ut=ut)
+        to_ut.assert_not_called()
+
+    def test_parse_records(self):
+        records = [
+            {'local_time': '1994-01-11T07:33:00', 'location': '44.20169,17.90397'},
+            {'local_time': '1994-01-11T07:33:00'},
+            ValueError("line 3: invalid JSON"),
+            {'local_time': 'yesterday', 'location': '0,0'},
+            {'local_time': '2022-07-01T12:00:00', 'location': '40.7128,-74.0060'},
+            {'local_time': '1994-01-11T07:33:00', 'location': 'nan,0'},
+        ]
+        parsed = batch.parse_records(records)
+        self.assertEqual(parsed[0], (datetime(1994, 1, 11, 6, 33, tzinfo=timezone.utc), 44.20169, 17.90397))
+        self.assertEqual(parsed[4], (datetime(2022, 7, 1, 16, tzinfo=timezone.utc), 40.7128, -74.0060))
+        for i in (1, 2, 3, 5):
+            self.assertIsInstance(parsed[i], Exception)
+        self.assertIs(parsed[2], records[2])
+        # the same as one record at a time
+        self.assertEqual(parsed[0], batch.parse_record(records[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Offline timezone resolution: the IANA timezone of a location, and local civil time to UT.
+
+Birth times are local civil times. To get UT (what the ephemeris needs), the timezone of the birth
+location is looked up in a bundled index, and the UTC offset of that timezone at that date (DST and
+historical changes included) comes from the tz database (`pytz`). No network is involved.
+
+The index is a grid over the globe (`resolution` degrees per cell, 0.01 by default, ~1 km), built
+once from the timezone-boundary-builder polygons (https://github.com/evansiroky/timezone-boundary-builder,
+the "with oceans" release, so that every point has a timezone) and run-length encoded: each row of
+the grid is stored as the runs of cells with the same timezone. A lookup is one binary search over
+the runs, a few microseconds, and `zones_at` looks up many locations at once with numpy.
+The index is memory-mapped when loaded.
+
+Accuracy: a location is resolved to the timezone of its grid cell, so only locations within about
+one cell of a border can resolve to the neighbouring timezone. For the bundled index (release 2026c,
+0.01°, 444 timezones, 4.9 MB), out of 5000 random locations (`--check 5000`):
+    uniform over the globe            0.06% wrong
+    within 0.1° of a timezone border  5.2% wrong
+Re-run the check after rebuilding. NOTE: The tz database is less reliable before 1970 (local mean time, wartime
+rules), and ambiguous or skipped local times (DST transitions) are taken as standard time.
+
+File format (little-endian):
+    - header: magic (8 bytes), resolution (float64), runs (uint32), names length (uint32)
+    - zone names: UTF-8, separated by newlines, padded with newlines to a multiple of 4 bytes
+    - keys: `runs` x uint32, the first cell of each run (row * columns + column), ascending.
+      Row 0 starts at latitude 90, column 0 at longitude -180.
+    - zone ids: `runs` x uint16, the timezone of each run (index of its name)
+
+Usage:
+    python timezones.py combined-with-oceans.json [--resolution 0.01] [--out tz/timezones.bin] [--check 10000]
+"""
+import argparse
+from bisect import bisect_right
+from datetime import timezone
+import json
+import math
+import os
+import struct
+
+import numpy as np
+
+from constants import TIMEZONE_INDEX_FILE
+
+MAGIC = b'NCTZIX01'
+_HEADER = struct.Struct('<8sdII')
+
+
+class TimezoneIndex:
+    """
+    Attributes:
+        - resolution: Size of a grid cell, in degrees.
+        - zone_names: The IANA names of the timezones.
+        - keys: A (runs,) uint32 array, the first cell of each run (usually memory-mapped).
+        - zone_ids: A (runs,) uint16 array, the timezone of each run (index in `zone_names`).
+    """
+
+    def __init__(self, resolution, zone_names, keys, zone_ids):
+        self.resolution = resolution
+        self.zone_names = list(zone_names)
+        self.keys = keys
+        self.zone_ids = zone_ids
+        self.columns = int(round(360 / resolution))
+        self.rows = int(round(180 / resolution))
+        # the scalar path bisects memoryviews, which are much faster to index than numpy arrays
+        self._keys = memoryview(np.ascontiguousarray(keys, dtype=np.uint32)).cast('B').cast('I')
+        self._zone_ids = memoryview(np.ascontiguousarray(zone_ids, dtype=np.uint16)).cast('B').cast('H')
+
+    def zone_at(self, lat, lon):
+        """
+        Returns the name of the timezone at a location (latitude and longitude in degrees).
+        """
+        row = min(max(int(math.floor((90 - lat) / self.resolution)), 0), self.rows - 1)
+        column = int(math.floor((lon + 180) / self.resolution)) % self.columns
+        i = bisect_right(self._keys, row * self.columns + column) - 1
+        return self.zone_names[self._zone_ids[i]]
+
+    def zone_ids_at(self, lats, lons):
+        """
+        Returns the timezones of many locations at once, as an array of indices in `zone_names`.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        rows = np.clip(np.floor((90 - lats) / self.resolution).astype(np.int64), 0, self.rows - 1)
+        columns = np.floor((lons + 180) / self.resolution).astype(np.int64) % self.columns
+        # the same dtype as the keys, or numpy converts all the keys for every search
+        cells = (rows * self.columns + columns).astype(self.keys.dtype)
+        i = np.searchsorted(self.keys, cells, side='right') - 1
+        return np.asarray(self.zone_ids)[i]
+
+    def zones_at(self, lats, lons):
+        """
+        Returns the names of the timezones of many locations at once (bulk version of `zone_at`).
+        """
+        return [self.zone_names[i] for i in self.zone_ids_at(lats, lons).tolist()]
+
+    def save(self, path):
+        names = '\n'.join(self.zone_names).encode('utf-8')
+        names += b'\n' * (-len(names) % 4)
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, self.resolution, len(self.keys), len(names)))
+            f.write(names)
+            f.write(np.ascontiguousarray(self.keys, dtype='<u4').tobytes())
+            f.write(np.ascontiguousarray(self.zone_ids, dtype='<u2').tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps an index written by `save`.
+
+        Raises:
+            ValueError: If the file is not a timezone index.
+        """
+        with open(path, 'rb') as f:
+            magic, resolution, runs, names_length = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a timezone index.")
+            zone_names = f.read(names_length).decode('utf-8').rstrip('\n').split('\n')
+        offset = _HEADER.size + names_length
+        keys = np.memmap(path, dtype='<u4', mode='r', offset=offset, shape=(runs,))
+        zone_ids = np.memmap(path, dtype='<u2', mode='r', offset=offset + 4 * runs, shape=(runs,))
+        return cls(resolution, zone_names, keys, zone_ids)
+
+
+def nautical_zone(lon):
+    """
+    Returns the nautical timezone of a longitude, e.g. 'Etc/GMT+5' (UTC-5) at 75W.
+    """
+    hours = int(round(lon / 15))
+    # the sign of the Etc zones is inverted (POSIX)
+    return 'Etc/GMT' if hours == 0 else f"Etc/GMT{-hours:+d}"
+
+
+def _read_polygons(geojson_path):
+    # (tzid, rings, bounds) per polygon: its rings (exterior, holes...) as (n, 2) arrays of (lon, lat),
+    # and the (lon_min, lat_min, lon_max, lat_max) bounds of the exterior
+    with open(geojson_path) as f:
+        features = json.load(f)['features']
+    polygons = []
+    for feature in features:
+        geometry = feature['geometry']
+        coordinates = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        for polygon in coordinates:
+            rings = [np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon if len(ring) >= 3]
+            if rings:
+                bounds = tuple(rings[0].min(axis=0).tolist() + rings[0].max(axis=0).tolist())
+                polygons.append((feature['properties']['tzid'], rings, bounds))
+    return polygons
+
+
+def build_index(geojson_path, resolution=0.01, band_rows=2048):
+    """
+    Rasterizes the timezone polygons of a timezone-boundary-builder GeoJSON file onto the grid.
+
+    Cells are assigned to the polygon that covers their center (cells on a border to one of the
+    polygons, cells where polygons overlap to the smallest one). Cells that no polygon covers get
+    the nautical timezone of their longitude.
+
+    Args:
+        geojson_path (str): The GeoJSON file (e.g. `combined-with-oceans.json` of a release).
+        resolution (float): Size of a grid cell, in degrees. 180 must be a multiple of it.
+        band_rows (int): Rows rasterized at once (memory: 4 bytes per cell).
+
+    Returns:
+        TimezoneIndex: An in-memory index.
+    """
+    # only needed to build the index
+    from PIL import Image, ImageDraw
+
+    columns = int(round(360 / resolution))
+    rows = int(round(180 / resolution))
+    polygons = _read_polygons(geojson_path)
+    zone_names = sorted(
+        {tzid for tzid, _, _ in polygons} | {nautical_zone(lon) for lon in range(-180, 181, 15)}
+    )
+    zone_index = {name: i for i, name in enumerate(zone_names)}
+
+    # polygons in pixel coordinates, one pixel per cell (Pillow truncates the vertices to whole pixels,
+    # so borders are exact to within a cell)
+    pixel_polygons = []
+    for tzid, rings, (lon_min, lat_min, lon_max, lat_max) in polygons:
+        rings = [
+            np.column_stack([(ring[:, 0] + 180) / resolution, (90 - ring[:, 1]) / resolution])
+            for ring in rings
+        ]
+        box = (
+            max(int(math.floor((lon_min + 180) / resolution)), 0), int(math.floor((90 - lat_max) / resolution)),
+            min(int(math.ceil((lon_max + 180) / resolution)) + 1, columns), int(math.ceil((90 - lat_min) / resolution)) + 1,
+        )
+        pixel_polygons.append((zone_index[tzid], rings, box))
+    # where timezones overlap, the smaller one wins (drawn last)
+    pixel_polygons.sort(key=lambda polygon: (polygon[2][2] - polygon[2][0]) * (polygon[2][3] - polygon[2][1]), reverse=True)
+
+    nautical = np.array([
+        zone_index[nautical_zone(-180 + (column + 0.5) * resolution)] for column in range(columns)
+    ], dtype=np.uint16)
+    keys, zone_ids = [], []
+    for band_top in range(0, rows, band_rows):
+        height = min(band_rows, rows - band_top)
+        # zone id + 1 per cell, 0 where no polygon was drawn
+        band = Image.new('I', (columns, height), 0)
+        for zone_id, rings, (left, top, right, bottom) in pixel_polygons:
+            top, bottom = max(top, band_top), min(bottom, band_top + height)
+            if top >= bottom or left >= right:
+                continue
+            # exterior minus holes
+            mask = Image.new('L', (right - left, bottom - top), 0)
+            draw = ImageDraw.Draw(mask)
+            for i, ring in enumerate(rings):
+                xy = (ring - (left, top)).ravel().tolist()
+                draw.polygon(xy, fill=0 if i else 255, outline=0 if i else 255)
+            band.paste(zone_id + 1, (left, top - band_top, right, bottom - band_top), mask)
+
+        cells = np.asarray(band, dtype=np.int64) - 1
+        cells = np.where(cells < 0, nautical[None, :], cells).astype(np.uint16)
+        # run-length encoding: a run starts at the first column and wherever the timezone changes
+        starts = np.ones(cells.shape, dtype=bool)
+        starts[:, 1:] = cells[:, 1:] != cells[:, :-1]
+        run_rows, run_columns = np.nonzero(starts)
+        keys.append(((run_rows + band_top) * columns + run_columns).astype(np.uint32))
+        zone_ids.append(cells[run_rows, run_columns])
+    return TimezoneIndex(resolution, zone_names, np.concatenate(keys), np.concatenate(zone_ids))
+
+
+def _contains(ring, lon, lat):
+    # even-odd rule (ray casting towards +longitude)
+    x0, y0 = ring[:, 0], ring[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    crosses = (y0 > lat) != (y1 > lat)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = x0 + (lat - y0) * (x1 - x0) / (y1 - y0)
+    return bool(np.count_nonzero(crosses & (x > lon)) % 2)
+
+
+def exact_zones(polygons, lat, lon):
+    """
+    Returns the timezones of a location from the polygons (see `_read_polygons`): usually one, but
+    some timezones overlap (e.g. Asia/Urumqi lies within Asia/Shanghai). Slow, for checking the index.
+    """
+    zones = set()
+    for tzid, rings, (lon_min, lat_min, lon_max, lat_max) in polygons:
+        if lon_min <= lon <= lon_max and lat_min <= lat <= lat_max:
+            if _contains(rings[0], lon, lat) and not any(_contains(hole, lon, lat) for hole in rings[1:]):
+                zones.add(tzid)
+    return zones
+
+
+def check_index(index, geojson_path, n=10000, seed=0):
+    """
+    Compares the index against the polygons at `n` random locations: uniformly distributed over
+    the globe, and within 0.1 degrees of a land border (the worst case). A location counts as
+    resolved correctly if it lies in a polygon of its timezone.
+
+    Returns:
+        dict: The fraction of locations resolved to another timezone, per sample.
+    """
+    polygons = _read_polygons(geojson_path)
+    rng = np.random.default_rng(seed)
+    land = np.concatenate([
+        ring for tzid, rings, _ in polygons if not tzid.startswith('Etc/') for ring in rings
+    ])
+    samples = {
+        'uniform': np.column_stack([np.degrees(np.arcsin(rng.uniform(-1, 1, n))), rng.uniform(-180, 180, n)]),
+        'near borders': land[rng.integers(0, len(land), n)][:, ::-1] + rng.uniform(-0.1, 0.1, (n, 2)),
+    }
+    errors = {}
+    for name, points in samples.items():
+        found = index.zones_at(points[:, 0], points[:, 1])
+        checked = [(zone, exact_zones(polygons, lat, lon)) for zone, (lat, lon) in zip(found, points.tolist())]
+        checked = [(zone, exact) for zone, exact in checked if exact]
+        errors[name] = sum(zone not in exact for zone, exact in checked) / max(len(checked), 1)
+    return errors
+
+
+# loaded once per process, see `get_index`
+_index = None
+
+def get_index(path=None):
+    """
+    Returns the process-wide index, memory-mapping it on first use.
+    """
+    global _index
+    if _index is None:
+        if path is None:
+            # relative to this file, so the index works from any working directory
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), TIMEZONE_INDEX_FILE)
+        _index = TimezoneIndex.load(path)
+    return _index
+
+
+def timezone_at(lat, lon):
+    """
+    Returns the IANA name of the timezone at a location, e.g. 'Europe/Sarajevo' at (44.20169, 17.90397).
+    """
+    return get_index().zone_at(lat, lon)
+
+
+def to_ut(dt, lat, lon):
+    """
+    Converts a birth time to UT.
+
+    Args:
+        dt (datetime): The local civil time at the location (naive), or a timezone-aware datetime,
+            which is converted as is (its UTC offset takes precedence over the location).
+        lat, lon (float): The location.
+
+    Returns:
+        datetime: The time in UT (timezone-aware, UTC).
+    """
+    return to_ut_batch([dt], [lat], [lon])[0]
+
+
+def to_ut_batch(dts, lats, lons):
+    """
+    Bulk version of `to_ut` (e.g. for batch records): the timezones of all locations are looked up at once.
+
+    Returns:
+        list: The times in UT (timezone-aware, UTC).
+    """
+    # only needed for local times
+    import pytz
+
+    dts = list(dts)
+    naive = [i for i, dt in enumerate(dts) if dt.tzinfo is None]
+    result = [None if dt.tzinfo is None else dt.astimezone(timezone.utc) for dt in dts]
+    if naive:
+        index = get_index()
+        zone_ids = index.zone_ids_at([lats[i] for i in naive], [lons[i] for i in naive]).tolist()
+        for i, zone_id in zip(naive, zone_ids):
+            # is_dst=False: ambiguous and skipped times are taken as standard time
+            local = pytz.timezone(index.zone_names[zone_id]).localize(dts[i], is_dst=False)
+            result[i] = local.astimezone(timezone.utc)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the timezone index from the timezone-boundary-builder polygons (GeoJSON, with oceans)."
+    )
+    parser.add_argument("geojson", help="e.g. combined-with-oceans.json of a timezone-boundary-builder release")
+    parser.add_argument("--resolution", type=float, default=0.01, help="grid cell size in degrees (default: 0.01)")
+    parser.add_argument("--out", default=TIMEZONE_INDEX_FILE, help=f"output file (default: {TIMEZONE_INDEX_FILE})")
+    parser.add_argument("--check", type=int, default=0, metavar="N",
+                        help="report the fraction of wrongly resolved locations, out of N random locations")
+    args = parser.parse_args()
+
+    index = build_index(args.geojson, args.resolution)
+    index.save(args.out)
+    print(f"Wrote {len(index.zone_names)} timezones, {len(index.keys)} runs to {args.out}")
+
+    if args.check:
+        for name, error in check_index(index, args.geojson, args.check).items():
+            print(f"{name:>12}: {100 * error:.3f}% wrong")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,94 @@
-import bisect
 import math
 import numpy as np
 import os
-import requests
-import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
 
-import boto3
-from disjoint_set import DisjointSet
 from PIL import Image
-from copy import deepcopy
 
+from image_cache import ImageCache
 import image_params
+import metrics
+
+# NOTE: `requests` is imported where it is used,
+# it is slow to import and not needed by every caller (see `benchmarks/bench_startup.py`)
 
 class ImageLoader:
     def load(self, file_path: str) -> Image:
         pass
 
+def get_all_filenames(image_files):
+    """
+    Returns the (unique) filenames of all images in an image file dictionary like `constants.IMG_FILES`.
+    """
+    fnames = []
+    def _get_all_filenames(d: dict):
+        for k,v in d.items():
+            if type(v) == str:
+                fnames.append(v)
+            elif type(v) in [int, float]:
+                fnames.append(k)
+            else:
+                _get_all_filenames(v)
+    _get_all_filenames(image_files)
+    # some images are used more than once
+    return list(dict.fromkeys(fnames))
+
+def hot_filenames(image_files):
+    """
+    Returns the filenames of the images drawn on every chart (all but the backgrounds): the images
+    the loaders pin in their cache (see `image_cache.ImageCache`).
+    """
+    backgrounds = set(image_files['BACKGROUNDS'])
+    return [f for f in get_all_filenames(image_files) if f not in backgrounds]
+
 class LocalImageLoader(ImageLoader):
-    def __init__(self, image_dir, image_files):
+    def __init__(self, image_dir, image_files, bg_size=None, cache_budget=None):
+        """
+        Parameters:
+        - image_dir: Directory of the original images.
+        - image_files: An image file dictionary like `constants.IMG_FILES`.
+        - bg_size: optional (default=None) Background size in pixels to render at (a resolution tier,
+          see `image_params.RESOLUTIONS`). `resize_all_images` then also resizes the backgrounds and the
+          zodiac wheel. None for the size of the original backgrounds.
+        - cache_budget: optional (default=None) Maximum bytes of decoded images kept in `image_cache`
+          (an `image_cache.ImageCache`), None for no limit. Everything but the backgrounds is pinned.
+        """
         self.image_dir = image_dir
         self.image_files = image_files
-        self.image_cache = {}
-        # not exactly optimal to load background image twice,
-        # but also not *that* inefficient
-        self.bg_im_size = self.load(list(image_files['BACKGROUNDS'].keys())[0]).size[0]
+        self.image_cache = ImageCache(cache_budget, pinned=hot_filenames(image_files))
+        # filename -> size relative to the background, of the images `resize_all_images` resized
+        # (evicted images are resized again when they are loaded again)
+        self._resized = {}
+        # filenames loaded at least once (reloads after an eviction are not reported)
+        self._loaded = set()
+        # only reads the image header
+        native_size = image_size(Path(image_dir) / list(image_files['BACKGROUNDS'].keys())[0])[0]
+        self.bg_im_size = bg_size or native_size
+        self._scale_backgrounds = self.bg_im_size != native_size
 
     def load_all_images(self):
         for fname in self.get_all_filenames():
             self.load(fname)
 
     def get_all_filenames(self):
-        fnames = []
-        def _get_all_filenames(d: dict):
-            for k,v in d.items():
-                if type(v) == str:
-                    fnames.append(v)
-                elif type(v) in [int, float]:
-                    fnames.append(k)
-                else:
-                    _get_all_filenames(v)
-        _get_all_filenames(self.image_files)
-        return fnames
+        return get_all_filenames(self.image_files)
 
     def load(self, filename: str) -> Image:
-        if filename not in self.image_cache:
-            print(f'Loading {filename}')
+        im = self.image_cache.get(filename)
+        if im is None:
+            if filename not in self._loaded:
+                print(f'Loading {filename}')
+                self._loaded.add(filename)
             file_path = Path(self.image_dir) / filename
-            self.image_cache[filename] = Image.open(file_path)
-        return self.image_cache[filename]
+            im = Image.open(file_path)
+            if filename in self._resized:
+                im = resize_image(im, self.bg_im_size, self._resized[filename])
+            self.image_cache.put(filename, im)
+        return im
 
     def resize_all_images(self):
         for (fname, p) in [
@@ -61,29 +100,172 @@ class LocalImageLoader(ImageLoader):
             *[(sign, image_params.PLANET_SIZE) for sign in self.image_files['PLANETS'].values()],
             # signs 
             *[(sign, image_params.SIGN_SIZE) for sign in self.image_files['SIGNS'].values()],
+            # backgrounds and zodiac wheel, only for a resolution tier
+            *([(self.image_files['ZODIAC_WHEEL'], 1.0)] if self._scale_backgrounds else []),
+            *[(bg, 1.0) for bg in self.image_files['BACKGROUNDS'] if self._scale_backgrounds],
         ]:
             im  = self.load(fname)
             print(f"Resizing {fname} to {100*p}% of background.")
+            self._resized[fname] = p
             self.image_cache[fname] = resize_image(im, self.bg_im_size, p)
         
 
-class RemoteImageLoader:
-    def __init__(self, distribution_url, bucket_name):
-        self.distribution_url = distribution_url
-        self.bucket_name = bucket_name
-        self.s3 = boto3.client('s3')
-        # load all files to temporary directory
-        self.tmp_dir = tempfile.TemporaryDirectory()
-    
+class RemoteImageLoader(ImageLoader):
+    """
+    Loads (already resized) images over HTTP, e.g. from the CloudFront distribution.
+
+    Images are decoded once and kept in memory (within `cache_budget`), so they survive across warm
+    invocations as long as the loader is reused. On first use, every image in `manifest` is fetched
+    concurrently over a pooled HTTP session. Cached images are revalidated with a
+    conditional request (ETag) once they are older than `revalidate_after` seconds.
+    Evicted images are downloaded again on their next use.
+
+    Attributes:
+        - base_url: URL prefix of all images.
+        - manifest: A list of image keys to prefetch on first use.
+        - revalidate_after: Seconds after which a cached image is revalidated, or None to never revalidate.
+        - image_cache: An `image_cache.ImageCache` mapping image keys to decoded images.
+        - hits: Number of loads served from memory without any request.
+        - misses: Number of images downloaded (HTTP 200).
+        - not_modified: Number of revalidations that kept the cached image (HTTP 304).
+    """
+
+    def __init__(
+            self, distribution_url, manifest=(), max_workers=16, revalidate_after=300, timeout=10,
+            cache_budget=None, pinned=(),
+        ):
+        """
+        Parameters:
+        - distribution_url: Host name of the distribution (https is assumed), or a URL including the scheme.
+        - manifest: optional (default=()) Image keys to prefetch on first use.
+        - max_workers: optional (default=16) Number of concurrent downloads (and pooled connections).
+        - revalidate_after: optional (default=300) See class attributes.
+        - timeout: optional (default=10) Timeout of a single request, in seconds.
+        - cache_budget: optional (default=None) Maximum bytes of decoded images kept in memory, None for no limit.
+        - pinned: optional (default=()) Image keys that are never evicted (see `hot_filenames`).
+        """
+        if '://' not in distribution_url:
+            distribution_url = f"https://{distribution_url}"
+        self.base_url = distribution_url.rstrip('/')
+        self.manifest = list(manifest)
+        self.max_workers = max_workers
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+        self.image_cache = ImageCache(cache_budget, pinned)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        # image key -> (etag, time of last validation)
+        self._validators = {}
+        self._prefetched = False
+        self._lock = threading.Lock()
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
     def load(self, image_key):
-        url = f"https://{self.distribution_url}/{image_key}"
-        response = requests.get(url)
-        file_path = Path(self.tmp_dir.name) / image_key\
-        # create directories if they don't exist
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(file_path, 'wb') as f:
-            f.write(response.content)
-        return Image.open(file_path)
+        if not self._prefetched:
+            self.prefetch()
+        im = self.image_cache.get(image_key)
+        if im is None:
+            return self._fetch(image_key)
+        _, validated_at = self._validators[image_key]
+        if self.revalidate_after is not None and time.monotonic() - validated_at > self.revalidate_after:
+            return self._fetch(image_key)
+        with self._lock:
+            self.hits += 1
+        metrics.increment('asset_cache_hits')
+        return im
+
+    def prefetch(self):
+        """
+        Concurrently fetches all images in the manifest that are not cached yet (only the pinned
+        ones if the cache has a budget, the others could evict each other).
+        Failed downloads are reported and retried on their next `load()`.
+        """
+        self._prefetched = True
+        keys = [k for k in self.manifest if k not in self.image_cache]
+        if self.image_cache.budget is not None:
+            keys = [k for k in keys if k in self.image_cache.pinned]
+        with metrics.span('prefetch'), ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for key, error in zip(keys, executor.map(self._try_fetch, keys)):
+                if error is not None:
+                    print(f"Prefetching {key} failed: {error}")
+
+    def _try_fetch(self, image_key):
+        try:
+            self._fetch(image_key)
+        except Exception as e:
+            return e
+
+    def _fetch(self, image_key):
+        headers = {}
+        # a conditional request only makes sense if the image is still cached (not evicted)
+        cached = self.image_cache.peek(image_key)
+        etag = self._validators.get(image_key, (None, None))[0]
+        if etag and cached is not None:
+            headers['If-None-Match'] = etag
+        with metrics.span('fetch'):
+            response = self.session.get(f"{self.base_url}/{image_key}", headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                with self._lock:
+                    self.not_modified += 1
+                    self._validators[image_key] = (self._validators[image_key][0], time.monotonic())
+                metrics.increment('asset_not_modified')
+                return self.image_cache.put(image_key, cached)
+            response.raise_for_status()
+            im = Image.open(BytesIO(response.content))
+            # decode now (in the calling thread), not on first use
+            im.load()
+        metrics.increment('asset_cache_misses')
+        with self._lock:
+            self.misses += 1
+            self.image_cache[image_key] = im
+            self._validators[image_key] = (response.headers.get('ETag'), time.monotonic())
+        return im
+
+class ScaledImageLoader(ImageLoader):
+    """
+    Serves the images of another (full resolution) loader scaled to a smaller background size,
+    e.g. for a resolution tier when only full resolution assets are available (see `image_params.RESOLUTIONS`).
+    Each image is scaled once, on first use.
+
+    Attributes:
+        - image_loader: The full resolution loader.
+        - bg_im_size: The background size (in pixels) the images are scaled to.
+        - image_cache: An `image_cache.ImageCache` mapping filenames to scaled images.
+    """
+
+    def __init__(self, image_loader, bg_size, cache_budget=None, pinned=()):
+        """
+        Parameters:
+        - image_loader: The full resolution loader.
+        - bg_size: The background size (in pixels) to scale to.
+        - cache_budget: optional (default=None) Maximum bytes of scaled images kept in memory, None for no limit.
+        - pinned: optional (default=()) Filenames that are never evicted (see `hot_filenames`).
+        """
+        self.image_loader = image_loader
+        self.bg_im_size = bg_size
+        self.image_cache = ImageCache(cache_budget, pinned)
+
+    def load(self, filename):
+        im = self.image_cache.get(filename)
+        if im is None:
+            im = self.image_loader.load(filename)
+            scale = self.bg_im_size / self.image_loader.bg_im_size
+            im = im.resize((max(1, round(im.size[0] * scale)), max(1, round(im.size[1] * scale))), Image.LANCZOS)
+            self.image_cache.put(filename, im)
+        return im
+
+def image_size(file_path):
+    """
+    Returns the (width, height) of an image file, reading only its header.
+    """
+    with Image.open(file_path) as im:
+        return im.size
 
 def resize_image(im, bg_size, p):
     """
@@ -106,9 +288,84 @@ def calculate_position(degree):
         "position": degree % 30
     }
 
+def find_clump_indices(dpos, theta, signs=None):
+    """
+    Find clumps of positions located near each other on the perimeter of a circle.
+
+    Args:
+        dpos (list): Display positions in degrees.
+        theta (float):  A float value indicating the maximum angular distance
+                        that two positions can be apart and still be considered
+                        part of the same clump.
+        signs (list, optional): One sign per position. If given, positions are only clumped
+                        if they share a sign (so clumps never cross a sign boundary, nor 0/360 degrees).
+                        Otherwise positions are taken modulo 360 and clumps may wrap around 0 degrees.
+
+    Returns:
+        list: A list of lists of indices into `dpos`, one list per clump (including clumps of
+              a single position), each sorted by position.
+
+    The positions are sorted once and swept in both directions: a forward pass starts a new clump
+    at position j unless it lies within `theta * k` of the first position i of the current clump,
+    where k is the current clump size; the backward pass does the same in reverse. Two neighbors
+    end up in different clumps only if both passes separate them. The second pass matters
+    e.g. for [30, 45, 45, ..., 45, 59]: the forward pass splits 30 from the stellium, but the
+    backward pass, coming from the (large) stellium, reaches it.
+
+    Without `signs`, the sweep starts after the largest gap between two neighbors, so a clump
+    around 0 degrees is never cut in two.
+    """
+    n = len(dpos)
+    if n == 0:
+        return []
+    if signs is None:
+        pos = [p % 360 for p in dpos]
+    else:
+        pos = list(dpos)
+    order = sorted(range(n), key=pos.__getitem__)
+    keys = [pos[i] for i in order]
+    if signs is None:
+        # rotate, so the sweep starts after the largest gap (wrapping around 360 degrees)
+        gaps = [b - a for a, b in zip(keys, keys[1:])] + [keys[0] + 360 - keys[-1]]
+        start = (max(range(n), key=gaps.__getitem__) + 1) % n
+        order = order[start:] + order[:start]
+        # unwrap, so the keys are increasing again
+        keys = [pos[order[0]] + (pos[i] - pos[order[0]]) % 360 for i in order]
+        sorted_signs = None
+    else:
+        sorted_signs = [signs[i] for i in order]
+
+    def _sweep(indices):
+        # returns the set of (sorted) indices that start a new clump
+        starts = set()
+        first = indices[0]
+        size = 1
+        for j in indices[1:]:
+            same_sign = sorted_signs is None or sorted_signs[first] == sorted_signs[j]
+            if same_sign and abs(keys[j] - keys[first]) < theta * size:
+                size += 1
+            else:
+                starts.add(j)
+                first = j
+                size = 1
+        return starts
+
+    # forward and backwards pass
+    forward = _sweep(range(n))
+    # a backward clump starting at j ends at j+1 in the forward direction
+    backward = {j + 1 for j in _sweep(range(n - 1, -1, -1))}
+
+    clumps = [[order[0]]]
+    for j in range(1, n):
+        if j in forward and j in backward:
+            clumps.append([])
+        clumps[-1].append(order[j])
+    return clumps
+
 def find_clumps(planets, theta):
     """
     Find clumps of planets located near each other on the perimeter of a circle.
+    Planets are only clumped if they share a sign (see `find_clump_indices`).
 
     Args:
         planets (list): A list of Planet objects.
@@ -118,47 +375,18 @@ def find_clumps(planets, theta):
 
     Returns:
         list: A list of lists, where each inner list contains the planets that are part
-              of the same clump.
+              of the same clump, sorted by display position.
     """
-    # using Disjoint-set data structure for keeping track of clumps
-    # https://en.wikipedia.org/wiki/Disjoint-set_data_structure
-    clumps = DisjointSet()
-
-    def _clump_check(p1, pn, n):
-        """
-        This helper function takes two planets and the number of planets
-        between them and determines whether the two planets are considered
-        part of the same clump. The maximum angular distance that two
-        planets can be apart and still be considered part of the same
-        clump is determined by the value of "theta".
-        """
-        return (p1.sign == pn.sign) and abs(p1.dpos - pn.dpos) < theta * (n - 1)
-  
-    def _pass(planets):
-        curr_first_planet = planets[0]
-        curr_size = 1 
-
-        for p in planets[1:]:
-            # ensure each planet has it's own set
-            # NOTE: `find` creates a size-1 set if
-            # the element is currently not in the ds
-            clumps.find(p)
-
-            if _clump_check(curr_first_planet, p, curr_size + 1):
-                # if it satisfies the clump criteria, add it to the current clump
-                clumps.union(curr_first_planet, p)
-                curr_size += 1
-            else:
-                curr_first_planet = p
-                curr_size = 1
-
-    # forward and backwards pass
-    _pass(sorted(planets, key=lambda p: p.dpos))
-    _pass(sorted(planets, key=lambda p: p.dpos, reverse=True))
+    indices = find_clump_indices([p.dpos for p in planets], theta, [p.sign for p in planets])
+    return [[planets[i] for i in clump] for clump in indices]
 
-    # sort planets in clumps before returning
-    ret = list(sorted(list(c), key=lambda x: x.dpos) for c in clumps.itersets())
-    return ret
+def planet_theta():
+    """
+    Returns the approximate angle (in degrees) a planet image takes up on the chart.
+    """
+    # convert planet size to approximate degrees it takes up
+    # treats planet width as chord length & planet radius as radius; solve for angle
+    return math.degrees(2 * math.asin(0.5 * (image_params.PLANET_SIZE / 2) / image_params.PLANET_RADIUS))
 
 def spread_planets(planets, theta=None, min_to_center=5):
     """
@@ -196,9 +424,7 @@ def spread_planets(planets, theta=None, min_to_center=5):
     """
 
     if not theta:
-        # convert planet size to approximate degrees it takes up
-        # treats planet width as chord length & planet radius as radius; solve for angle
-        theta = math.degrees(2 * math.asin(0.5 * (image_params.PLANET_SIZE / 2) / image_params.PLANET_RADIUS)) 
+        theta = planet_theta()
 
     clumps = find_clumps(planets, theta)
 
@@ -253,6 +479,115 @@ def spread_planets(planets, theta=None, min_to_center=5):
         for (p, pos) in zip(clump, new_positions):
             p.dpos = pos
 
+def _isotonic(z):
+    """
+    Least squares nondecreasing fit of each row of `z` (isotonic regression), using the
+    max-min formula x_i = max_{j <= i} min_{k >= i} mean(z_j, ..., z_k) on whole arrays.
+    """
+    n = z.shape[1]
+    csum = np.zeros((len(z), n + 1))
+    np.cumsum(z, axis=1, out=csum[:, 1:])
+    j = np.arange(n)[:, None]
+    k = np.arange(n)[None, :]
+    upper = k >= j
+    # means[:, j, k] = mean(z_j, ..., z_k) for j <= k, +inf otherwise
+    means = (csum[:, None, 1:] - csum[:, :-1, None]) / np.maximum(k - j + 1, 1)
+    means[:, ~upper] = np.inf
+    # suffix minimum over k >= i, then maximum over j <= i
+    suffix_min = np.minimum.accumulate(means[:, :, ::-1], axis=2)[:, :, ::-1]
+    suffix_min[:, ~upper] = -np.inf
+    return suffix_min.max(axis=1)
+
+def solve_layout_positions(dpos, theta):
+    """
+    Computes display positions with at least `theta` degrees between any two neighbors
+    on the circle, that are as close as possible to `dpos` (least squares).
+
+    Args:
+        dpos: An array of positions in degrees.
+        theta (float): The minimum separation in degrees. If the objects don't fit on the circle
+            (len(dpos) * theta > 360), they are spread evenly instead.
+
+    Returns:
+        numpy.ndarray: The new positions, between 0 and 360 degrees, in the order of `dpos`.
+
+    The order of the objects around the circle is kept. Cut open at some point, the problem is
+    an isotonic regression of z_i = p_i - i * theta (p sorted), with x_i = y_i + i * theta.
+    A solution that also keeps `theta` across the cut is optimal on the circle. The cut at the
+    largest gap is tried first, if its solution violates `theta` across the cut, all n cuts are
+    solved at once and the cheapest one that doesn't is used.
+    """
+    pos = np.asarray(dpos, dtype=np.float64) % 360
+    n = len(pos)
+    if n < 2:
+        return pos.copy()
+    order = np.argsort(pos, kind='stable')
+    p = pos[order]
+    i = np.arange(n)
+    gaps = np.roll(p, -1) - p
+    gaps[-1] += 360
+    c = (int(np.argmax(gaps)) + 1) % n
+    # the sorted positions, starting at p[c] and unwrapped past 360 degrees
+    unwrapped = np.concatenate([p[c:], p[:c] + 360])
+
+    if n * theta >= 360:
+        # no room to spare: spread evenly, best fit rotation
+        step = 360 / n
+        x = (unwrapped - step * i).mean() + step * i
+    else:
+        x = _isotonic((unwrapped - theta * i)[None, :])[0] + theta * i
+        if x[0] + 360 - x[-1] < theta - 1e-9:
+            # row c: all cuts
+            shifted = i[:, None] + i[None, :]
+            unwrapped = p[shifted % n] + 360 * (shifted >= n)
+            xs = _isotonic(unwrapped - theta * i) + theta * i
+            cost = ((xs - unwrapped) ** 2).sum(axis=1)
+            feasible = xs[:, 0] + 360 - xs[:, -1] >= theta - 1e-9
+            c = int(np.argmin(np.where(feasible, cost, np.inf)))
+            x = xs[c]
+    result = np.empty(n)
+    result[order[(c + i) % n]] = x % 360
+    return result
+
+def solve_layout(planets, theta=None):
+    """
+    Alternative to `spread_planets`: moves the display positions of all planets as little as possible
+    (least squares) so that no two neighbors are closer than `theta` degrees (see `solve_layout_positions`).
+
+    Args:
+        planets (list): A list of Planet objects.
+        theta (float, optional): The minimum separation in degrees. (default: `planet_theta()`)
+
+    Returns:
+        None. Modifies the display positions of the planets in place.
+    """
+    if not theta:
+        theta = planet_theta()
+    dpos = solve_layout_positions([p.dpos for p in planets], theta)
+    for p, pos in zip(planets, dpos.tolist()):
+        p.dpos = pos
+
+def find_overlaps(dpos, theta, tol=1e-6):
+    """
+    Returns the pairs of indices (i, j) of neighbors on the circle that are less than `theta` degrees apart.
+
+    Args:
+        dpos: An array of positions in degrees.
+        theta (float): The minimum separation in degrees.
+        tol (float, optional): Tolerance for rounding errors. (default: 1e-6)
+    """
+    pos = np.asarray(dpos, dtype=np.float64) % 360
+    if len(pos) < 2:
+        return []
+    order = np.argsort(pos, kind='stable')
+    nxt = np.roll(order, -1)
+    gaps = (pos[nxt] - pos[order]) % 360
+    if len(pos) == 2:
+        # the same pair of neighbors both ways around the circle, only check the shorter way
+        gaps[np.argmax(gaps)] = np.inf
+    close = np.flatnonzero(gaps < theta - tol)
+    return [(int(order[k]), int(nxt[k])) for k in close]
+
 def print_clumps(clumps):
     # just a helper for debugging
     for c in clumps: